@@ -0,0 +1,193 @@
+# -*- coding: utf-8
+""" Batch analysis of positions on a pool of worker processes.
+
+    python analyze.py positions.jsonl --time 1 > results.jsonl
+    python analyze.py --records games.rec --depth 6 --out results.jsonl
+    cat positions.jsonl | python analyze.py -
+
+    Positions are JSON objects, one per line, with the player to move about
+    to move:
+
+        {"width": 7, "height": 7, "pawns": [3, 45], "destroyed": [10, 11],
+         "player": 0, "id": "anything", "time": 0.5, "depth": 8}
+
+    pawns and destroyed cells may be indices or [row, col] pairs, destroyed
+    may also be the bitmask; id, time and depth are optional. Each position
+    gets one result line, in input order:
+
+        {"line": 1, "id": ..., "move": [r, c], "remove": [r, c], "score": 8.0,
+         "pv": [[[r, c], [r, c]], ...], "nodes": 50081, "depth": 5, "time": 0.71}
+
+    or {"line": n, "error": "..."}. Input is read only as fast as results
+    are written, so at most --window positions are in memory at once. """
+from __future__ import print_function
+
+import argparse
+import collections
+import json
+import multiprocessing
+import sys
+
+from gamestate import IsolationState, MOVE
+
+WINDOW_PER_PROCESS = 4  # positions queued per worker
+
+_ENGINE = None  # one per worker process, its tables are reused across positions
+
+
+def Cells(state, values):
+    """ Indices from a list of indices or [row, col] pairs """
+    cells = []
+    for value in values:
+        if isinstance(value, list):
+            row, col = value
+            if not (0 <= row < state.height and 0 <= col < state.width):
+                raise ValueError('cell %r is off the board' % (value,))
+            value = state.Index(row, col)
+        if not 0 <= value < state.size:
+            raise ValueError('cell %r is off the board' % (value,))
+        cells.append(value)
+    return cells
+
+
+def ParsePosition(spec):
+    """ IsolationState of a position object (see the module docstring) """
+    state = IsolationState(int(spec['width']), int(spec['height']))
+    pawns = Cells(state, spec.get('pawns', state.pawns))
+    destroyed = spec.get('destroyed', 0)
+    if isinstance(destroyed, list):
+        mask = 0
+        for index in Cells(state, destroyed):
+            mask |= 1 << index
+        destroyed = mask
+    if len(pawns) != 2 or pawns[0] == pawns[1]:
+        raise ValueError('need two pawns on different cells')
+    if destroyed >> pawns[0] & 1 or destroyed >> pawns[1] & 1 or destroyed >> state.size:
+        raise ValueError('destroyed cells must be on the board and free of pawns')
+    player = int(spec.get('player', 0))
+    if player not in (0, 1):
+        raise ValueError('player must be 0 or 1')
+    return IsolationState(state.width, state.height, pawns, destroyed, player, MOVE)
+
+
+def StartWorker(engine_kwargs):
+    global _ENGINE
+    from engine import AlphaBetaEngine
+    _ENGINE = AlphaBetaEngine(**engine_kwargs)
+
+
+def Analyse(task):
+    """ One input line -> one output line (both JSON text) """
+    number, text, time_limit, depth = task
+    result = {'line': number}
+    try:
+        spec = json.loads(text)
+        if 'id' in spec:
+            result['id'] = spec['id']
+        state = ParsePosition(spec)
+        if state.IsIsolated():
+            result['winner'] = 1 - state.player
+            return json.dumps(result)
+        to, remove = _ENGINE.Search(state, spec.get('time', time_limit), spec.get('depth', depth))
+        stats = _ENGINE.stats
+        location = state.Location
+        result.update({
+            'move': location(to),
+            'remove': None if remove is None else location(remove),
+            'score': stats['score'],
+            'pv': [[location(t), None if r is None else location(r)]
+                   for t, r in _ENGINE.PrincipalVariation(state, (to, remove))],
+            'nodes': stats['nodes'],
+            'depth': stats['depth'],
+            'time': round(stats['time'], 4),
+        })
+    except (ValueError, KeyError, TypeError) as error:
+        result['error'] = '%s: %s' % (type(error).__name__, error)
+    return json.dumps(result)
+
+
+def Lines(source):
+    """ Yields (line number, text) for the non-blank lines of source """
+    for number, line in enumerate(source, 1):
+        if line.strip():
+            yield number, line
+
+
+def RecordLines(path):
+    """ Yields (position number, text) for every turn of every recorded game """
+    from records import ReadGames
+    number = 0
+    for game, record in enumerate(ReadGames(path)):
+        for turn, state in enumerate(record.Positions()):
+            number += 1
+            yield number, json.dumps({
+                'width': state.width, 'height': state.height, 'pawns': state.pawns,
+                'destroyed': state.destroyed, 'player': state.player, 'id': [game, turn],
+            })
+
+
+def Run(lines, out, processes=None, time_limit=1.0, depth=None, window=None, engine_kwargs=None):
+    """ Analyses (number, text) lines on a process pool and writes the results
+        to out in the same order. Only `window` positions are ever in flight:
+        the next line is read once the oldest result has been written. """
+    processes = processes or multiprocessing.cpu_count()
+    window = window or WINDOW_PER_PROCESS*processes
+    pool = multiprocessing.Pool(processes, StartWorker, (engine_kwargs or {},))
+    pending = collections.deque()
+    written = 0
+    try:
+        for number, text in lines:
+            if len(pending) >= window:
+                out.write(pending.popleft().get() + '\n')
+                out.flush()
+                written += 1
+            pending.append(pool.apply_async(Analyse, ((number, text, time_limit, depth),)))
+        while pending:
+            out.write(pending.popleft().get() + '\n')
+            out.flush()
+            written += 1
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return written
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse many positions in parallel, JSONL in and out.')
+    parser.add_argument('input', nargs='?', default='-', help='positions file, - for stdin')
+    parser.add_argument('--records', default=None, help='analyse every position of a game record file instead')
+    parser.add_argument('--out', default=None, help='results file (default: stdout)')
+    parser.add_argument('--time', type=float, default=1.0, help='seconds per position')
+    parser.add_argument('--depth', type=int, default=None, help='depth limit per position')
+    parser.add_argument('--processes', type=int, default=0, help='worker processes (default: all cores)')
+    parser.add_argument('--window', type=int, default=0, help='positions in flight (default: %d per process)'
+                        % WINDOW_PER_PROCESS)
+    parser.add_argument('--engine', default='', help='alpha-beta settings, as for tournament.py')
+    args = parser.parse_args(argv)
+
+    from tournament import ParseEngine
+    engine_kwargs = ParseEngine(args.engine)
+    if 'engine' in engine_kwargs:
+        parser.error('analysis always uses the alpha-beta engine')
+    if args.records:
+        source, lines = None, RecordLines(args.records)
+    else:
+        source = sys.stdin if args.input == '-' else open(args.input)
+        lines = Lines(source)
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        written = Run(lines, out, args.processes or None, args.time, args.depth, args.window or None, engine_kwargs)
+    finally:
+        if source not in (None, sys.stdin):
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print('%d positions analysed' % written, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
@@ -0,0 +1,325 @@
+# -*- coding: utf-8
+""" Benchmarks of the rules, the engine and the GUI, with a regression check.
+
+    python bench.py suite                 measure, compare with bench-baseline.json
+    python bench.py suite --save          measure and make that the new baseline
+    python bench.py large [--sizes 16,32,64] [--time 2]
+
+    The suite measures, for every square board from 3x3 to 11x11, legal move
+    generation and isolation checks per second, the engine's time to reach a
+    fixed depth from the start position and its nodes per second on the way,
+    and GameBoard construction and GameUpdate times. The GUI part runs in a
+    separate interpreter (--gui-python, which needs wx) under xvfb-run when
+    there is no display; it is skipped if that interpreter cannot import wx.
+    Every figure is the best of --repeat runs, and the spread of those runs
+    (how much slower the worst was) is kept with it. A measurement fails the
+    run when it is worse than the baseline by more than --threshold plus the
+    larger spread of the two, so a figure is only as strict as it is
+    repeatable.
+
+    `large` prints move generation, partition checks, engine speed and GUI
+    timings for large boards, and fails if a click would take longer than
+    INTERACTIVE. """
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from gamestate import IsolationState
+from engine import AlphaBetaEngine
+from tournament import RandomOpening
+
+INTERACTIVE = 0.05  # seconds, what a click may cost before the GUI feels slow
+SIZES = range(3, 12)
+# depth searched from the start position of each size, about a second at most
+DEPTHS = {3: 5, 4: 5, 5: 5, 6: 4, 7: 5, 8: 4, 9: 5, 10: 4, 11: 5}
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench-baseline.json')
+THRESHOLD = 0.2  # relative slowdown that counts as a regression, on top of the noise
+REPEAT = 5
+RULE_SECONDS = 0.5  # per rule measurement, shorter ones were too noisy to compare
+
+
+def Rate(function, seconds=0.2, batch=100):
+    """ Calls per second of function() in the fastest batch of `batch` calls
+        run within about `seconds` (as timeit advises, slower batches were
+        only interrupted), after one call to fill any caches """
+    function()
+    best, start = None, time.time()
+    while True:
+        began = time.time()
+        for _ in range(batch):
+            function()
+        ended = time.time()
+        if best is None or ended - began < best:
+            best = ended - began
+        if ended - start >= seconds:
+            return batch / best if best else float('inf')
+
+
+def Position(size, seed=0):
+    """ A size x size board `size` random turns into a game """
+    state = RandomOpening(IsolationState(size, size), size, random.Random(seed))
+    state.undo = []
+    return state
+
+
+def Rules(state):
+    engine = AlphaBetaEngine()
+    return {
+        'movegen': Rate(state.LegalMoves),
+        'turns': Rate(lambda: list(engine.Turns(state))),
+        'partition': Rate(state.Partition),
+    }
+
+
+def Engine(state, seconds):
+    engine = AlphaBetaEngine()
+    engine.Search(state, seconds)
+    return {'nps': engine.stats['nps'], 'depth': engine.stats['depth']}
+
+
+def Rendering(size, canvas=True):
+    """ GUI timings, or None without wx """
+    try:
+        from gui import BenchmarkBoard
+    except ImportError:
+        return None
+    conf = {
+        'timer': [False, 15], 'width': size, 'height': size,
+        'colour': {0: (0, 0, 255), 1: (255, 0, 0)}, 'name': {0: 'A', 1: 'B'},
+        'computer': {0: False, 1: False}, 'canvas': canvas, 'hints': False, 'server': None, 'profile': False,
+    }
+    return BenchmarkBoard(conf)
+
+
+## ------------ SUITE ------------##
+def LowerIsBetter(name):
+    return name.endswith(' ms')
+
+
+def Slowdown(name, before, now):
+    """ How much worse now is than before, relative (0.25 is 25% slower) """
+    return now/before - 1 if LowerIsBetter(name) else before/now - 1
+
+
+def Measure(measures, repeat):
+    """ (metrics, spreads): the best of `repeat` results of every measure and
+        how far the worst fell behind it. The repeats go round robin over all
+        measures, so a slow spell of the machine costs each figure one sample
+        instead of every sample of one figure. A measure returns {name: value}. """
+    results = {}
+    for _ in range(repeat):
+        for measure in measures:
+            for name, value in measure().items():
+                results.setdefault(name, []).append(value)
+    metrics, spreads = {}, {}
+    for name, values in results.items():
+        best, worst = (min(values), max(values)) if LowerIsBetter(name) else (max(values), min(values))
+        metrics[name] = best
+        spreads[name] = Slowdown(name, best, worst) if best and worst else 0.0
+    return metrics, spreads
+
+
+def Positions(size):
+    """ Fixed positions for the rule benchmarks: the start and a few random
+        turns in, with the same seeds every run """
+    return [IsolationState(size, size)] + [Position(size, seed) for seed in range(3)]
+
+
+def RuleMeasures():
+    measures = []
+    for size in SIZES:
+        positions = Positions(size)
+        measures.append(lambda size=size, positions=positions: {
+            'rules %dx%d movegen/s' % (size, size):
+                Rate(lambda: [state.LegalMoves() for state in positions], RULE_SECONDS) * len(positions)})
+        measures.append(lambda size=size, positions=positions: {
+            'rules %dx%d isolated/s' % (size, size):
+                Rate(lambda: [state.IsIsolated(p) for state in positions for p in (0, 1)], RULE_SECONDS)
+                * 2*len(positions)})
+    return measures
+
+
+def TimeToDepth(size, depth, seconds=0.3):
+    """ (seconds, nodes) of one search from the start position, averaged
+        over as many fresh searches as fit in `seconds` """
+    searches, nodes, start = 0, 0, time.time()
+    while True:
+        engine = AlphaBetaEngine()
+        engine.Search(IsolationState(size, size), None, depth)
+        searches += 1
+        nodes += engine.stats['nodes']
+        elapsed = time.time() - start
+        if elapsed >= seconds:
+            return elapsed / searches, nodes / searches
+
+
+def EngineMeasures():
+    """ One figure per size: the node count to a fixed depth does not change
+        between runs, so time to depth says all that nodes per second would """
+    return [lambda size=size: {'engine %dx%d depth %d ms' % (size, size, DEPTHS[size]):
+                               TimeToDepth(size, DEPTHS[size])[0]*1000}
+            for size in SIZES]
+
+
+def GuiMeasures():
+    """ Needs wx and a display, see --gui-python """
+    def Board(size):
+        run = Rendering(size, canvas=False)
+        if run is None:
+            raise ImportError('wx is not available')
+        return {'gui %dx%d build ms' % (size, size): run['build']*1000,
+                'gui %dx%d update ms' % (size, size): run['update']*1000}
+    return [lambda size=size: Board(size) for size in SIZES]
+
+
+def RunGui(python, repeat, log):
+    """ (metrics, spreads) of the GUI measures in another interpreter, under
+        xvfb-run without a display """
+    command = [python, os.path.abspath(__file__), 'gui', '--repeat', str(repeat)]
+    if not os.environ.get('DISPLAY'):
+        command = ['xvfb-run', '-a'] + command
+    try:
+        output = subprocess.check_output(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.CalledProcessError) as error:
+        print('GUI not measured (%s)' % error, file=log)
+        return {}, {}
+    measured = json.loads(output.decode('utf-8'))
+    return measured['metrics'], measured['spreads']
+
+
+def Compare(metrics, baseline, threshold, spreads=None, baseline_spreads=None):
+    """ [(name, baseline, now, change, allowed)] of the metrics that got worse
+        by more than allowed: threshold plus the larger spread of the two
+        measurements. change is the relative slowdown. """
+    spreads, baseline_spreads = spreads or {}, baseline_spreads or {}
+    regressions = []
+    for name, now in sorted(metrics.items()):
+        before = baseline.get(name)
+        if not before or not now:
+            continue
+        change = Slowdown(name, before, now)
+        allowed = threshold + max(spreads.get(name, 0.0), baseline_spreads.get(name, 0.0))
+        if change > allowed:
+            regressions.append((name, before, now, change, allowed))
+    return regressions
+
+
+def Machine():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'system': platform.system(),
+            'processor': platform.processor()}
+
+
+def Suite(args, log=sys.stdout):
+    sections = args.only.split(',')
+    measures = []
+    if 'rules' in sections:
+        measures.extend(RuleMeasures())
+    if 'engine' in sections:
+        measures.extend(EngineMeasures())
+    metrics, spreads = Measure(measures, args.repeat)
+    if 'gui' in sections:
+        gui, gui_spreads = RunGui(args.gui_python, args.repeat, log)
+        metrics.update(gui)
+        spreads.update(gui_spreads)
+
+    baseline, baseline_spreads = {}, {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as source:
+            saved = json.load(source)
+        baseline = saved['metrics']
+        baseline_spreads = saved.get('spreads', {})
+        if saved.get('machine') != Machine():
+            print('note: baseline was measured on %s' % saved.get('machine'), file=log)
+
+    for name, value in sorted(metrics.items()):
+        before = baseline.get(name)
+        compared = '' if not before else '  (baseline %.1f, %+.0f%%)' % (before, 100*(value/before - 1))
+        print('%-32s %12.1f  spread %3.0f%%%s' % (name, value, 100*spreads.get(name, 0.0), compared), file=log)
+
+    if args.save:
+        with open(args.baseline, 'w') as out:
+            json.dump({'machine': Machine(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'metrics': metrics,
+                       'spreads': spreads}, out, indent=1, sort_keys=True)
+        print('saved %d measurements to %s' % (len(metrics), args.baseline), file=log)
+        return 0
+    if not baseline:
+        print('no baseline yet, run with --save to make one', file=log)
+        return 0
+    regressions = Compare(metrics, baseline, args.threshold, spreads, baseline_spreads)
+    for name, before, now, change, allowed in regressions:
+        print('REGRESSION %s: %.1f -> %.1f (%.0f%% slower, %.0f%% allowed)'
+              % (name, before, now, 100*change, 100*allowed), file=log)
+    if regressions:
+        return 1
+    print('no regressions beyond %.0f%% plus noise' % (100*args.threshold), file=log)
+    return 0
+
+
+## ------------ LARGE BOARDS ------------##
+def Large(args):
+    sizes = [int(size) for size in args.sizes.split(',')]
+    slow = []
+    print('%5s %12s %12s %12s %9s %6s %9s %9s %9s' % ('size', 'movegen/s', 'turns/s', 'partition/s', 'nps',
+                                                      'depth', 'build ms', 'cell ms', 'paint ms'))
+    for size in sizes:
+        state = Position(size)
+        rules = Rules(state)
+        engine = Engine(state, args.time)
+        gui = Rendering(size)
+        line = '%5d %12.0f %12.0f %12.0f %9.0f %6d' % (size, rules['movegen'], rules['turns'], rules['partition'],
+                                                     engine['nps'], engine['depth'])
+        if gui is None:
+            line += '   (no wx, GUI not measured)'
+        else:
+            line += ' %9.1f %9.2f %9.2f' % (gui['build']*1000, gui['cell']*1000, gui['paint']*1000)
+            if max(gui['cell'], gui['paint']) > INTERACTIVE:
+                slow.append(size)
+        print(line)
+    if slow:
+        print('slower than %.0f ms per click on %s' % (INTERACTIVE*1000, ', '.join('%dx%d' % (s, s) for s in slow)))
+        return 1
+    return 0
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description='Isolation benchmarks.')
+    sub = parser.add_subparsers(dest='command')
+    suite = sub.add_parser('suite', help='rules, engine and GUI on 3x3 to 11x11, checked against a baseline')
+    suite.add_argument('--baseline', default=BASELINE)
+    suite.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    suite.add_argument('--threshold', type=float, default=THRESHOLD,
+                       help='relative slowdown beyond the measured spread that fails the run')
+    suite.add_argument('--repeat', type=int, default=REPEAT)
+    suite.add_argument('--only', default='rules,engine,gui', help='comma separated sections')
+    suite.add_argument('--gui-python', default=sys.executable, help='interpreter with wx for the GUI section')
+    gui = sub.add_parser('gui', help='GUI section of the suite as JSON (used by suite)')
+    gui.add_argument('--repeat', type=int, default=REPEAT)
+    large = sub.add_parser('large', help='rules, engine and GUI speed on large boards')
+    large.add_argument('--sizes', default='16,32,64')
+    large.add_argument('--time', type=float, default=2.0, help='seconds of engine search per size')
+    args = parser.parse_args(argv)
+    if args.command == 'suite':
+        return Suite(args)
+    if args.command == 'gui':
+        try:
+            metrics, spreads = Measure(GuiMeasures(), args.repeat)
+            print(json.dumps({'metrics': metrics, 'spreads': spreads}))
+        except ImportError as error:
+            print(error, file=sys.stderr)
+            return 1
+        return 0
+    if args.command == 'large':
+        return Large(args)
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8
+""" Opening books: the best turn of the positions every game starts with,
+    searched deeply once and stored for instant play.
+
+    Games always start from the same squares (gamestate.StartSquares), so
+    the first turns are the same search every game. For each side the
+    builder follows that side's searched best turns against every legal
+    opponent turn for the opponent's first --wide turns (and against the
+    opponent's own best turn after that) down to --deep turns from the
+    start, searching each position for --time seconds (or to --depth) on a
+    process pool:
+
+    python book.py --sizes 5x5,7x7 --wide 1 --deep 6 --time 5
+
+    writes book-5x5.bin and book-7x7.bin next to this script. A book is a
+    header and fixed-size records (canonical Zobrist key, best turn in the
+    canonical orientation, score, depth) sorted by key, so it is probed with
+    a binary search over a read-only mmap. Mirrored positions share a record,
+    as in the transposition table. """
+from __future__ import print_function
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+from gamestate import IsolationState
+from transposition import Hasher
+
+MAGIC = b'ISOB'
+VERSION = 2  # 2: Zobrist keys depend on the board size
+HEADER = struct.Struct('<4sBBBBI')  # magic, version, width, height, turns deep, records
+RECORD = struct.Struct('<QHHiB')  # canonical key, to, remove, score, depth
+KEY = struct.Struct('<Q')
+
+_ENGINE = None  # one per builder process
+
+
+def BookPath(width, height, directory=None):
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(directory, 'book-%dx%d.bin' % (width, height))
+
+
+def CanonicalKey(state):
+    """ (key, symmetry) of state, as the transposition table computes them """
+    hasher = Hasher(state.width, state.height)
+    return hasher.Canonical(hasher.Keys(state))
+
+
+def IsLegalTurn(state, to, remove):
+    """ Whether (to, remove) can be played by the player to move """
+    if not state.IsLegalMove(to) or remove == to:
+        return False
+    return not (state.blocked ^ (1 << state.pawns[state.player])) >> remove & 1
+
+
+## ------------ LOOKUPS ------------##
+class OpeningBook(object):
+    """ Read-only view of a book file """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, height, self.turns, self.count = HEADER.unpack(self.data[:HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            self.Close()
+            raise ValueError('%s is not an opening book' % path)
+        if len(self.data) != HEADER.size + self.count*RECORD.size:
+            self.Close()
+            raise ValueError('%s is truncated or from another version' % path)
+        self.width = width
+        self.height = height
+        self.hasher = Hasher(width, height)
+
+    def Close(self):
+        self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def Covers(self, state):
+        return state.width == self.width and state.height == self.height
+
+    def Find(self, key):
+        """ (to, remove, score, depth) stored under a canonical key, or None """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            found = KEY.unpack_from(self.data, HEADER.size + middle*RECORD.size)[0]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return RECORD.unpack_from(self.data, HEADER.size + middle*RECORD.size)[1:]
+        return None
+
+    def Probe(self, state):
+        """ ((to, remove), score, depth) for the player to move, or None when
+            the position is not in the book """
+        if not self.Covers(state):
+            return None
+        key, symmetry = self.hasher.Canonical(self.hasher.Keys(state))
+        entry = self.Find(key)
+        if entry is None:
+            return None
+        to, remove, score, depth = entry
+        to, remove = self.hasher.FromCanonical(symmetry, to), self.hasher.FromCanonical(symmetry, remove)
+        # another position can share the key, check the turn fits this one
+        if not IsLegalTurn(state, to, remove):
+            return None
+        return (to, remove), score, depth
+
+
+def OpenBook(width, height, directory=None):
+    """ The opening book for the board size, or None if none was built """
+    path = BookPath(width, height, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path)
+    except (ValueError, EnvironmentError):
+        return None
+
+
+## ------------ BUILDING ------------##
+def StartWorker(engine_kwargs):
+    global _ENGINE
+    from engine import AlphaBetaEngine
+    _ENGINE = AlphaBetaEngine(**engine_kwargs)
+
+
+def SearchPosition(task):
+    """ (key, symmetry, turn, score, depth) of one book position """
+    width, height, pawns, destroyed, player, time_limit, depth = task
+    state = IsolationState(width, height, pawns, destroyed, player)
+    key, symmetry = CanonicalKey(state)
+    turn = _ENGINE.Search(state, time_limit, depth)
+    return key, symmetry, turn, _ENGINE.stats['score'], _ENGINE.stats['depth']
+
+
+def Turns(state):
+    """ Every legal turn of the player to move """
+    return [(to, remove) for to in state.LegalMoves()
+            for remove in range(state.size) if IsLegalTurn(state, to, remove)]
+
+
+def Build(width, height, wide, deep, time_limit=None, depth=None, processes=None, engine_kwargs=None, log=None):
+    """ {canonical key: (to, remove, score, depth)} of the opening, with turns
+        in the canonical orientation.
+
+        Grows one line of play per side, one turn level at a time: the side
+        the book is for plays its searched best turn, its opponent plays
+        every legal turn for its first `wide` turns and its own searched best
+        turn after that. """
+    searched = {}  # canonical key -> book entry, None when every turn loses
+    hasher = Hasher(width, height)
+    start_state = IsolationState(width, height)
+    level = [(start_state, CanonicalKey(start_state), side) for side in (0, 1)]
+    pool = multiprocessing.Pool(processes or None, StartWorker, (engine_kwargs or {},))
+    try:
+        for turn_number in range(deep):
+            widened = turn_number // 2 < wide  # the opponent plays anything this turn
+            # mirrored positions and positions on both sides' lines are searched once
+            unique = {}
+            for state, (key, symmetry), side in level:
+                if (state.player == side or not widened) and key not in searched:
+                    unique.setdefault(key, state)
+            positions = list(unique.values())
+            tasks = [(width, height, s.pawns, s.destroyed, s.player, time_limit, depth) for s in positions]
+            started = time.time()
+            for key, symmetry, (to, remove), score, reached in pool.map(SearchPosition, tasks, chunksize=1):
+                if remove is None:
+                    searched[key] = None  # every move loses on the spot, nothing worth storing
+                else:
+                    searched[key] = (hasher.ToCanonical(symmetry, to), hasher.ToCanonical(symmetry, remove),
+                                     int(round(score)), min(reached, 255))
+
+            following, seen = [], set()
+            for state, (key, symmetry), side in level if turn_number+1 < deep else ():
+                if state.player != side and widened:
+                    turns = Turns(state)
+                elif searched[key] is None:
+                    continue
+                else:
+                    to, remove = searched[key][:2]
+                    turns = [(hasher.FromCanonical(symmetry, to), hasher.FromCanonical(symmetry, remove))]
+                for turn in turns:
+                    child = state.Copy()
+                    child.MakeMove(*turn)
+                    keys = CanonicalKey(child)
+                    if not child.IsIsolated() and (keys[0], side) not in seen:
+                        seen.add((keys[0], side))
+                        following.append((child, keys, side))
+            level = following
+            if log:
+                print('%dx%d turn %d: %d positions searched in %.1fs, %d to follow'
+                      % (width, height, turn_number+1, len(positions), time.time() - started, len(level)), file=log)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return dict((key, entry) for key, entry in searched.items() if entry is not None)
+
+
+def Write(path, width, height, deep, book):
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, width, height, deep, len(book)))
+        for key in sorted(book):
+            out.write(RECORD.pack(key, *book[key]))
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description='Build opening books by deep offline search.')
+    parser.add_argument('--sizes', default='7x7', help='comma separated WxH board sizes')
+    parser.add_argument('--wide', type=int, default=1, help='opponent turns answered whatever they are')
+    parser.add_argument('--deep', type=int, default=6, help='turns from the start the book reaches')
+    parser.add_argument('--time', type=float, default=5.0, help='seconds of search per position')
+    parser.add_argument('--depth', type=int, default=None, help='depth per position instead of a time limit')
+    parser.add_argument('--processes', type=int, default=0, help='worker processes (default: all cores)')
+    parser.add_argument('--engine', default='', help='alpha-beta settings, as for tournament.py')
+    parser.add_argument('--dir', default=None, help='where to write the books (default: next to this script)')
+    args = parser.parse_args(argv)
+
+    from tournament import ParseEngine
+    engine_kwargs = ParseEngine(args.engine)
+    if 'engine' in engine_kwargs:
+        parser.error('books are always built with the alpha-beta engine')
+    sizes = []
+    for size in args.sizes.split(','):
+        try:
+            width, height = [int(side) for side in size.lower().split('x')]
+        except ValueError:
+            parser.error('sizes look like 7x7')
+        if not 3 <= width <= 64 or not 3 <= height <= 64:
+            parser.error('board sides must be between 3 and 64')
+        sizes.append((width, height))
+    if args.wide < 0 or not 1 <= args.deep <= 255:
+        parser.error('need --wide >= 0 and 1 <= --deep <= 255')
+
+    time_limit = None if args.depth else args.time
+    for width, height in sizes:
+        start = time.time()
+        book = Build(width, height, args.wide, args.deep, time_limit, args.depth, args.processes or None,
+                     engine_kwargs, sys.stderr)
+        path = BookPath(width, height, args.dir)
+        Write(path, width, height, args.deep, book)
+        print('%dx%d: %d positions, %d bytes (%.1fs)' % (width, height, len(book), os.path.getsize(path),
+                                                         time.time() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
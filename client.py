@@ -0,0 +1,60 @@
+# -*- coding: utf-8
+""" Blocking client for server.py, usable from the wx GUI on Python 2.
+
+    Messages are sent from the caller's thread and received on a daemon
+    thread, which hands every decoded message (and None once the connection
+    closes) to a deliver callback. """
+import json
+import socket
+import threading
+
+PORT = 7770
+
+
+def ParseAddress(text):
+    """ 'host:port', 'unix:/path' or either with '#game' to join a running
+        game -> (address, family, game) """
+    game = None
+    if '#' in text:
+        text, game = text.rsplit('#', 1)
+        game = int(game)
+    if text.startswith('unix:'):
+        return text[len('unix:'):], socket.AF_UNIX, game
+    host, _, port = text.partition(':')
+    return (host or 'localhost', int(port or PORT)), socket.AF_INET, game
+
+
+class GameClient(object):
+    def __init__(self, text, deliver, timeout=5.0):
+        address, family, self.game = ParseAddress(text)
+        self.deliver = deliver
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(address)
+        self.socket.settimeout(None)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.Run, name='isolation-client')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def Send(self, message):
+        data = (json.dumps(message) + '\n').encode('utf-8')
+        with self.lock:
+            self.socket.sendall(data)
+
+    def Run(self):
+        stream = self.socket.makefile('rb')
+        try:
+            for line in iter(stream.readline, b''):
+                self.deliver(json.loads(line.decode('utf-8')))
+        except (socket.error, ValueError):
+            pass
+        finally:
+            self.deliver(None)
+
+    def Close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.socket.close()
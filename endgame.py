@@ -0,0 +1,179 @@
+# -*- coding: utf-8
+""" Exact solver for partitioned endgames.
+
+    Once neither pawn can ever reach or touch the other's region, each turn
+    is a move inside your own region followed by a removal, and removing a
+    cell from the opponent's region is always at least as good as anything
+    else. Each region can then be scored on its own as "how many more moves
+    can this pawn make while the opponent deletes one of its cells between
+    moves", and the player who can keep moving longer wins.
+
+    The counts are found with yes/no searches ("can the pawn make k more
+    moves?") which cut off as soon as one answer is known, and every region
+    keeps the bounds learned so far. """
+import time
+
+from gamestate import BitIndices, PopCount
+
+CHECK_EVERY = 63
+
+
+class EndgameBudget(Exception):
+    pass
+
+
+## ------------ ENDGAME SOLVER ------------##
+class EndgameSolver(object):
+    """ Bounds are memoized on (region bitmask, pawn square), which is all a
+        region needs to know about the rest of the board. """
+    def __init__(self, state, max_entries=2000000):
+        self.width = state.width
+        self.height = state.height
+        self.state = state.Copy()
+        self.neighbours = state.neighbours
+        self.max_entries = max_entries
+        self.bounds = {}
+        self.nodes = 0
+        self.budget = None
+        self.deadline = None
+        self.expired = None
+
+    def Tick(self):
+        self.nodes += 1
+        if self.budget is not None and self.nodes > self.budget:
+            raise EndgameBudget()
+        if not self.nodes & CHECK_EVERY:
+            if self.deadline is not None and time.time() > self.deadline:
+                raise EndgameBudget()
+            if self.expired is not None and self.expired():
+                raise EndgameBudget()
+
+    def CanSurvive(self, free, pawn, k):
+        """ Can the pawn on `pawn`, about to move inside region `free`, make k
+            more moves while the opponent removes a cell after each one? """
+        if k <= 0:
+            return True
+        size = PopCount(free)
+        if size < k:
+            # every round costs the region a cell
+            return False
+        key = (free, pawn)
+        low, high = self.bounds.get(key, (0, size))
+        if low >= k:
+            return True
+        if high < k:
+            return False
+        self.Tick()
+
+        neighbours = self.neighbours
+        flood = self.state.FloodFill
+        moves = []
+        for to in BitIndices(neighbours[pawn] & free):
+            after = flood(1 << to, (free ^ (1 << to)) | (1 << pawn))
+            if neighbours[to] & after:
+                moves.append((-PopCount(neighbours[to] & after), to, after))
+        moves.sort()
+
+        result = False
+        for _, to, after in moves:
+            if self.Attacked(after, to, k-1):
+                result = True
+                break
+
+        if len(self.bounds) >= self.max_entries:
+            self.bounds.clear()
+        if result:
+            self.bounds[key] = (max(low, k), high)
+        else:
+            self.bounds[key] = (low, min(high, k-1))
+        return result
+
+    def Attacked(self, free, pawn, k):
+        """ Can the pawn still make k moves whatever cell the opponent removes first? """
+        if k <= 0:
+            return True
+        if PopCount(free) <= k:
+            return False
+        flood = self.state.FloodFill
+        near = self.neighbours[pawn]
+        # cells next to the pawn are the likeliest refutations
+        for remove in list(BitIndices(free & near)) + list(BitIndices(free & ~near)):
+            if not self.CanSurvive(flood(1 << pawn, free ^ (1 << remove)), pawn, k):
+                return False
+        return True
+
+    def Survive(self, free, pawn):
+        """ Exact number of moves the pawn can make, moving first """
+        k = 0
+        while self.CanSurvive(free, pawn, k+1):
+            k += 1
+        return k
+
+    def Survivable(self, free, pawn):
+        """ Exact number of moves the pawn can make when the opponent removes first """
+        k = 0
+        while self.Attacked(free, pawn, k+1):
+            k += 1
+        return k
+
+    def BestMove(self, free, pawn, k):
+        """ A move that still lets the pawn make k moves in total """
+        fallback = None
+        for to in BitIndices(self.neighbours[pawn] & free):
+            after = self.state.FloodFill(1 << to, (free ^ (1 << to)) | (1 << pawn))
+            if fallback is None:
+                fallback = to
+            if self.neighbours[to] & after and self.Attacked(after, to, k-1):
+                return to
+        return fallback
+
+    def BestRemoval(self, free, pawn, k):
+        """ A removal after which the pawn cannot make k moves """
+        for remove in BitIndices(free):
+            if not self.CanSurvive(self.state.FloodFill(1 << pawn, free ^ (1 << remove)), pawn, k):
+                return remove
+        return None
+
+    def Solve(self, state, budget=None, best_turn=True, deadline=None, max_cells=None, expired=None):
+        """ Returns (winner, turns, (to, remove)) for a partitioned position with
+            the player to move about to move, or None if it is not partitioned.
+            `turns` counts whole turns until the loser is stuck. Raises
+            EndgameBudget when the regions hold more than `max_cells` free cells,
+            more than `budget` positions would be needed, the deadline passes
+            or expired() (polled like the deadline) returns True. """
+        regions = state.Partition()
+        if regions is None:
+            return None
+        if max_cells is not None and PopCount(regions[0] | regions[1]) > max_cells:
+            raise EndgameBudget()
+        self.nodes = 0
+        self.budget = budget
+        self.deadline = deadline
+        self.expired = expired
+        try:
+            own, other = regions
+            mine, theirs = state.pawns[state.player], state.pawns[1-state.player]
+            opponent = self.Survivable(other, theirs)
+            if self.CanSurvive(own, mine, opponent+1):
+                winner, ours = state.player, opponent+1
+                turns = 2*opponent + 1
+            else:
+                winner, ours = 1 - state.player, self.Survive(own, mine)
+                turns = 2*ours
+            turn = None
+            if best_turn and ours:
+                to = self.BestMove(own, mine, ours)
+                remove = None
+                if other:
+                    remove = self.BestRemoval(other, theirs, opponent+1)
+                if remove is None:
+                    # nothing left to take from the opponent, burn a cell we can spare
+                    after = self.state.FloodFill(1 << to, (own ^ (1 << to)) | (1 << mine))
+                    spare = state.FreeMask() & ~(1 << to) & ~after
+                    remove = (spare or other or after).bit_length() - 1
+                turn = (to, remove)
+        finally:
+            self.budget = None
+            self.deadline = None
+            self.expired = None
+        return winner, turns, turn
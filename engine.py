@@ -0,0 +1,419 @@
+# -*- coding: utf-8
+""" Alpha-beta computer player built on the headless IsolationState.
+
+    The search works on whole turns (a move followed by a removal) with
+    negamax, iterative deepening and a wall-clock budget. Only removals near
+    the opponent's pawn are tried by default, which keeps the branching
+    factor on 11x11 boards close to that of a 5x5 board. """
+import time
+
+from gamestate import BitIndices, PopCount
+from endgame import EndgameSolver, EndgameBudget
+from transposition import Hasher, TranspositionTable, EXACT, LOWER, UPPER
+
+WIN = 1000000
+INFINITY = 10*WIN
+MATE = WIN - 1000
+CHECK_EVERY = 1023
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def RadiusMasks(state, radius):
+    """ For each cell, the mask of cells within `radius` king steps of it """
+    masks = []
+    for index in range(state.size):
+        mask = 1 << index
+        for _ in range(radius):
+            grown = mask
+            for i in BitIndices(mask):
+                grown |= state.neighbours[i]
+            mask = grown
+        masks.append(mask & ~(1 << index))
+    return masks
+
+
+def GrowthRate(totals):
+    """ Effective branching factor: nodes of the last full iteration over
+        those of the one before, from running node totals per iteration """
+    sizes = [b - a for a, b in zip([0] + totals, totals)]
+    if len(sizes) < 2 or not sizes[-2]:
+        return 0.0
+    return float(sizes[-1])/sizes[-2]
+
+
+## ------------ ALPHA-BETA ENGINE ------------##
+class AlphaBetaEngine(object):
+    def __init__(self, own_weight=1.0, opp_weight=2.0, max_depth=40, removal_radius=1, tt_bits=18,
+                 endgame_budget=1000, endgame_cells=20, root_endgame_budget=100000, database=None,
+                 evaluation=None, book=None):
+        self.own_weight = own_weight
+        self.opp_weight = opp_weight
+        self.max_depth = max_depth
+        self.removal_radius = removal_radius
+        self.radius_masks = {}
+        self.table = TranspositionTable(tt_bits) if tt_bits else None
+        self.endgame_budget = endgame_budget
+        self.endgame_cells = endgame_cells
+        self.root_endgame_budget = root_endgame_budget
+        self.solvers = {}
+        # a retrograde.OutcomeDatabase, played from instantly on the board it covers
+        self.database = database
+        # replaces the mobility score: any callable(state), or a weights file from features.py fit
+        if isinstance(evaluation, str):
+            from features import LinearEvaluation
+            evaluation = LinearEvaluation.Load(evaluation)
+        self.evaluation = evaluation
+        # a book.OpeningBook (or its path): opening turns are played from it without searching
+        if isinstance(book, str):
+            from book import OpeningBook
+            book = OpeningBook(book)
+        self.book = book
+        self.stats = {}
+        # anything with an Expired() method can end a search early, see thinker.py
+        self.control = None
+        self.deadline = None
+
+    def Expired(self):
+        if self.deadline and time.time() > self.deadline:
+            return True
+        return self.control is not None and self.control.Expired()
+
+    def Evaluate(self, state):
+        """ Mobility score from the point of view of the player to move """
+        if self.evaluation is not None:
+            return self.evaluation(state)
+        player = state.player
+        free = ~state.blocked
+        own = PopCount(state.neighbours[state.pawns[player]] & free)
+        opp = PopCount(state.neighbours[state.pawns[1-player]] & free)
+        return self.own_weight*own - self.opp_weight*opp
+
+    def RemovalZone(self, state, opponent):
+        """ Cells that are worth removing when the opponent stands on `opponent` """
+        if self.removal_radius is None:
+            return state.full
+        key = (state.width, state.height, self.removal_radius)
+        masks = self.radius_masks.get(key)
+        if masks is None:
+            masks = self.radius_masks[key] = RadiusMasks(state, self.removal_radius)
+        return masks[opponent]
+
+    def Solver(self, state):
+        key = (state.width, state.height)
+        solver = self.solvers.get(key)
+        if solver is None:
+            solver = self.solvers[key] = EndgameSolver(state)
+        return solver
+
+    def Endgame(self, state, ply):
+        """ Exact score of a partitioned position, or None if the position is
+            not partitioned or too big for the endgame budget """
+        try:
+            result = self.Solver(state).Solve(state, self.endgame_budget, False, self.deadline, self.endgame_cells,
+                                                      self.Expired)
+        except EndgameBudget:
+            return None
+        if result is None:
+            return None
+        self.endgames += 1
+        winner, turns = result[:2]
+        if winner == state.player:
+            return WIN - (ply + turns)
+        return -WIN + ply + turns
+
+    def Turns(self, state, first=None):
+        """ Yields (to, remove) pairs for the player to move, best guesses first.
+            A move that leaves the mover without a free neighbour loses on the
+            spot, so it is yielded with remove=None. """
+        player = state.player
+        neighbours = state.neighbours
+        frm = state.pawns[player]
+        opponent = state.pawns[1-player]
+        zone = self.RemovalZone(state, opponent)
+        base = state.blocked ^ (1 << frm)
+
+        ordered = []
+        for to in BitIndices(state.MoveMask()):
+            blocked = base | (1 << to)
+            own = PopCount(neighbours[to] & ~blocked)
+            ordered.append((-own, to))
+        ordered.sort()
+        if first is not None:
+            for i, item in enumerate(ordered):
+                if item[1] == first[0]:
+                    ordered.insert(0, ordered.pop(i))
+                    break
+
+        for own, to in ordered:
+            blocked = base | (1 << to)
+            if not own:
+                yield to, None
+                continue
+            candidates = zone & ~blocked & state.full
+            if not candidates:
+                # opponent is already boxed in, any removal away from us will do
+                free = state.full & ~blocked
+                candidates = free & ~neighbours[to] or free
+                yield to, candidates.bit_length() - 1
+                continue
+            removals = list(BitIndices(candidates))
+            if first is not None and first[0] == to and first[1] in removals:
+                removals.remove(first[1])
+                removals.insert(0, first[1])
+            else:
+                # cells next to the opponent but away from us hurt only them
+                near_opp = neighbours[opponent]
+                mine = neighbours[to]
+                removals.sort(key=lambda r: (not near_opp >> r & 1, mine >> r & 1))
+            for remove in removals:
+                yield to, remove
+
+    def Search(self, state, time_limit=None, depth=None):
+        """ Returns the best (to, remove) turn for the player about to move,
+            or (None, None) when that player is already isolated. Deepens on a
+            copy of state until `depth`, max_depth or time_limit seconds is
+            reached. """
+        start = time.time()
+        self.deadline = start + time_limit if time_limit else None
+        self.nodes = 0
+        state = state.Copy()
+        max_depth = depth or self.max_depth
+        self.hasher = Hasher(state.width, state.height)
+        self.endgames = 0
+        # expanded nodes, children searched, beta cutoffs, cutoffs on the first child
+        self.expanded = self.children = self.cutoffs = self.first_cutoffs = 0
+        iteration_nodes = []
+        if self.table:
+            self.table.NewSearch()
+
+        best, score, reached = None, -INFINITY, 0
+        if state.IsIsolated():
+            # already lost, there is no turn to play
+            best, score, max_depth = (None, None), -WIN, 0
+        else:
+            if self.database is not None and self.database.Covers(state):
+                return self.Lookup(state, start)
+            if self.book is not None:
+                found = self.book.Probe(state)
+                if found is not None:
+                    return self.BookTurn(found, start)
+            solved = self.SolveRoot(state)
+            if solved is not None:
+                best, score = solved
+                max_depth = 0
+        for d in range(1, max_depth+1):
+            try:
+                turn, value = self.Root(state, d, best)
+            except SearchTimeout:
+                break
+            best, score, reached = turn, value, d
+            iteration_nodes.append(self.nodes)
+            if abs(score) >= MATE:
+                break
+            if self.deadline and time.time() - start > (self.deadline - start)/2.0:
+                break
+        if best is None:
+            best = next(self.Turns(state))
+
+        elapsed = time.time() - start
+        self.stats = {
+            'nodes': self.nodes,
+            'depth': reached,
+            'score': score,
+            'time': elapsed,
+            'nps': self.nodes/elapsed if elapsed else 0,
+            'endgames': self.endgames,
+            'branching': float(self.children)/self.expanded if self.expanded else 0.0,
+            'cutoff_rate': float(self.cutoffs)/self.expanded if self.expanded else 0.0,
+            'first_cutoff_rate': float(self.first_cutoffs)/self.cutoffs if self.cutoffs else 0.0,
+            'ebf': GrowthRate(iteration_nodes),
+        }
+        if self.table:
+            self.stats.update(self.table.Stats())
+        return best
+
+    def Lookup(self, state, start):
+        """ The database's turn, with the same stats a search would leave """
+        turn, wins, turns = self.database.BestTurn(state)
+        if turn is None:
+            turn = next(self.Turns(state))
+        elapsed = time.time() - start
+        self.stats = {
+            'nodes': 0,
+            'depth': turns,
+            'score': WIN - turns if wins else -WIN + turns,
+            'time': elapsed,
+            'nps': 0,
+            'endgames': 0,
+            'database': True,
+        }
+        return turn
+
+    def BookTurn(self, found, start):
+        """ The opening book's turn, with the stats of the offline search """
+        turn, score, depth = found
+        elapsed = time.time() - start
+        self.stats = {
+            'nodes': 0,
+            'depth': depth,
+            'score': score,
+            'time': elapsed,
+            'nps': 0,
+            'endgames': 0,
+            'book': True,
+        }
+        return turn
+
+    def PrincipalVariation(self, state, turn, limit=None):
+        """ The line the last search expects, starting with its best turn:
+            later turns come from the database, the opening book or the
+            transposition table for as long as they have one. Stops after
+            `limit` turns (default: the depth searched) or once a turn ends
+            the game. """
+        limit = limit or max(1, self.stats.get('depth', 1))
+        state = state.Copy()
+        line = []
+        while turn is not None and len(line) < limit:
+            line.append(turn)
+            if turn[1] is None:
+                break
+            state.MakeMove(*turn)
+            if state.IsIsolated():
+                break
+            turn = self.KnownTurn(state)
+        return line
+
+    def KnownTurn(self, state):
+        """ The stored best turn of state, if any and still legal """
+        if self.database is not None and self.database.Covers(state):
+            return self.database.BestTurn(state)[0]
+        if self.book is not None:
+            found = self.book.Probe(state)
+            if found is not None:
+                return found[0]
+        if not self.table:
+            return None
+        hasher = Hasher(state.width, state.height)
+        key, symmetry = hasher.Canonical(hasher.Keys(state))
+        entry = self.table.Probe(key)
+        if entry is None or entry[3] is None:
+            return None
+        to, remove = (hasher.FromCanonical(symmetry, entry[3][0]), hasher.FromCanonical(symmetry, entry[3][1]))
+        # a different position can share the key, check the turn fits this one
+        if not state.IsLegalMove(to) or remove == to or (state.blocked ^ (1 << state.pawns[state.player])) >> remove & 1:
+            return None
+        return to, remove
+
+    def SolveRoot(self, state):
+        """ (turn, score) straight from the endgame solver, when it applies """
+        try:
+            result = self.Solver(state).Solve(state, self.root_endgame_budget, deadline=self.deadline,
+                                               expired=self.Expired)
+        except EndgameBudget:
+            return None
+        if result is None or result[2] is None:
+            return None
+        self.endgames += 1
+        winner, turns, turn = result
+        if winner == state.player:
+            return turn, WIN - turns
+        return turn, -WIN + turns
+
+    def Root(self, state, depth, first):
+        alpha, beta = -INFINITY, INFINITY
+        best, best_score = None, -INFINITY
+        keys = self.hasher.Keys(state)
+        frm, opp = state.pawns[state.player], state.pawns[1-state.player]
+        for to, remove in self.Turns(state, first):
+            if remove is None:
+                score = -WIN
+            else:
+                state.MakeMove(to, remove)
+                child = self.hasher.Child(keys, frm, opp, to, remove)
+                score = -self.Negamax(state, depth-1, -beta, -alpha, 1, child)
+                state.UnmakeMove()
+            if score > best_score or best is None:
+                best, best_score = (to, remove), score
+            if score > alpha:
+                alpha = score
+        return best, best_score
+
+    def Negamax(self, state, depth, alpha, beta, ply, keys):
+        self.nodes += 1
+        if not self.nodes & CHECK_EVERY and self.Expired():
+            raise SearchTimeout()
+        if state.IsIsolated():
+            return -WIN + ply
+        if depth == 0:
+            return self.Evaluate(state)
+        if self.endgame_budget:
+            score = self.Endgame(state, ply)
+            if score is not None:
+                return score
+
+        table, hasher = self.table, self.hasher
+        first = None
+        if table:
+            key, symmetry = hasher.Canonical(keys)
+            entry = table.Probe(key)
+            if entry is not None:
+                edepth, score, flag, turn = entry[:4]
+                if score >= MATE:
+                    score -= ply
+                elif score <= -MATE:
+                    score += ply
+                if edepth >= depth and (flag == EXACT or
+                        (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha)):
+                    table.Cutoff(entry)
+                    return score
+                if turn is not None:
+                    first = (hasher.FromCanonical(symmetry, turn[0]), hasher.FromCanonical(symmetry, turn[1]))
+        start_nodes = self.nodes
+        alpha_orig = alpha
+
+        frm, opp = state.pawns[state.player], state.pawns[1-state.player]
+        best, best_turn = -INFINITY, None
+        searched = 0
+        for to, remove in self.Turns(state, first):
+            searched += 1
+            if remove is None:
+                score = -WIN + ply
+            else:
+                state.MakeMove(to, remove)
+                child = hasher.Child(keys, frm, opp, to, remove)
+                score = -self.Negamax(state, depth-1, -beta, -alpha, ply+1, child)
+                state.UnmakeMove()
+            if score > best:
+                best = score
+                if remove is not None:
+                    best_turn = (to, remove)
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        if searched == 1:
+                            self.first_cutoffs += 1
+                        break
+        self.expanded += 1
+        self.children += searched
+
+        if table:
+            if best <= alpha_orig:
+                flag = UPPER
+            elif best >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            stored = best
+            if stored >= MATE:
+                stored += ply
+            elif stored <= -MATE:
+                stored -= ply
+            turn = None
+            if best_turn is not None:
+                turn = (hasher.ToCanonical(symmetry, best_turn[0]), hasher.ToCanonical(symmetry, best_turn[1]))
+            table.Store(key, depth, stored, flag, turn, self.nodes - start_nodes)
+        return best
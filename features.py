@@ -0,0 +1,316 @@
+# -*- coding: utf-8
+""" Evaluation features for whole batches of positions, and linear
+    evaluations fitted to them.
+
+    Boards come as an (N, H, W) array with 1 for destroyed cells plus an
+    (N, 2, 2) array of pawn (row, col), the player to move first. Every
+    feature is computed for the whole batch at once: mobility is a 3x3
+    convolution of the free cells, regions and distances are flood fills
+    where each step dilates every board of the batch together.
+
+    python features.py dataset --records games.rec --out games
+    python features.py fit --data games --out weights.json
+
+    The first writes games-features.npy and games-labels.npy (+1 when the
+    player to move went on to win) as memory-mapped files, the second fits
+    a ridge regression to them. tournament.py and AlphaBetaEngine take the
+    result as evaluation=weights.json. numpy is only needed for the batch
+    functions; StateFeatures and LinearEvaluation work on a single
+    IsolationState without it. """
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from gamestate import PopCount
+
+FEATURES = (
+    'own_mobility', 'opp_mobility',      # free neighbours of each pawn
+    'own_mobility2', 'opp_mobility2',    # free cells within two steps over free cells
+    'own_region', 'opp_region',          # free cells each pawn could ever reach
+    'own_closer', 'opp_closer',          # free cells each pawn reaches strictly first
+    'pawn_distance',                     # king steps between the pawns
+    'partitioned',                       # 1 once the pawns can never meet again
+)
+CHUNK = 65536  # positions per batch when building a dataset
+
+
+def RequireNumpy():
+    if np is None:
+        raise ImportError('the batch feature functions need numpy')
+
+
+## ------------ SINGLE POSITIONS (NO NUMPY) ------------##
+def Race(state):
+    """ (own_closer, opp_closer): breadth-first search from both pawns at once """
+    free = state.FreeMask()
+    seen = [1 << state.pawns[state.player], 1 << state.pawns[1-state.player]]
+    closer = [0, 0]
+    while True:
+        new = [state.Dilate(seen[0]) & free & ~seen[0], state.Dilate(seen[1]) & free & ~seen[1]]
+        if not new[0] and not new[1]:
+            return closer[0], closer[1]
+        closer[0] |= new[0] & ~seen[1] & ~new[1]
+        closer[1] |= new[1] & ~seen[0] & ~new[0]
+        seen[0] |= new[0]
+        seen[1] |= new[1]
+
+
+def StateFeatures(state, names=FEATURES):
+    """ The named features of an IsolationState, same values as Features() """
+    free = state.FreeMask()
+    mine, theirs = state.pawns[state.player], state.pawns[1-state.player]
+    values = {}
+    wanted = set(names)
+    if wanted & set(('own_mobility', 'opp_mobility', 'own_mobility2', 'opp_mobility2')):
+        own1, opp1 = state.neighbours[mine] & free, state.neighbours[theirs] & free
+        values['own_mobility'] = PopCount(own1)
+        values['opp_mobility'] = PopCount(opp1)
+        values['own_mobility2'] = PopCount(state.Dilate(own1) & free)
+        values['opp_mobility2'] = PopCount(state.Dilate(opp1) & free)
+    if wanted & set(('own_region', 'opp_region')):
+        values['own_region'] = PopCount(state.FloodFill(1 << mine, free))
+        values['opp_region'] = PopCount(state.FloodFill(1 << theirs, free))
+    if wanted & set(('own_closer', 'opp_closer')):
+        own, opp = Race(state)
+        values['own_closer'] = PopCount(own)
+        values['opp_closer'] = PopCount(opp)
+    if 'pawn_distance' in wanted:
+        (r1, c1), (r2, c2) = state.Location(mine), state.Location(theirs)
+        values['pawn_distance'] = max(abs(r1 - r2), abs(c1 - c2))
+    if 'partitioned' in wanted:
+        values['partitioned'] = int(state.IsPartitioned())
+    return [values[name] for name in names]
+
+
+class LinearEvaluation(object):
+    """ score = bias + sum(weight * feature), from the point of view of the
+        player to move. Features with a zero weight are never computed. """
+    def __init__(self, weights, bias=0.0, scale=1.0):
+        self.weights = dict((name, float(w)*scale) for name, w in weights.items() if w)
+        self.names = [name for name in FEATURES if name in self.weights]
+        self.bias = bias*scale
+
+    @classmethod
+    def Load(cls, path, scale=100.0):
+        """ Weights written by Fit; scaled up so evaluations compare with
+            the mobility counts the engine normally uses """
+        with open(path) as source:
+            data = json.load(source)
+        return cls(dict(zip(data['features'], data['weights'])), data.get('bias', 0.0), scale)
+
+    def __call__(self, state):
+        score = self.bias
+        for name, value in zip(self.names, StateFeatures(state, self.names)):
+            score += self.weights[name]*value
+        return score
+
+
+## ------------ BATCHES ------------##
+def Dilate(mask):
+    """ (N, H, W) bool: every cell within one king step of mask (a 3x3 max
+        filter done as two separable passes) """
+    rows = mask.copy()
+    rows[:, 1:, :] |= mask[:, :-1, :]
+    rows[:, :-1, :] |= mask[:, 1:, :]
+    out = rows.copy()
+    out[:, :, 1:] |= rows[:, :, :-1]
+    out[:, :, :-1] |= rows[:, :, 1:]
+    return out
+
+
+def NeighbourCounts(free):
+    """ (N, H, W) count of free king neighbours of every cell (3x3 convolution) """
+    n, h, w = free.shape
+    padded = np.zeros((n, h+2, w+2), np.int8)
+    padded[:, 1:-1, 1:-1] = free
+    counts = np.zeros((n, h, w), np.int8)
+    for dr in (0, 1, 2):
+        for dc in (0, 1, 2):
+            if dr != 1 or dc != 1:
+                counts += padded[:, dr:dr+h, dc:dc+w]
+    return counts
+
+
+def FloodFill(seed, within):
+    """ Cells of `within` connected to seed, for the whole batch """
+    region = Dilate(seed) & within
+    while True:
+        grown = region | (Dilate(region) & within)
+        if np.array_equal(grown, region):
+            return region
+        region = grown
+
+
+def Count(mask):
+    return mask.reshape(mask.shape[0], -1).sum(axis=1)
+
+
+def Features(boards, pawns):
+    """ (N, len(FEATURES)) float32 features of a batch, see FEATURES """
+    RequireNumpy()
+    boards = np.asarray(boards, bool)
+    pawns = np.asarray(pawns)
+    n = boards.shape[0]
+    batch = np.arange(n)
+    own = np.zeros(boards.shape, bool)
+    opp = np.zeros(boards.shape, bool)
+    own[batch, pawns[:, 0, 0], pawns[:, 0, 1]] = True
+    opp[batch, pawns[:, 1, 0], pawns[:, 1, 1]] = True
+    free = ~boards & ~own & ~opp
+
+    counts = NeighbourCounts(free)
+    own1, opp1 = Dilate(own) & free, Dilate(opp) & free
+
+    # both pawns spread one step at a time, a cell goes to whoever gets there
+    # first; once neither can spread they have flooded their whole regions
+    seen_own, seen_opp = own.copy(), opp.copy()
+    own_closer = np.zeros(boards.shape, bool)
+    opp_closer = np.zeros(boards.shape, bool)
+    while True:
+        new_own = Dilate(seen_own) & free & ~seen_own
+        new_opp = Dilate(seen_opp) & free & ~seen_opp
+        if not new_own.any() and not new_opp.any():
+            break
+        own_closer |= new_own & ~seen_opp & ~new_opp
+        opp_closer |= new_opp & ~seen_own & ~new_own
+        seen_own |= new_own
+        seen_opp |= new_opp
+    own_region, opp_region = seen_own & ~own, seen_opp & ~opp
+
+    # as in IsolationState.Partition
+    reach = Dilate(own_region | own)
+    touching = (reach & (opp | opp_region)).any(axis=(1, 2)) | (own_region & opp_region).any(axis=(1, 2))
+
+    columns = [
+        counts[batch, pawns[:, 0, 0], pawns[:, 0, 1]],
+        counts[batch, pawns[:, 1, 0], pawns[:, 1, 1]],
+        Count(Dilate(own1) & free),
+        Count(Dilate(opp1) & free),
+        Count(own_region),
+        Count(opp_region),
+        Count(own_closer),
+        Count(opp_closer),
+        np.abs(pawns[:, 0] - pawns[:, 1]).max(axis=1),
+        ~touching,
+    ]
+    return np.stack([np.asarray(c, np.float32) for c in columns], axis=1)
+
+
+def Encode(states):
+    """ (boards, pawns) arrays for a list of IsolationStates of one size """
+    RequireNumpy()
+    height, width = states[0].height, states[0].width
+    size = width*height
+    nbytes = (size + 7)//8
+    raw = bytearray()
+    pawns = np.zeros((len(states), 2, 2), np.int16)
+    for i, state in enumerate(states):
+        raw += bytearray((state.destroyed >> (8*b)) & 0xFF for b in range(nbytes))
+        pawns[i, 0] = state.Location(state.pawns[state.player])
+        pawns[i, 1] = state.Location(state.pawns[1-state.player])
+    bits = np.unpackbits(np.frombuffer(bytes(raw), np.uint8).reshape(len(states), nbytes), axis=1, bitorder='little')
+    return bits[:, :size].reshape(len(states), height, width), pawns
+
+
+## ------------ DATASETS ------------##
+def LabelledPositions(paths):
+    """ Yields (state, label) for every position of finished recorded games:
+        label is 1 if the player to move won, -1 otherwise """
+    from records import ReadGames
+    for path in paths:
+        for record in ReadGames(path):
+            if record.winner is None:
+                continue
+            for state in record.Positions():
+                if state.IsIsolated():
+                    continue
+                yield state, 1 if state.player == record.winner else -1
+
+
+def BuildDataset(paths, prefix, log=None):
+    """ Writes prefix-features.npy and prefix-labels.npy, one row per position.
+        Positions are grouped by board size and computed CHUNK at a time. """
+    RequireNumpy()
+    total = sum(1 for _ in LabelledPositions(paths))
+    features = np.lib.format.open_memmap(prefix + '-features.npy', 'w+', np.float32, (total, len(FEATURES)))
+    labels = np.lib.format.open_memmap(prefix + '-labels.npy', 'w+', np.int8, (total,))
+    row = 0
+    pending = {}
+
+    def Flush(states, values):
+        features[row:row+len(states)] = Features(*Encode(states))
+        labels[row:row+len(states)] = values
+        return row + len(states)
+
+    for state, label in LabelledPositions(paths):
+        key = (state.width, state.height)
+        states, values = pending.setdefault(key, ([], []))
+        states.append(state.Copy())
+        values.append(label)
+        if len(states) >= CHUNK:
+            row = Flush(states, values)
+            pending[key] = ([], [])
+            if log:
+                print('%d / %d positions' % (row, total), file=log)
+    for states, values in pending.values():
+        if states:
+            row = Flush(states, values)
+    features.flush()
+    labels.flush()
+    return total
+
+
+def Fit(features, labels, l2=1.0):
+    """ Ridge regression of labels on features: (weights, bias) """
+    RequireNumpy()
+    x = np.asarray(features, np.float64)
+    y = np.asarray(labels, np.float64)
+    x = np.hstack([x, np.ones((x.shape[0], 1))])
+    penalty = l2*np.eye(x.shape[1])
+    penalty[-1, -1] = 0.0  # leave the bias alone
+    solution = np.linalg.solve(x.T.dot(x) + penalty, x.T.dot(y))
+    return solution[:-1], solution[-1]
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description='Build feature datasets and fit linear evaluations.')
+    sub = parser.add_subparsers(dest='command')
+    dataset = sub.add_parser('dataset', help='features of every recorded position')
+    dataset.add_argument('--records', nargs='+', required=True, help='game record files (records.py)')
+    dataset.add_argument('--out', required=True, help='prefix of the .npy files')
+    fit = sub.add_parser('fit', help='fit a linear evaluation to a dataset')
+    fit.add_argument('--data', required=True, help='prefix given to dataset')
+    fit.add_argument('--out', required=True, help='weights file (JSON)')
+    fit.add_argument('--l2', type=float, default=1.0)
+    args = parser.parse_args(argv)
+    RequireNumpy()
+
+    if args.command == 'dataset':
+        total = BuildDataset(args.records, args.out, sys.stderr)
+        print('%d positions' % total)
+    elif args.command == 'fit':
+        features = np.load(args.data + '-features.npy', mmap_mode='r')
+        labels = np.load(args.data + '-labels.npy', mmap_mode='r')
+        weights, bias = Fit(features, labels, args.l2)
+        accuracy = float(np.mean(np.sign(features.dot(weights) + bias) == labels))
+        with open(args.out, 'w') as out:
+            json.dump({'features': list(FEATURES), 'weights': [float(w) for w in weights], 'bias': float(bias)},
+                      out, indent=1)
+        for name, weight in zip(FEATURES, weights):
+            print('%-14s %+.4f' % (name, weight))
+        print('bias %+.4f, sign accuracy %.3f on %d positions' % (bias, accuracy, len(labels)))
+    else:
+        parser.print_help()
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
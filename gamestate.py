@@ -0,0 +1,250 @@
+# -*- coding: utf-8
+""" Headless Isolation rules.
+
+    Cells are numbered row-major (index = row*width + col) and every set of
+    cells is kept as a single integer bitmask, so move generation and the
+    isolation test are a handful of bit operations. Nothing here imports wx. """
+
+MOVE, REMOVE = 0, 1
+
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+_NEIGHBOURS = {}
+_EDGES = {}
+
+
+def NeighbourMasks(width, height):
+    """ Returns a tuple holding the adjacency bitmask of every cell.
+        Masks are computed once per board size and shared by all states. """
+    key = (width, height)
+    masks = _NEIGHBOURS.get(key)
+    if masks is None:
+        masks = []
+        for row in range(height):
+            for col in range(width):
+                mask = 0
+                for dr, dc in DIRECTIONS:
+                    r, c = row+dr, col+dc
+                    if 0 <= r < height and 0 <= c < width:
+                        mask |= 1 << (r*width + c)
+                masks.append(mask)
+        masks = _NEIGHBOURS[key] = tuple(masks)
+    return masks
+
+
+def EdgeMasks(width, height):
+    """ Returns (not_first_col, not_last_col, full) used by the shift-based dilation """
+    key = (width, height)
+    masks = _EDGES.get(key)
+    if masks is None:
+        first = 0
+        for row in range(height):
+            first |= 1 << (row*width)
+        last = first << (width-1)
+        full = (1 << (width*height)) - 1
+        masks = _EDGES[key] = (full & ~first, full & ~last, full)
+    return masks
+
+
+def StartSquares(width, height):
+    """ Cell indices of both pawns at the start of a game (mirror-symmetric) """
+    first = width//2
+    if width%2 == 0:
+        second = (height-1)*width + width//2 - 1
+    else:
+        second = (height-1)*width + width//2
+    return (first, second)
+
+
+try:
+    PopCount = int.bit_count  # Python 3.10+, much faster on big boards
+except AttributeError:
+    def PopCount(mask):
+        return bin(mask).count('1')
+
+
+def BitIndices(mask):
+    """ Yields the index of every set bit in mask, lowest first """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+## ------------ GAME STATE ------------##
+class IsolationState(object):
+    """ A position: destroyed cells, both pawns, whose turn and which phase.
+
+        A turn is a MOVE (king step onto a free neighbour) followed by a REMOVE
+        (destroy any free cell). As in the GUI, the player to act loses as soon
+        as their pawn has no free neighbour, including right after moving. """
+    def __init__(self, width, height, pawns=None, destroyed=0, player=0, phase=MOVE):
+        self.width = width
+        self.height = height
+        self.size = width*height
+        self.full = (1 << self.size) - 1
+        self.neighbours = NeighbourMasks(width, height)
+        self.edges = EdgeMasks(width, height)
+        if pawns is None:
+            pawns = StartSquares(width, height)
+        self.pawns = list(pawns)
+        self.destroyed = destroyed
+        self.blocked = destroyed | (1 << self.pawns[0]) | (1 << self.pawns[1])
+        self.player = player
+        self.phase = phase
+        self.undo = []
+
+    def Copy(self):
+        return IsolationState(self.width, self.height, self.pawns, self.destroyed, self.player, self.phase)
+
+    def Snapshot(self):
+        """ The position as an immutable (pawns, destroyed, player, phase) """
+        return (tuple(self.pawns), self.destroyed, self.player, self.phase)
+
+    def Restore(self, snapshot):
+        """ Jumps to a Snapshot() of a position on the same board """
+        pawns, self.destroyed, self.player, self.phase = snapshot
+        self.pawns = list(pawns)
+        self.blocked = self.destroyed | (1 << pawns[0]) | (1 << pawns[1])
+        self.undo = []
+
+    def Index(self, row, col):
+        return row*self.width + col
+
+    def Location(self, index):
+        return divmod(index, self.width)
+
+    ## ------------ QUERIES ------------##
+    def FreeMask(self):
+        return self.full & ~self.blocked
+
+    def MoveMask(self, player=None):
+        if player is None:
+            player = self.player
+        return self.neighbours[self.pawns[player]] & ~self.blocked
+
+    def LegalMoves(self, player=None):
+        return list(BitIndices(self.MoveMask(player)))
+
+    def LegalRemovals(self):
+        return list(BitIndices(self.FreeMask()))
+
+    def Mobility(self, player=None):
+        return PopCount(self.MoveMask(player))
+
+    def IsIsolated(self, player=None):
+        return not self.MoveMask(player)
+
+    def Dilate(self, mask):
+        """ mask grown by one king step in every direction """
+        not_first, not_last, full = self.edges
+        row = mask | ((mask << 1) & not_first) | ((mask >> 1) & not_last)
+        return (row | (row << self.width) | (row >> self.width)) & full
+
+    def FloodFill(self, seed, within):
+        """ Cells of `within` connected to the seed mask by king steps """
+        region = self.Dilate(seed) & within
+        while True:
+            grown = region | (self.Dilate(region) & within)
+            if grown == region:
+                return region
+            region = grown
+
+    def Region(self, player=None):
+        """ Free cells the pawn of player could ever walk to """
+        if player is None:
+            player = self.player
+        return self.FloodFill(1 << self.pawns[player], self.FreeMask())
+
+    def Partition(self):
+        """ Returns the free regions of (player to move, other player) once
+            no pawn can ever reach or touch the other's region, else None. """
+        free = self.FreeMask()
+        mine = 1 << self.pawns[self.player]
+        theirs = 1 << self.pawns[1-self.player]
+        # grow both regions a step at a time and stop as soon as they touch,
+        # on big open boards that is long before either fill is complete
+        own, other = mine, theirs
+        while True:
+            reach = self.Dilate(own)
+            if reach & other:
+                return None
+            grown_own = own | (reach & free)
+            grown_other = other | (self.Dilate(other) & free)
+            if grown_own == own and grown_other == other:
+                return own ^ mine, other ^ theirs
+            own, other = grown_own, grown_other
+
+    def IsPartitioned(self):
+        return self.Partition() is not None
+
+    def IsLegalMove(self, index):
+        return self.phase == MOVE and bool(self.MoveMask() >> index & 1)
+
+    def IsLegalRemove(self, index):
+        return self.phase == REMOVE and not self.blocked >> index & 1
+
+    def IsOver(self):
+        return self.IsIsolated()
+
+    def Winner(self):
+        """ The winning player, or None while the game is still running """
+        if self.IsIsolated():
+            return 1 - self.player
+        return None
+
+    ## ------------ HALF-TURN UPDATES (GUI) ------------##
+    def MovePawn(self, index):
+        bit = 1 << self.pawns[self.player]
+        self.blocked = (self.blocked ^ bit) | (1 << index)
+        self.pawns[self.player] = index
+        self.phase = REMOVE
+
+    def RemoveCell(self, index):
+        bit = 1 << index
+        self.destroyed |= bit
+        self.blocked |= bit
+        self.SwitchTurn()
+
+    def SwitchTurn(self):
+        """ Hands the turn over (also used when a turn timer runs out) """
+        self.player = 1 - self.player
+        self.phase = MOVE
+
+    ## ------------ FULL-TURN MAKE / UNMAKE (SEARCH) ------------##
+    def MakeMove(self, to, remove):
+        """ Plays a whole turn for the player to act. No legality checks. """
+        player = self.player
+        frm = self.pawns[player]
+        self.undo.append((frm, remove))
+        bit = 1 << remove
+        self.destroyed |= bit
+        self.blocked = (self.blocked ^ (1 << frm)) | (1 << to) | bit
+        self.pawns[player] = to
+        self.player = 1 - player
+
+    def UnmakeMove(self):
+        frm, remove = self.undo.pop()
+        player = 1 - self.player
+        bit = 1 << remove
+        self.destroyed ^= bit
+        self.blocked = (self.blocked ^ (1 << self.pawns[player]) ^ bit) | (1 << frm)
+        self.pawns[player] = frm
+        self.player = player
+
+    def __repr__(self):
+        rows = []
+        for row in range(self.height):
+            line = []
+            for col in range(self.width):
+                index = self.Index(row, col)
+                if index == self.pawns[0]:
+                    line.append('1')
+                elif index == self.pawns[1]:
+                    line.append('2')
+                elif self.destroyed >> index & 1:
+                    line.append('#')
+                else:
+                    line.append('.')
+            rows.append(''.join(line))
+        return '\n'.join(rows)
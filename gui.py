@@ -0,0 +1,1227 @@
+# -*- coding: utf-8
+""" wxPython interface. isolation.py imports it only when the GUI starts. """
+import wx
+import wx.lib.colourselect as csel
+import threading
+import colorsys
+import string
+import socket
+import random
+import time
+import os
+
+from gamestate import IsolationState, BitIndices, PopCount, MOVE, REMOVE
+from engine import AlphaBetaEngine
+from endgame import EndgameSolver, EndgameBudget
+from thinker import Thinker
+from retrograde import OpenDatabase
+from book import OpenBook
+from records import GameRecord, GameWriter
+from client import GameClient
+from history import History
+from instrument import Profiler, NULL_PROFILER, Overlay
+
+GEAR_ICON = 'gear_icon.png'
+START_ICON = 'start_icon.png'
+DEATH_IMAGE = 'skull.png'
+
+ENGINE_TIME = 1.0   # seconds per computer turn when the turn timer is off
+TIMER_MARGIN = 0.5  # seconds kept back from the turn timer for the GUI
+ENDGAME_BUDGET = 1000  # positions the GUI may solve to call a decided game
+ENDGAME_CELLS = 40  # free cells in the regions past which it does not try
+ENDGAME_SECONDS = 0.01  # and the time it may take, it runs on the GUI thread
+RECORD_FILE = os.path.join(os.path.expanduser('~'), '.isolation-games')  # every game is appended here
+MAX_SIDE = 64  # largest board the dialog offers
+WIDGET_SIDE = 11  # boards wider or taller than this always use the canvas
+MIN_CELL = 12  # pixels, large boards scroll rather than shrink cells further
+MAX_CELL = 120  # pixels, the zoom limit
+ZOOM_STEP = 1.25
+REFRESH_ALL = 256  # dirty cells past which the canvas is repainted in one go
+TRACE_FILE = os.path.join(os.path.expanduser('~'), '.isolation-trace.jsonl')  # timings, when profiling
+
+ALPHABET = list(string.lowercase)
+
+_BITMAPS = {}
+
+
+def CachedBitmap(path, size=None):
+    """ Loads (and scales to size with high quality) an image once per size """
+    key = (path, size)
+    bmp = _BITMAPS.get(key)
+    if bmp is None:
+        if size is None:
+            bmp = wx.Bitmap(path, wx.BITMAP_TYPE_ANY)
+        else:
+            bmp = wx.Image(path).Scale(size[0], size[1], wx.IMAGE_QUALITY_HIGH).ConvertToBitmap()
+        _BITMAPS[key] = bmp
+    return bmp
+
+
+def DeathBitmap(cell_size):
+    return CachedBitmap(DEATH_IMAGE, (int(cell_size[0]*0.8), int(cell_size[1]*0.8)))
+
+
+## ------------ CLASS FOR INDIVIDUAL GAME CELLS ------------##
+class GameCell(wx.Panel):
+    def __init__(self, parent, *args, **kwargs):
+        wx.Panel.__init__(self, parent, wx.ID_ANY, *args, **kwargs)
+        self.SetBackgroundColour('black')
+        self.destroyed = False
+        self.parent = parent
+        self.size = self.GetSize()
+        self.enabled = True
+        self.laid_out = False
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+
+        self.base = wx.Panel(self, wx.ID_ANY, style=wx.BORDER_NONE)
+        self.base.SetBackgroundColour('white')
+
+        hsizer = wx.BoxSizer(wx.HORIZONTAL)
+        vsizer = wx.BoxSizer(wx.VERTICAL)
+        #self.beeper = wx.Panel(self.base, wx.ID_ANY, size=(self.size[0]/8, self.size[1]/8), style=wx.BORDER_NONE)
+        self.beeper = wx.StaticText(self.base, wx.ID_ANY)
+        self.beeper.Hide()
+        # fallback to ASCII from UTF-8
+        try: self.SetLetter('•')
+        except: self.SetLetter('*')
+        # the skull is only built for the losing cell, see ShowDeathBitmap
+        self.death_bmp = None
+        vsizer.Add(self.beeper, 0, wx.ALIGN_CENTRE, 0)
+        hsizer.Add(vsizer, 1, wx.ALIGN_CENTRE, 0)
+        self.vsizer = vsizer
+
+        self.base.SetSizer(hsizer)
+
+        sizer.Add(self.base, 1, wx.EXPAND|wx.ALL, 2)
+        self.SetSizer(sizer)
+        self.Layout()
+        # Click Bindings (Redirect EVT_LEFT_DOWN's to the cell object)
+        self.base.Bind(wx.EVT_LEFT_DOWN, self.ElementClick)
+        self.beeper.Bind(wx.EVT_LEFT_DOWN, self.ElementClick)
+
+    def ElementClick(self, event):
+        if self.enabled:
+            event = wx.CommandEvent(wx.EVT_LEFT_DOWN.typeId, self.GetId())
+            event.SetEventObject(self)
+            wx.PostEvent(self, event)
+
+    def SetLetter(self, letter, fontsize=32):
+        self.beeper.SetLabel(letter)
+        self.beeper.SetFont(wx.Font(fontsize, wx.DEFAULT, wx.NORMAL, wx.FONTWEIGHT_BOLD, False, 'Helvetica'))
+        self.letter = letter
+        self.laid_out = False
+
+    def ShowBeeper(self, colour):
+        """ Shows the marker, laying the cell out only the first time the
+            marker is shown with its current letter """
+        self.beeper.SetForegroundColour(colour)
+        self.beeper.Show()
+        if not self.laid_out:
+            self.Layout()
+            self.laid_out = True
+
+    def HideBeeper(self):
+        self.beeper.Hide()
+
+    def EnableCell(self, enable=True):
+        self.enabled = enable
+
+    def DisableCell(self):
+        self.enabled = False
+
+    def ShowDeathBitmap(self):
+        self.beeper.Hide()
+        if self.death_bmp is None:
+            self.death_bmp = wx.StaticBitmap(self.base, wx.ID_ANY, DeathBitmap(self.size), size=(50, 50))
+            self.vsizer.Add(self.death_bmp, 0, wx.ALIGN_CENTRE, 0)
+        self.death_bmp.Show()
+        self.Layout()
+
+    def HideDeathBitmap(self):
+        if self.death_bmp is not None:
+            self.death_bmp.Hide()
+            self.Layout()
+        self.laid_out = False
+
+    def Greyscale(self, event=None):
+        bgr = self.base.GetBackgroundColour()
+        #gval = (0.21*bgr[0] + 0.71*bgr[1] + 0.07*bgr[2]) # lumosity method (found to be too bright)
+        gval = (bgr[0] + bgr[1] + bgr[2]) / 3
+        greyscale = (gval, gval, gval)
+        if bgr != 'white':
+            self.base.SetBackgroundColour(greyscale)
+        else:
+            self.base.SetBackgroundColour('#EEEEEE')
+
+    def GetLocation(self):
+        return tuple([int(x) for x in self.GetName().split('-')])
+
+    def GetIndex(self):
+        row, col = self.GetLocation()
+        return self.parent.state.Index(row, col)
+
+    def Adjacents(self):
+        state = self.parent.state
+        mask = state.neighbours[self.GetIndex()] & ~state.blocked
+        return [state.Location(i) for i in BitIndices(mask)]
+
+    def IsIsolated(self):
+        state = self.parent.state
+        return not state.neighbours[self.GetIndex()] & ~state.blocked
+
+
+## ------------ CUSTOM-DRAWN BOARD (ONE WIDGET FOR ALL CELLS) ------------##
+class BoardCanvas(wx.ScrolledWindow):
+    """ Draws the whole grid straight from the game state into one double
+        buffered window, instead of building a GameCell per square. Cells
+        start at the size that fits the window (at least MIN_CELL pixels,
+        so large boards scroll) and Ctrl+wheel zooms. Only the cells inside
+        the invalidated area are drawn. """
+    def __init__(self, parent, *args, **kwargs):
+        wx.ScrolledWindow.__init__(self, parent, wx.ID_ANY, *args, **kwargs)
+        self.SetBackgroundStyle(wx.BG_STYLE_CUSTOM)
+        self.board = parent
+        self.finished = None
+        self.size = self.GetSize()
+        self.columns, self.rows = parent.conf['width'], parent.conf['height']
+        self.fit = (self.size[0] / float(self.columns), self.size[1] / float(self.rows))
+        self.min_zoom = 1.0
+        self.max_zoom = max(1.0, MAX_CELL / min(self.fit))
+        self.SetZoom(max(1.0, MIN_CELL / min(self.fit)))
+        self.Bind(wx.EVT_PAINT, self.OnPaint)
+        self.Bind(wx.EVT_LEFT_DOWN, self.OnClick)
+        self.Bind(wx.EVT_MOUSEWHEEL, self.OnWheel)
+
+    def SetZoom(self, zoom):
+        self.zoom = min(self.max_zoom, max(self.min_zoom, zoom))
+        self.cell_width = self.fit[0]*self.zoom
+        self.cell_height = self.fit[1]*self.zoom
+        self.death_bmp = DeathBitmap((self.cell_width, self.cell_height))
+        self.SetScrollRate(max(1, int(self.cell_width)), max(1, int(self.cell_height)))
+        self.SetVirtualSize((int(self.cell_width*self.columns), int(self.cell_height*self.rows)))
+        self.Refresh()
+
+    def OnWheel(self, event):
+        if not event.ControlDown():
+            event.Skip()
+            return
+        # keep the spot under the pointer in place
+        px, py = event.GetPosition()
+        x, y = self.CalcUnscrolledPosition(px, py)
+        col, row = x / self.cell_width, y / self.cell_height
+        self.SetZoom(self.zoom * (ZOOM_STEP if event.GetWheelRotation() > 0 else 1.0/ZOOM_STEP))
+        ux, uy = self.GetScrollPixelsPerUnit()
+        self.Scroll(int((col*self.cell_width - px) / ux), int((row*self.cell_height - py) / uy))
+
+    def OnClick(self, event):
+        if self.finished:
+            return
+        x, y = self.CalcUnscrolledPosition(*event.GetPosition())
+        col, row = int(x / self.cell_width), int(y / self.cell_height)
+        if 0 <= col < self.columns and 0 <= row < self.rows:
+            self.board.CellLogic(self.board.state.Index(row, col))
+
+    def Finish(self, wid, lid):
+        self.finished = (wid, lid)
+        self.Refresh()
+
+    def RefreshCells(self, mask):
+        if PopCount(mask) > REFRESH_ALL:
+            # e.g. every free cell gaining a marker, one repaint is cheaper
+            self.Refresh()
+            return
+        for index in BitIndices(mask):
+            x, y, w, h = self.CellRect(index)
+            self.RefreshRect(wx.Rect(x-2, y-2, w+5, h+5))
+
+    def Greyscale(self, colour):
+        if colour == (255, 255, 255):
+            return (0xEE, 0xEE, 0xEE)
+        gval = (colour[0] + colour[1] + colour[2]) / 3
+        return (gval, gval, gval)
+
+    def CellRect(self, index):
+        """ (x, y, w, h) of a cell's inside in window coordinates """
+        row, col = self.board.state.Location(index)
+        x, y = int(self.cell_width*col), int(self.cell_height*row)
+        w, h = int(self.cell_width*(col+1)) - x, int(self.cell_height*(row+1)) - y
+        x, y = self.CalcScrolledPosition(x, y)
+        return x+2, y+2, w-4, h-4
+
+    def Visible(self, box):
+        """ Indices of the cells overlapping box (window coordinates) """
+        x, y = self.CalcUnscrolledPosition(box.x, box.y)
+        cols = range(max(0, int(x / self.cell_width)), min(self.columns, int((x + box.width) / self.cell_width) + 1))
+        rows = range(max(0, int(y / self.cell_height)), min(self.rows, int((y + box.height) / self.cell_height) + 1))
+        return [row*self.columns + col for row in rows for col in cols]
+
+    def OnPaint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        self.Draw(dc, self.GetUpdateRegion().GetBox())
+
+    def Draw(self, dc, box):
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        board, state = self.board, self.board.state
+        colours = board.conf['colour']
+        exposed = self.Visible(box)
+        # the part of the window past the board's edge
+        dc.SetBrush(wx.BLACK_BRUSH)
+        dc.DrawRectangle(box.x, box.y, box.width, box.height)
+        for index in exposed:
+            if state.destroyed >> index & 1:
+                continue
+            if index == state.pawns[0]:
+                colour, player = colours[0], 0
+            elif index == state.pawns[1]:
+                colour, player = colours[1], 1
+            else:
+                colour, player = (255, 255, 255), None
+            if self.finished and player != self.finished[0]:
+                colour = self.Greyscale(colour)
+            dc.SetBrush(wx.Brush(colour))
+            dc.DrawRectangle(*self.CellRect(index))
+
+        if self.finished:
+            x, y, w, h = self.CellRect(state.pawns[self.finished[1]])
+            bw, bh = self.death_bmp.GetSize()
+            dc.DrawBitmap(self.death_bmp, x + (w-bw)/2, y + (h-bh)/2, True)
+            return
+
+        markers, colour = board.Markers()
+        small = self.columns <= 5 and self.rows <= 5
+        dc.SetTextForeground(colour)
+        fontsize = 22 if small else min(32, max(6, int(min(self.cell_width, self.cell_height)/2)))
+        dc.SetFont(wx.Font(fontsize, wx.DEFAULT, wx.NORMAL, wx.FONTWEIGHT_BOLD, False, 'Helvetica'))
+        for index in exposed:
+            if not markers >> index & 1:
+                continue
+            if small:
+                letter = ALPHABET[index]
+            else:
+                letter = u'\u2022'
+            x, y, w, h = self.CellRect(index)
+            tw, th = dc.GetTextExtent(letter)
+            dc.DrawText(letter, x + (w-tw)/2, y + (h-th)/2)
+
+
+## ------------ GAME BOARD CLASS (INCLUDES TOP PANEL) ------------##
+class GameBoard(wx.Panel):
+    def __init__(self, parent, max_size, conf, border):
+        wx.Panel.__init__(self, parent, wx.ID_ANY)
+        self.SetFocus()
+        self.SetBackgroundColour('black')
+        self.conf = conf
+        self.parent = parent
+        self.player = 0
+        self.type = 0
+        self.game_over = False
+        self.piece = {}
+        self.cells = {}
+        self.canvas = None
+        self.drawn = (0, 0, 0, None)  # pawns, destroyed, markers, marker style last painted
+        x_offset = 0
+        y_offset = 60
+        self.timer_value = conf['timer']
+        # solved boards (see retrograde.py) give hints and perfect computer play
+        self.database = OpenDatabase(conf['width'], conf['height'])
+        # openings searched offline (see book.py) are played instantly, the turn time goes to the middlegame
+        self.book = OpenBook(conf['width'], conf['height'])
+        self.engine = AlphaBetaEngine(database=self.database, book=self.book)
+        self.thinker = None  # started with the first computer turn
+        # with conf['server'] set the server referees and this board is a client
+        self.client = None
+        self.game_id = None
+        self.seats = (0, 1)  # players this board may play for
+        # per-cell phase timings and engine counters, see instrument.py
+        self.profiler = Profiler(TRACE_FILE, profile=True) if conf.get('profile') else NULL_PROFILER
+        self.overlay = None
+        # what the widgets were built for, a new game with the same shape reuses them
+        self.shape = self.Shape(conf)
+
+        self.InitMath(max_size, x_offset, y_offset, True)
+
+        ## TOP PANEL (GAME INFO AND NEWGAME/CONF BUTTON) ##
+        self.toppanel = wx.Panel(self, wx.ID_ANY, (3, 3), (self.size[0]-6, y_offset-5))
+        self.toppanel.SetBackgroundColour('white')
+        topsizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        font = wx.Font(32, wx.DEFAULT, wx.NORMAL, wx.NORMAL, False, 'Helvetica')
+        self.turn_text = wx.StaticText(self.toppanel, wx.ID_ANY, 'Player 1')
+        self.turn_text.SetFont(font)
+
+        if self.conf['timer'][0]:
+            self.timer_text = wx.StaticText(self.toppanel, wx.ID_ANY, )
+            self.timer_text.SetFont(font)
+
+            turn_timer_id = wx.ID_ANY
+            self.timer = wx.Timer(self, turn_timer_id)
+            wx.EVT_TIMER(self, turn_timer_id, self.OnTurnTimer)
+            self.SetTimer(str(self.conf['timer'][1]), self.conf['colour'][0])
+
+        bmp = CachedBitmap(START_ICON)
+        self.newgame_button = wx.BitmapButton(self.toppanel, wx.ID_ANY, bmp, size=(40, 40), style=wx.BU_AUTODRAW|wx.NO_BORDER)
+        self.newgame_button.Bind(wx.EVT_BUTTON, self.parent.NewGame)
+
+        topsizer.Add(self.turn_text, 0, wx.TOP|wx.LEFT, 8)
+        if self.conf['timer'][0]:
+            topsizer.AddStretchSpacer(1)
+            topsizer.Add(self.timer_text, 0, wx.TOP, 8)
+        topsizer.AddStretchSpacer(1)
+        topsizer.Add(self.newgame_button, 0, wx.TOP|wx.RIGHT, 8)
+
+        self.toppanel.SetSizer(topsizer)
+        self.toppanel.Layout()
+
+        self.state = IsolationState(conf['width'], conf['height'])
+        self.solver = EndgameSolver(self.state)
+        self.record = GameRecord.FromState(self.state, self.RecordConf())
+        self.record_saved = False
+        self.moved = None  # where the pawn went this turn, until the removal completes it
+        # every position so far, with (record length, moved) to go back to
+        self.history = History(self.state, (0, None))
+
+        if self.UsesCanvas(conf):
+            ## GAME BOARD CONSTRUCTION (SINGLE CANVAS)
+            self.canvas = BoardCanvas(self, pos=(self.x_offset, self.y_offset), size=(self.cell_width*self.conf['width'],
+                    self.cell_height*self.conf['height']), style=wx.BORDER_NONE)
+        else:
+            ## GAME BOARD CONTRUCTION (CELL ADDITION LOOP)
+            for i in range(self.conf['width']*self.conf['height']):
+                if i%self.conf['width'] == 0:
+                    col = 0
+                row = i/self.conf['width']
+                x = (self.cell_width*col)+self.x_offset
+                y = (self.cell_height*row)+self.y_offset
+                self.cells[(row, col)] = cell = GameCell(self, pos=(x, y), size=(self.cell_width, 
+                        self.cell_height), style=wx.BORDER_NONE, name='-'.join((str(row), str(col))))
+                cell.Bind(wx.EVT_LEFT_DOWN, self.OnCellClick)
+                col += 1
+
+                # do alphabet
+                if self.conf['width'] <= 5 and self.conf['height'] <= 5:
+                    letter = ALPHABET[i]
+                    cell.SetLetter(letter, 22)
+
+        if self.profiler.enabled:
+            # created last so it stays above the cells
+            self.overlay = wx.StaticText(self, wx.ID_ANY, '', pos=(self.x_offset+4, self.y_offset+4))
+            self.overlay.SetFont(wx.Font(10, wx.MODERN, wx.NORMAL, wx.NORMAL))
+            self.overlay.SetBackgroundColour('white')
+        self.profiler.NewGame(conf['width'], conf['height'])
+
+        if self.conf.get('server'):
+            self.Connect()
+
+        self.Layout()
+        self.GameUpdate()
+
+        if self.conf['width'] <= 5 and self.conf['height'] <= 5:
+            self.Bind(wx.EVT_CHAR_HOOK, self.onKey)
+
+    @staticmethod
+    def Shape(conf):
+        return (conf['width'], conf['height'], conf['timer'][0], GameBoard.UsesCanvas(conf), conf.get('server'),
+                bool(conf.get('profile')))
+
+    @staticmethod
+    def UsesCanvas(conf):
+        return bool(conf.get('canvas')) or max(conf['width'], conf['height']) > WIDGET_SIDE
+
+    def CanReset(self, conf):
+        return self.Shape(conf) == self.shape
+
+    def Reset(self):
+        """ Starts a new game on the existing widgets instead of rebuilding them """
+        self.CancelThinking()
+        self.SaveRecord()
+        self.profiler.EndGame(self.record.winner)
+        self.profiler.NewGame(self.conf['width'], self.conf['height'])
+        self.state = IsolationState(self.conf['width'], self.conf['height'])
+        self.record = GameRecord.FromState(self.state, self.RecordConf())
+        self.record_saved = False
+        self.moved = None
+        self.history = History(self.state, (0, None))
+        self.player = 0
+        self.type = MOVE
+        self.game_over = False
+        self.ClearFinish()
+        if self.client is not None:
+            self.RequestGame()
+        self.GameUpdate()
+
+    def ClearFinish(self):
+        """ Takes the widgets back from the look FinishGame gave them """
+        self.drawn = (0, 0, 0, None)
+        if self.canvas:
+            self.canvas.finished = None
+            self.canvas.Refresh()
+        for cell in self.cells.itervalues():
+            cell.HideDeathBitmap()
+            cell.HideBeeper()
+            cell.EnableCell()
+            cell.destroyed = False
+            cell.base.SetBackgroundColour('white')
+            cell.base.Refresh()
+        if self.conf['timer'][0]:
+            self.timer_text.Show()
+            self.toppanel.Layout()
+
+    def OnTurnTimer(self, event):
+        self.timer_value -= 1
+        # a server ends remote turns itself and says so
+        if self.timer_value < 0 and self.client is None:
+            self.SwitchTurn()
+            self.GameUpdate()
+        self.timer_text.SetLabel(str(self.timer_value))
+
+    def SetTimer(self, start, colour):
+        self.timer.Stop()
+        self.timer_value = int(start)
+        self.timer_text.SetLabel(str(start))
+        self.timer_text.SetForegroundColour(colour)
+        self.timer.Start(1000)
+
+
+    def onKey(self, event):
+        #if evt.GetKeyCode() == wx.WXK_DOWN:
+        #    print "Down key pressed"
+        if 65 <= event.GetKeyCode() <= 90:
+            letter = ALPHABET[event.GetKeyCode()-65]
+            self.OnCellLetter(letter)
+        else:
+            event.Skip()
+
+    def InitMath(self, max_size, x_off=0, y_off=0, resize_parent=False):
+        self.x_offset = x_off
+        self.y_offset = y_off
+        self.size = (max_size[0]+self.x_offset, max_size[1]+self.y_offset)
+        self.cell_width = (self.size[0] / float(self.conf['width']))
+        self.cell_height = (self.size[1] / float(self.conf['height']))
+        if resize_parent:
+            size = (self.size[0]+self.x_offset, self.size[1]+self.y_offset+22)
+            self.parent.SetSize(size)
+            self.parent.SetMinSize(size)
+
+    def SwitchTurn(self):
+        # the turn timer ran out, possibly after the move
+        self.BranchRecord()
+        self.record.Add(self.moved if self.type == REMOVE else None, None)
+        self.moved = None
+        self.state.SwitchTurn()
+        self.player = self.state.player
+        self.type = self.state.phase
+        self.history.Push(self.state, (len(self.record), None))
+
+    def SetTurnText(self, custom=None):
+        if custom:
+            self.turn_text.SetLabel(custom[0])
+            self.turn_text.SetForegroundColour(custom[1])
+        else:
+            label = self.conf['name'][self.player]+"'s Turn"
+            hint = self.Hint()
+            if hint:
+                label += ' ' + hint
+            self.turn_text.SetLabel(label)
+            self.turn_text.SetForegroundColour(self.conf['colour'][self.player])
+        self.toppanel.Layout()
+
+    def Hint(self):
+        """ How the game ends for the player to act with best play, if the board is solved """
+        if not self.conf.get('hints') or self.database is None or self.game_over:
+            return ''
+        winner, turns = self.database.Outcome(self.state)
+        return '(%s in %d)' % ('wins' if winner == self.player else 'loses', turns)
+
+    def Markers(self):
+        """ (mask, colour) of the cells that should carry a marker """
+        if self.type == MOVE:
+            return self.state.MoveMask(), self.conf['colour'][self.player]
+        return self.state.FreeMask(), 'black'
+
+    def DirtyCells(self):
+        """ Mask of the cells whose look changed since the last GameUpdate """
+        state = self.state
+        markers = self.Markers()[0]
+        pawns = (1 << state.pawns[0]) | (1 << state.pawns[1])
+        style = (self.type, self.player)
+        old_pawns, old_destroyed, old_markers, old_style = self.drawn
+        dirty = (pawns ^ old_pawns) | (state.destroyed ^ old_destroyed) | (markers ^ old_markers)
+        if style != old_style:
+            dirty |= markers
+        self.drawn = (pawns, state.destroyed, markers, style)
+        return dirty
+
+    def UpdateCells(self, dirty):
+        state = self.state
+        markers, colour = self.Markers()
+        for index in BitIndices(dirty):
+            cell = self.cells[state.Location(index)]
+            cell.destroyed = bool(state.destroyed >> index & 1)
+            if index == state.pawns[0]:
+                cell.base.SetBackgroundColour(self.conf['colour'][0])
+            elif index == state.pawns[1]:
+                cell.base.SetBackgroundColour(self.conf['colour'][1])
+            elif cell.destroyed:
+                cell.base.SetBackgroundColour('black')
+            else:
+                cell.base.SetBackgroundColour('white')
+            if markers >> index & 1:
+                cell.ShowBeeper(colour)
+            else:
+                cell.HideBeeper()
+            cell.base.Refresh()
+
+        for p in (0, 1):
+            self.piece[p] = self.cells[state.Location(state.pawns[p])]
+
+    def GameUpdate(self):
+        profiler = self.profiler
+        with profiler.Phase('GameUpdate'):
+            with profiler.Phase('SetTurnText'):
+                self.SetTurnText()
+
+            # repaint only what changed since the last update
+            with profiler.Phase('UpdateCells'):
+                dirty = self.DirtyCells()
+                if self.canvas:
+                    self.canvas.RefreshCells(dirty)
+                else:
+                    self.UpdateCells(dirty)
+            if self.type == MOVE and self.conf['timer'][0]:
+                self.SetTimer(self.conf['timer'][1], self.conf['colour'][self.player])
+
+            with profiler.Phase('Endgame'):
+                if self.state.IsIsolated() and not self.game_over:
+                    self.FinishGame(int(not self.player), self.player)
+                elif self.type == MOVE and not self.game_over and self.client is None:
+                    self.DeclareEndgame()
+
+            with profiler.Phase('StartEngine'):
+                if self.IsComputerTurn():
+                    self.ComputerTurn()
+                elif self.IsPonderTurn():
+                    self.GetThinker().Ponder(self.state)
+
+    def DeclareEndgame(self):
+        """ Ends the game early once the pawns are walled off from each other
+            and the endgame solver can tell who will run out of moves first. """
+        try:
+            result = self.solver.Solve(self.state, ENDGAME_BUDGET, False, time.time() + ENDGAME_SECONDS,
+                                       ENDGAME_CELLS)
+        except EndgameBudget:
+            return
+        if result is not None:
+            winner = result[0]
+            self.FinishGame(winner, int(not winner))
+
+    def IsComputerTurn(self):
+        return (not self.game_over and self.type == MOVE and self.conf['computer'][self.player]
+                and self.player in self.seats)
+
+    def IsPonderTurn(self):
+        """ A human is about to move against a computer player """
+        return (not self.game_over and self.type == MOVE and not self.conf['computer'][self.player]
+                and self.conf['computer'][int(not self.player)] and int(not self.player) in self.seats)
+
+    def ThinkTime(self):
+        if self.conf['timer'][0]:
+            return max(0.1, self.conf['timer'][1] - TIMER_MARGIN)
+        return ENGINE_TIME
+
+    def RecordConf(self):
+        return {
+            'name': [self.conf['name'][0], self.conf['name'][1]],
+            'computer': [bool(self.conf['computer'][0]), bool(self.conf['computer'][1])],
+            'timer': list(self.conf['timer']),
+        }
+
+    def SaveRecord(self):
+        """ Appends the game to RECORD_FILE once, unfinished games included """
+        if self.record_saved or not (self.record.turns or self.game_over):
+            return
+        try:
+            with GameWriter(RECORD_FILE) as writer:
+                writer.Write(self.record)
+        except (EnvironmentError, ValueError):
+            pass  # logging must never get in the way of a game
+        self.record_saved = True
+
+    def GetThinker(self):
+        if self.thinker is None:
+            self.thinker = Thinker(self.engine, self.OnThought)
+        return self.thinker
+
+    def CancelThinking(self):
+        if self.thinker is not None:
+            self.thinker.Cancel()
+
+    def CloseThinker(self):
+        if self.thinker is not None:
+            self.thinker.Close()
+            self.thinker = None
+
+    def ComputerTurn(self):
+        """ Starts the search for the computer player's turn in the background,
+            picking up the ponder search if the human played the predicted turn. """
+        thinker = self.GetThinker()
+        if not thinker.PonderHit(self.state, self.ThinkTime()):
+            thinker.Think(self.state, self.ThinkTime())
+
+    def OnThought(self, job, turn, stats):
+        # called on the thinker's thread, the GUI is only touched from the main loop
+        wx.CallAfter(self.PlayThought, job, turn, stats)
+
+    def PlayThought(self, job, turn, stats):
+        """ Plays a finished search through CellLogic, exactly as if the two
+            cells had been clicked. Results of cancelled searches are dropped. """
+        if not self or self.thinker is None or not self.thinker.IsCurrent(job):
+            return
+        if not self.IsComputerTurn():
+            return
+        to, remove = turn
+        self.profiler.Search(stats)
+        self.CellLogic(to)
+        if remove is not None and not self.game_over:
+            self.CellLogic(remove)
+
+    def Shutdown(self):
+        """ Stops background work before the board goes away """
+        self.CloseThinker()
+        self.SaveRecord()
+        self.profiler.EndGame(self.record.winner)
+        self.profiler.Close()
+        self.Disconnect()
+
+    ## ------------ HISTORY ------------##
+    def JumpTo(self, ply):
+        """ Shows position `ply` of the game on the existing widgets. Playing
+            on from there starts a new line and forgets the old one. """
+        if self.client is not None or not 0 <= ply < len(self.history) or ply == self.history.ply:
+            return
+        self.CancelThinking()
+        snapshot, (turns, moved) = self.history.Jump(ply)
+        self.state.Restore(snapshot)
+        self.moved = moved
+        self.player = self.state.player
+        self.type = self.state.phase
+        if self.game_over:
+            self.game_over = False
+            self.ClearFinish()
+        self.GameUpdate()
+
+    def BranchRecord(self):
+        """ Called before a cell is played: from an earlier position that
+            starts a new line, so the recorded turns after it are dropped and
+            the new game is saved in its own right """
+        if not self.history.CanRedo():
+            return
+        del self.record.turns[self.history.Data()[0]:]
+        self.record.winner = None
+        self.record_saved = False
+
+    def Undo(self):
+        self.JumpTo(self.history.ply - 1)
+
+    def Redo(self):
+        self.JumpTo(self.history.ply + 1)
+
+    def TakeBack(self):
+        """ Goes back to the last position where a human had to move, so
+            the computer does not simply play its reply again """
+        humans = [p for p in (0, 1) if not self.conf['computer'][p]]
+        if not humans:
+            return self.Undo()
+        ply = self.history.ply - 1
+        while ply > 0:
+            pawns, destroyed, player, phase = self.history.Snapshot(ply)
+            if phase == MOVE and player in humans:
+                break
+            ply -= 1
+        self.JumpTo(max(ply, 0))
+
+    ## ------------ REMOTE GAMES ------------##
+    def Connect(self):
+        try:
+            self.client = GameClient(self.conf['server'], self.OnServerMessage)
+        except (socket.error, ValueError) as error:
+            wx.MessageBox('Could not reach %s: %s' % (self.conf['server'], error), 'Isolation')
+            return
+        self.RequestGame()
+
+    def Disconnect(self):
+        if self.client is not None:
+            client, self.client = self.client, None
+            client.Close()
+        self.game_id = None
+        self.seats = (0, 1)
+
+    def RequestGame(self):
+        """ Leaves the current server game and starts a new one, or joins the
+            game named in the address the first time """
+        if self.game_id is not None:
+            self.client.Send({'op': 'leave', 'game': self.game_id})
+        self.game_id = None
+        self.seats = ()
+        if self.client.game is not None:
+            self.client.Send({'op': 'join', 'game': self.client.game})
+            self.client.game = None
+        else:
+            timer = self.conf['timer'][1] if self.conf['timer'][0] else 0
+            self.client.Send({'op': 'new', 'width': self.conf['width'], 'height': self.conf['height'], 'timer': timer})
+
+    def OnServerMessage(self, message):
+        # called on the client's thread
+        wx.CallAfter(self.ServerMessage, message)
+
+    def ServerMessage(self, message):
+        if not self or self.client is None:
+            return
+        if message is None:
+            # connection lost, carry on as a local game
+            self.Disconnect()
+            return
+        op = message['op']
+        if op == 'joined' and self.game_id is None:
+            self.JoinedGame(message)
+        elif message.get('game') != self.game_id:
+            return
+        elif op == 'seats':
+            self.seats = tuple(message['seats'])
+            self.GameUpdate()
+        elif op == 'played':
+            self.ApplyCell(message['cell'])
+        elif op == 'timeout':
+            self.SwitchTurn()
+            self.GameUpdate()
+        elif op == 'over' and not self.game_over:
+            self.FinishGame(message['winner'], 1 - message['winner'])
+        # errors need nothing: the cell was refused and the board never changed
+
+    def JoinedGame(self, message):
+        if (message['width'], message['height']) != (self.conf['width'], self.conf['height']):
+            self.Disconnect()
+            wx.MessageBox('Game %d is played on a %dx%d board' % (message['game'], message['width'], message['height']),
+                          'Isolation')
+            return
+        self.game_id = message['game']
+        self.seats = tuple(message['seats'])
+        self.state = IsolationState(message['width'], message['height'], message['pawns'],
+                                    message['destroyed'], message['player'], message['phase'])
+        self.record = GameRecord.FromState(self.state, self.RecordConf())
+        self.record_saved = False
+        self.moved = self.state.pawns[self.state.player] if self.state.phase == REMOVE else None
+        self.history = History(self.state, (0, self.moved))
+        self.player = self.state.player
+        self.type = self.state.phase
+        self.GameUpdate()
+
+    def FinishGame(self, wid, lid):
+        self.game_over = True
+        self.CancelThinking()
+        if self.type == REMOVE and len(self.record) == self.history.Data()[0]:
+            # the mover walked into a dead end (not yet recorded if redone)
+            self.record.Add(self.moved, None)
+        self.record.winner = wid
+        self.SaveRecord()
+        if self.conf['timer'][0]:
+            self.timer.Stop()
+            self.timer_text.Hide()
+
+        winner, loser = self.conf['name'][wid], self.conf['name'][lid]
+        winner_colour = self.conf['colour'][wid]
+                    
+        self.SetTurnText(('%s wins!' %winner, winner_colour))
+
+        if self.canvas:
+            self.canvas.Finish(wid, lid)
+        for cell in self.cells.itervalues():
+            cell.beeper.Hide()
+            cell.DisableCell()
+            if cell == self.piece[wid]:
+                pass
+            elif cell == self.piece[lid]:
+                cell.Greyscale()
+                cell.ShowDeathBitmap()
+            else:
+                cell.Greyscale()
+        self.player = lid
+        self.Refresh()
+
+    def OnCellClick(self, event):
+        cell = event.GetEventObject()
+        self.CellLogic(cell.GetIndex())
+
+    def OnCellLetter(self, letter):
+        index = ALPHABET.index(letter)
+        if index < self.state.size:
+            self.CellLogic(index)
+        else:
+            pass
+            # PlaySound(BOOP_SOUND)
+
+    def CellLogic(self, index):
+        if self.client is not None:
+            # the server referees remote games and echoes every accepted cell back
+            if self.game_id is not None and self.player in self.seats and not self.game_over:
+                self.client.Send({'op': 'play', 'game': self.game_id, 'cell': index})
+            return
+        self.ApplyCell(index)
+
+    def ApplyCell(self, index):
+        player, phase, played = self.player, self.type, False
+        with self.profiler.Phase('CellLogic'):
+            if self.type == MOVE:
+                if self.state.IsLegalMove(index):
+                    self.BranchRecord()
+                    self.state.MovePawn(index)
+                    self.moved = index
+                    played = True
+                else:
+                    pass
+                    # PlaySound(BOOP_SOUND)
+            elif self.type == REMOVE:
+                if self.state.IsLegalRemove(index):
+                    self.BranchRecord()
+                    self.state.RemoveCell(index)
+                    self.record.Add(self.moved, index)
+                    self.moved = None
+                    played = True
+            self.player = self.state.player
+            self.type = self.state.phase
+            if played:
+                self.history.Push(self.state, (len(self.record), self.moved))
+            self.GameUpdate()
+        if played:
+            self.profiler.Cell(index, phase, player)
+            self.ShowProfile()
+
+    def ShowProfile(self):
+        if self.overlay is not None:
+            self.overlay.SetLabel(Overlay(self.profiler.last))
+            self.overlay.Raise()
+
+
+## ------------ MAIN APP PANEL ------------##
+class MainFrame(wx.Frame):
+    def __init__(self, parent, id=wx.ID_ANY, title='Isolation', pos=(-1, -1), size=(550, 550), style=wx.DEFAULT_FRAME_STYLE):
+        wx.Frame.__init__ (self, parent, id, title, pos, size, style)
+
+        self.size = self.GetSize()
+        self.default_size = size
+        size = (size[0], size[1]+142)
+        self.SetMinSize(size)
+        self.SetSize(size)
+
+        self.Bind(wx.EVT_CLOSE, self.onClose)
+
+        ## define menubar and menus
+        self.menubar = wx.MenuBar(0)
+        self.fileMenu = wx.Menu()
+        ## add items to file Menu
+        self.new_menuitem = wx.MenuItem(self.fileMenu, wx.ID_ANY, "New Game \tCtrl+N")
+        self.quit_menuitem = wx.MenuItem(self.fileMenu, wx.ID_ANY, "Quit Isolation \tCtrl+Q")
+        self.fileMenu.AppendItem(self.new_menuitem)
+        self.fileMenu.AppendSeparator()
+        self.fileMenu.AppendItem(self.quit_menuitem)
+        # append menus to menubar
+        self.menubar.Append(self.fileMenu, "File")
+        self.gameMenu = wx.Menu()
+        for label, action in (("Take Back \tCtrl+Z", 'TakeBack'), ("Back One Cell \tCtrl+Left", 'Undo'),
+                              ("Forward One Cell \tCtrl+Right", 'Redo'), ("First Position \tCtrl+Home", 0),
+                              ("Last Position \tCtrl+End", -1)):
+            item = wx.MenuItem(self.gameMenu, wx.ID_ANY, label)
+            self.gameMenu.AppendItem(item)
+            self.Bind(wx.EVT_MENU, lambda event, action=action: self.OnHistory(event, action), item)
+        self.menubar.Append(self.gameMenu, "Game")
+        # menu item bindings
+        self.Bind(wx.EVT_MENU, self.NewGame, self.new_menuitem)
+        self.Bind(wx.EVT_MENU, self.onClose, self.quit_menuitem)
+        ## set menubar
+        self.SetMenuBar(self.menubar)
+
+        self.SetBackgroundColour('black')
+        self.board = False
+        self.startup = False
+        self.conf = {
+            'timer': [False, 15],
+            'width': 5,
+            'height': 7,
+            'colour': {0: (0, 0, 255), 1: (255, 0, 0)},
+            'name': {0: 'Connor', 1: 'Jack'},
+            'computer': {0: False, 1: False},
+            'canvas': False,
+            'hints': False,
+            'server': None,
+            'profile': False,
+        }
+
+        self.mainsizer = wx.BoxSizer(wx.VERTICAL)
+        self.SetSizer(self.mainsizer)
+        self.Layout()
+        self.Centre(wx.BOTH)
+
+        self.NewGame()
+        self.Bind(wx.EVT_WINDOW_MODAL_DIALOG_CLOSED, self.NewGameClose)
+
+    def onClose(self, event):
+        if self.board:
+            self.board.Shutdown()
+        self.Destroy()
+
+    def OnHistory(self, event, action):
+        """ A board method name, or a ply to jump to (-1 is the last) """
+        if not self.board:
+            return
+        if isinstance(action, int):
+            self.board.JumpTo(action % len(self.board.history))
+        else:
+            getattr(self.board, action)()
+
+    def NewGame(self, event=None):
+        dialog = NewGameDialog(self, wx.ID_ANY, "New Game", size=(350, 265), style=wx.DEFAULT_DIALOG_STYLE)
+        dialog.ShowWindowModal()
+
+    def NewGameClose(self, event):
+        """ Called when the NewGame Modal Window is closed
+            Creates new board and plays startup sound if confirmed.
+            If user canceled the window and self.startup is False, the app will quit. """
+        dialog = event.GetDialog()
+        return_code = event.GetReturnCode()
+        if return_code == wx.ID_OK:
+            if not self.startup:
+                self.startup = True
+            self.RedrawBoard(dialog.conf)
+        elif return_code == wx.ID_CANCEL:
+            if not self.startup:
+                self.Destroy()
+        dialog.Destroy()
+
+    def RedrawBoard(self, conf):
+        """ Restarts the current board if it has the right shape, otherwise
+            destroys it (if exists) and creates a new one """
+        if self.board and self.board.CanReset(conf):
+            self.board.Reset()
+            return
+        if self.board:
+            self.board.Shutdown()
+            self.board.Destroy()
+        # PlaySound(STARTUP_SOUND)
+        self.board = GameBoard(self, self.size, conf, 1)
+        self.mainsizer.Add(self.board, 1, wx.EXPAND, 0)
+        self.Layout()
+        self.Centre(wx.BOTH)
+
+
+
+## ------------ NEW GAME DIALOG ------------##
+class NewGameDialog(wx.Dialog):
+    def __init__(self, parent, *args, **kwargs):
+        wx.Dialog.__init__(self, parent, *args, **kwargs)
+        self.parent = parent
+
+        self.conf = self.parent.conf
+        self.counter = {}
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+
+        self.player1_label = wx.StaticText(self, wx.ID_ANY, 'Player 1:')
+        self.player1_input = wx.TextCtrl(self, wx.ID_ANY, self.conf['name'][0], size=(110, -1))
+        self.player1_input.Bind(wx.EVT_TEXT, lambda event, i=0: self.OnPlayerInput(event, i))
+        self.player1_colour = csel.ColourSelect(self, wx.ID_ANY, colour=self.conf['colour'][0], size=(22, 22), style=wx.SIMPLE_BORDER)
+        self.player1_colour.Bind(csel.EVT_COLOURSELECT, lambda event, i=0: self.OnPlayerColour(event, i))
+        self.player1_computer = wx.CheckBox(self, wx.ID_ANY, label='CPU')
+        self.player1_computer.SetValue(self.conf['computer'][0])
+        self.player1_computer.Bind(wx.EVT_CHECKBOX, lambda event, i=0: self.OnPlayerComputer(event, i))
+        box = wx.BoxSizer(wx.HORIZONTAL)
+        box.Add(self.player1_label, 0, wx.ALL, 5)
+        box.Add(self.player1_input, 0, wx.ALL, 5)
+        box.Add(self.player1_colour, 0, wx.ALL, 5)
+        box.Add(self.player1_computer, 0, wx.ALL, 5)
+        sizer.Add(box, 0, wx.EXPAND, 0)
+
+        self.player2_label = wx.StaticText(self, wx.ID_ANY, 'Player 2:')
+        self.player2_input = wx.TextCtrl(self, wx.ID_ANY, self.conf['name'][1], size=(110, -1))
+        self.player2_input.Bind(wx.EVT_TEXT, lambda event, i=1: self.OnPlayerInput(event, i))
+        self.player2_colour = csel.ColourSelect(self, wx.ID_ANY, colour=self.conf['colour'][1], size=(22, 22), style=wx.SIMPLE_BORDER)
+        self.player2_colour.Bind(csel.EVT_COLOURSELECT, lambda event, i=1: self.OnPlayerColour(event, i))
+        self.player2_computer = wx.CheckBox(self, wx.ID_ANY, label='CPU')
+        self.player2_computer.SetValue(self.conf['computer'][1])
+        self.player2_computer.Bind(wx.EVT_CHECKBOX, lambda event, i=1: self.OnPlayerComputer(event, i))
+        box = wx.BoxSizer(wx.HORIZONTAL)
+        box.Add(self.player2_label, 0, wx.ALL, 5)
+        box.Add(self.player2_input, 0, wx.ALL, 5)
+        box.Add(self.player2_colour, 0, wx.ALL, 5)
+        box.Add(self.player2_computer, 0, wx.ALL, 5)
+        sizer.Add(box, 0, wx.EXPAND, 0)
+
+        self.width_label = wx.StaticText(self, wx.ID_ANY, 'Width of Board')
+        self.width_slider = wx.Slider(self, wx.ID_ANY, self.conf['width'], 3, MAX_SIDE)
+        self.width_slider.Bind(wx.EVT_SCROLL_THUMBTRACK, lambda event, wh='width': self.OnSlider(event, wh))
+        self.counter['width'] = wx.StaticText(self, wx.ID_ANY, str(self.conf['width']))
+        box = wx.BoxSizer(wx.HORIZONTAL)
+        box.Add(self.width_label, 0, wx.ALL, 5)
+        box.AddStretchSpacer(1)
+        box.Add(self.width_slider, 0, wx.ALL, 5)
+        box.Add(self.counter['width'], 0, wx.ALL, 5)
+        sizer.Add(box, 0, wx.EXPAND, 0)
+
+        self.height_label = wx.StaticText(self, wx.ID_ANY, 'Height of Board')
+        self.height_slider = wx.Slider(self, wx.ID_ANY, self.conf['height'], 3, MAX_SIDE)
+        self.height_slider.Bind(wx.EVT_SCROLL_THUMBTRACK, lambda event, wh='height': self.OnSlider(event, wh))
+        self.counter['height'] = wx.StaticText(self, wx.ID_ANY, str(self.conf['height']))
+        box = wx.BoxSizer(wx.HORIZONTAL)
+        box.Add(self.height_label, 0, wx.ALL, 5)
+        box.AddStretchSpacer(1)
+        box.Add(self.height_slider, 0, wx.ALL, 5)
+        box.Add(self.counter['height'], 0, wx.ALL, 5)
+        sizer.Add(box, 0, wx.EXPAND, 0)
+
+        self.timer_checkbox = wx.CheckBox(self, wx.ID_ANY, label='Timer:')
+        self.timer_checkbox.SetValue(self.conf['timer'][0])
+        self.timer_input = wx.SpinCtrl(self, wx.ID_ANY, str(self.conf['timer'][1]), size=(60, -1))
+        self.timer_checkbox.Bind(wx.EVT_CHECKBOX, self.OnTimer)
+        self.timer_input.Bind(wx.EVT_TEXT, self.OnTimer)
+        self.canvas_checkbox = wx.CheckBox(self, wx.ID_ANY, label='Fast board')
+        self.canvas_checkbox.SetValue(self.conf['canvas'])
+        self.canvas_checkbox.Bind(wx.EVT_CHECKBOX, self.OnCanvas)
+        self.EnableCanvas()
+        self.hints_checkbox = wx.CheckBox(self, wx.ID_ANY, label='Hints')
+        self.hints_checkbox.SetValue(self.conf['hints'])
+        self.hints_checkbox.Bind(wx.EVT_CHECKBOX, self.OnHints)
+        self.profile_checkbox = wx.CheckBox(self, wx.ID_ANY, label='Profile')
+        self.profile_checkbox.SetValue(self.conf['profile'])
+        self.profile_checkbox.SetToolTipString('time every cell and search, traced to %s' % TRACE_FILE)
+        self.profile_checkbox.Bind(wx.EVT_CHECKBOX, self.OnProfile)
+        box = wx.BoxSizer(wx.HORIZONTAL)
+        box.Add(self.timer_checkbox, 0, wx.TOP|wx.LEFT, 6)
+        box.Add(self.timer_input, 0, wx.BOTTOM|wx.LEFT, 5)
+        box.AddStretchSpacer(1)
+        box.Add(self.profile_checkbox, 0, wx.TOP|wx.RIGHT, 6)
+        box.Add(self.hints_checkbox, 0, wx.TOP|wx.RIGHT, 6)
+        box.Add(self.canvas_checkbox, 0, wx.TOP|wx.RIGHT, 6)
+        sizer.Add(box, 0, wx.EXPAND, 0)
+
+        self.server_label = wx.StaticText(self, wx.ID_ANY, 'Server:')
+        self.server_input = wx.TextCtrl(self, wx.ID_ANY, self.conf['server'] or '', size=(200, -1))
+        self.server_input.SetToolTipString('host:port for a new game, host:port#game to join one, empty to play locally')
+        self.server_input.Bind(wx.EVT_TEXT, self.OnServer)
+        box = wx.BoxSizer(wx.HORIZONTAL)
+        box.Add(self.server_label, 0, wx.ALL, 5)
+        box.Add(self.server_input, 0, wx.ALL, 5)
+        sizer.Add(box, 0, wx.EXPAND, 0)
+
+        sizer.AddStretchSpacer(1)
+
+        line = wx.StaticLine(self, wx.ID_ANY, size=(20,-1), style=wx.LI_HORIZONTAL)
+        sizer.Add(line, 0, wx.GROW|wx.ALIGN_CENTER_VERTICAL|wx.RIGHT|wx.TOP, 5)
+
+        btnsizer = wx.StdDialogButtonSizer()
+        btn = wx.Button(self, wx.ID_OK)
+        btn.SetDefault()
+        btnsizer.AddButton(btn)
+        btn = wx.Button(self, wx.ID_CANCEL)
+        btnsizer.AddButton(btn)
+        btnsizer.Realize()
+        sizer.Add(btnsizer, 0, wx.ALIGN_CENTRE|wx.ALL, 2)
+
+        self.SetSizer(sizer)
+        self.Layout()
+
+    def OnTimer(self, event):
+        if self.timer_checkbox.IsChecked():
+            self.conf['timer'][0] = True
+        else:
+            self.conf['timer'][0] = False
+        self.conf['timer'][1] = self.timer_input.GetValue()
+
+    def OnCanvas(self, event):
+        self.conf['canvas'] = self.canvas_checkbox.IsChecked()
+
+    def OnServer(self, event):
+        self.conf['server'] = self.server_input.GetValue().strip() or None
+
+    def OnHints(self, event):
+        self.conf['hints'] = self.hints_checkbox.IsChecked()
+
+    def OnProfile(self, event):
+        self.conf['profile'] = self.profile_checkbox.IsChecked()
+
+    def OnPlayerColour(self, event, i):
+        self.conf['colour'][i] = event.GetValue()
+
+    def OnPlayerInput(self, event, i):
+        self.conf['name'][i] = event.GetEventObject().GetValue()
+
+    def OnPlayerComputer(self, event, i):
+        self.conf['computer'][i] = event.GetEventObject().GetValue()
+
+    def OnSlider(self, event, wh):
+        val = event.GetEventObject().GetValue()
+        self.conf[wh] = val
+        self.counter[wh].SetLabel(str(val))
+        self.EnableCanvas()
+        self.Layout()
+
+    def EnableCanvas(self):
+        # large boards are always drawn on the canvas
+        self.canvas_checkbox.Enable(max(self.conf['width'], self.conf['height']) <= WIDGET_SIDE)
+
+
+
+## ------------ BENCHMARKS (SEE bench.py) ------------##
+class BenchFrame(wx.Frame):
+    """ Holds a GameBoard without asking for a new game """
+    def NewGame(self, event=None):
+        pass
+
+
+def BenchmarkBoard(conf, cells=20, paints=20, seed=0):
+    """ {'build': seconds to build a GameBoard for conf, 'cell': mean seconds
+        per cell played through ApplyCell, 'update': mean seconds of the
+        GameUpdate inside it, 'paint': mean seconds to draw the visible
+        canvas (0 without one)} """
+    app = wx.GetApp() or wx.App(False)
+    rng = random.Random(seed)
+    frame = BenchFrame(None, size=(550, 692))
+    start = time.time()
+    board = GameBoard(frame, (550, 550), conf, 1)
+    build = time.time() - start
+    board.profiler = Profiler()
+    board.profiler.NewGame(conf['width'], conf['height'])
+
+    played, elapsed, update = 0, 0.0, 0.0
+    while played < cells and not board.game_over:
+        state = board.state
+        index = rng.choice(state.LegalMoves() if board.type == MOVE else state.LegalRemovals())
+        start = time.time()
+        board.ApplyCell(index)
+        elapsed += time.time() - start
+        update += board.profiler.last['ms']['GameUpdate'] / 1000.0
+        played += 1
+
+    paint = 0.0
+    if board.canvas:
+        width, height = board.canvas.GetClientSize()
+        bitmap = wx.EmptyBitmap(width, height)
+        dc = wx.MemoryDC(bitmap)
+        start = time.time()
+        for _ in range(paints):
+            board.canvas.Draw(dc, wx.Rect(0, 0, width, height))
+        paint = (time.time() - start) / paints
+        dc.SelectObject(wx.NullBitmap)
+    board.CloseThinker()
+    frame.Destroy()
+    played = max(1, played)
+    return {'build': build, 'cell': elapsed / played, 'update': update / played, 'paint': paint}
+
+
+def Main():
+    app = wx.App(False)
+    frame = MainFrame(None)
+    frame.Show()
+    app.MainLoop()
+
+
+if __name__ == "__main__":
+    Main()
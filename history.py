@@ -0,0 +1,57 @@
+# -*- coding: utf-8
+""" Move history with constant-time undo, redo and jumps.
+
+    Every position of a game is kept as an IsolationState.Snapshot(), a
+    small immutable tuple, so going back or forward any number of cells is
+    one Restore() and nothing is replayed. Playing a cell after undoing drops
+    the positions that came after it. Each entry can carry extra data for the
+    caller; the GUI keeps the length of its game record there. """
+from gamestate import IsolationState
+
+
+class History(object):
+    def __init__(self, state, data=None):
+        self.width = state.width
+        self.height = state.height
+        self.entries = [(state.Snapshot(), data)]
+        self.ply = 0  # index of the current position
+
+    def __len__(self):
+        return len(self.entries)
+
+    def Push(self, state, data=None):
+        """ Adds the position just reached, forgetting any redo positions """
+        del self.entries[self.ply+1:]
+        self.entries.append((state.Snapshot(), data))
+        self.ply += 1
+
+    def CanUndo(self):
+        return self.ply > 0
+
+    def CanRedo(self):
+        return self.ply < len(self.entries) - 1
+
+    def Jump(self, ply):
+        """ Makes position `ply` current and returns its (snapshot, data) """
+        if not 0 <= ply < len(self.entries):
+            raise IndexError('ply %d out of range' % ply)
+        self.ply = ply
+        return self.entries[ply]
+
+    def Undo(self):
+        return self.Jump(self.ply - 1)
+
+    def Redo(self):
+        return self.Jump(self.ply + 1)
+
+    def Snapshot(self, ply=None):
+        return self.entries[self.ply if ply is None else ply][0]
+
+    def Data(self, ply=None):
+        return self.entries[self.ply if ply is None else ply][1]
+
+    def State(self, ply=None):
+        """ A new IsolationState at position `ply` (default: the current one),
+            e.g. for an engine to search from while the game goes on """
+        pawns, destroyed, player, phase = self.Snapshot(ply)
+        return IsolationState(self.width, self.height, pawns, destroyed, player, phase)
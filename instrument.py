@@ -0,0 +1,210 @@
+# -*- coding: utf-8
+""" Opt-in timing of the GUI and the engine.
+
+    A Profiler collects, for every cell played, the wall time of each named
+    phase (CellLogic, GameUpdate, UpdateCells, ...) plus the counters of the
+    engine search that chose it, and appends one JSON line per cell to a
+    trace file. With profile=True the GUI thread also runs under cProfile
+    and each game is dumped to its own .prof file. Boards that are not being
+    profiled get NULL_PROFILER, which does nothing.
+
+    python instrument.py ~/.isolation-trace.jsonl
+
+    summarises a trace: total and worst time per phase, and search speed. """
+from __future__ import print_function
+
+import cProfile
+import json
+import sys
+import time
+
+# engine counters worth keeping per search (see AlphaBetaEngine.Search)
+ENGINE_KEYS = ('nodes', 'nps', 'depth', 'score', 'time', 'branching', 'ebf', 'cutoff_rate',
+               'first_cutoff_rate', 'tt_hit_rate', 'endgames', 'database', 'book')
+
+
+class Phase(object):
+    """ Adds the time spent inside a with block to profiler.phases[name] """
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, *exc):
+        phases = self.profiler.phases
+        phases[self.name] = phases.get(self.name, 0.0) + time.time() - self.start
+
+
+class NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+class NullProfiler(object):
+    """ Stands in for a Profiler when instrumentation is off """
+    enabled = False
+    last = None
+
+    def NewGame(self, width, height):
+        pass
+
+    def Phase(self, name):
+        return NULL_PHASE
+
+    def Search(self, stats):
+        pass
+
+    def Cell(self, index, phase, player):
+        pass
+
+    def EndGame(self, winner=None):
+        pass
+
+    def Close(self):
+        pass
+
+
+class Profiler(object):
+    def __init__(self, trace=None, profile=False):
+        self.enabled = True
+        self.trace = open(trace, 'a') if trace else None
+        self.profile_prefix = trace.rsplit('.', 1)[0] if trace else 'isolation'
+        self.profile = cProfile.Profile() if profile else None
+        self.game = None
+        self.cells = 0
+        self.phases = {}
+        self.search = None
+        self.last = None  # the last line written, for the overlay
+
+    def NewGame(self, width, height):
+        self.EndGame()
+        self.game = '%s-%dx%d' % (time.strftime('%Y%m%d-%H%M%S'), width, height)
+        self.cells = 0
+        self.phases = {}
+        self.search = None
+        if self.profile:
+            self.profile.enable()
+
+    def Phase(self, name):
+        return Phase(self, name)
+
+    def Search(self, stats):
+        """ Engine stats of the search whose turn is about to be played """
+        self.search = dict((key, stats[key]) for key in ENGINE_KEYS if key in stats)
+
+    def Cell(self, index, phase, player):
+        """ Closes the record of one played cell: every phase timed since the
+            previous cell belongs to it """
+        if self.game is None:
+            return
+        self.last = {
+            'game': self.game,
+            'cell': self.cells,
+            'index': index,
+            'phase': phase,
+            'player': player,
+            'ms': dict((name, round(seconds*1000, 3)) for name, seconds in self.phases.items()),
+        }
+        if self.search is not None:
+            self.last['engine'] = self.search
+        self.cells += 1
+        self.phases = {}
+        self.search = None
+        self.Write(self.last)
+
+    def EndGame(self, winner=None):
+        if self.game is None:
+            return
+        self.Write({'game': self.game, 'cells': self.cells, 'winner': winner})
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats('%s-%s.prof' % (self.profile_prefix, self.game))
+            self.profile = cProfile.Profile()
+        self.game = None
+
+    def Write(self, line):
+        if self.trace is None:
+            return
+        try:
+            self.trace.write(json.dumps(line, sort_keys=True) + '\n')
+            self.trace.flush()
+        except (EnvironmentError, ValueError):
+            pass  # tracing must never get in the way of a game
+
+    def Close(self):
+        self.EndGame()
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+
+NULL_PHASE = NullPhase()
+NULL_PROFILER = NullProfiler()
+
+
+def Overlay(line):
+    """ A few lines of text describing one traced cell """
+    if not line:
+        return ''
+    text = ['cell %d' % line['cell']]
+    for name, ms in sorted(line['ms'].items(), key=lambda item: -item[1]):
+        text.append('%-14s %8.2f ms' % (name, ms))
+    engine = line.get('engine')
+    if engine:
+        if engine.get('database'):
+            text.append('database, decided in %d turns' % engine['depth'])
+        elif engine.get('book'):
+            text.append('opening book, searched to depth %d offline' % engine['depth'])
+        else:
+            text.append('search %.2f s  depth %d  %d nodes  %.0f nps' % (
+                engine['time'], engine['depth'], engine['nodes'], engine['nps']))
+            text.append('branching %.1f  ebf %.1f  cutoffs %.0f%% (first %.0f%%)  tt hits %.0f%%' % (
+                engine.get('branching', 0), engine.get('ebf', 0), 100*engine.get('cutoff_rate', 0),
+                100*engine.get('first_cutoff_rate', 0), 100*engine.get('tt_hit_rate', 0)))
+    return '\n'.join(text)
+
+
+def Summarise(lines):
+    """ {phase: (count, total ms, worst ms)} and the engine searches of a trace """
+    phases = {}
+    searches = []
+    for line in lines:
+        for name, ms in line.get('ms', {}).items():
+            count, total, worst = phases.get(name, (0, 0.0, 0.0))
+            phases[name] = (count + 1, total + ms, max(worst, ms))
+        if line.get('engine') and not (line['engine'].get('database') or line['engine'].get('book')):
+            searches.append(line['engine'])
+    return phases, searches
+
+
+def Main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print('usage: python instrument.py TRACE.jsonl', file=sys.stderr)
+        return 2
+    with open(argv[0]) as trace:
+        phases, searches = Summarise(json.loads(line) for line in trace if line.strip())
+    print('%-14s %7s %10s %10s %10s' % ('phase', 'count', 'total ms', 'mean ms', 'worst ms'))
+    for name, (count, total, worst) in sorted(phases.items(), key=lambda item: -item[1][1]):
+        print('%-14s %7d %10.1f %10.2f %10.2f' % (name, count, total, total/count, worst))
+    if searches:
+        nodes = sum(s['nodes'] for s in searches)
+        seconds = sum(s['time'] for s in searches)
+        print('%d searches: %d nodes in %.1f s (%.0f nps), mean depth %.1f, mean tt hit rate %.0f%%' % (
+            len(searches), nodes, seconds, nodes/seconds if seconds else 0,
+            float(sum(s['depth'] for s in searches))/len(searches),
+            100*sum(s.get('tt_hit_rate', 0) for s in searches)/len(searches)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
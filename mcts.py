@@ -0,0 +1,279 @@
+# -*- coding: utf-8
+""" Monte Carlo tree search (UCT) player built on the headless IsolationState.
+
+    The tree alternates move and removal decisions, so a turn costs at most
+    8 + width*height children instead of their product. Playouts use the
+    bitmask move generator directly: a random move that does not isolate the
+    mover, then a removal next to the opponent when there is one. With
+    workers > 1 independent trees are grown in a process pool from the same
+    root and their root statistics are summed when the time slice ends.
+
+    python mcts.py --width 9 --height 9 --time 1.0 --games 20 """
+from __future__ import print_function
+
+import argparse
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from gamestate import IsolationState, BitIndices, MOVE, REMOVE
+
+EXPLORATION = 1.0
+
+
+def SafeMoves(state):
+    """ Mask of the moves that leave the player to move a free neighbour """
+    neighbours = state.neighbours
+    base = state.blocked ^ (1 << state.pawns[state.player])
+    safe = 0
+    for to in BitIndices(state.MoveMask()):
+        if neighbours[to] & ~(base | (1 << to)):
+            safe |= 1 << to
+    return safe
+
+
+def RandomBit(mask, rng, size=0):
+    """ Index of a random set bit. Dense masks are sampled by rejection. """
+    for _ in range(size and 8):
+        index = rng.randrange(size)
+        if mask >> index & 1:
+            return index
+    return rng.choice(list(BitIndices(mask)))
+
+
+def Playout(state, rng):
+    """ Plays state out at random on plain integers and returns the winner.
+        state itself is left untouched. """
+    neighbours, full, size = state.neighbours, state.full, state.size
+    blocked, pawns, player = state.blocked, list(state.pawns), state.player
+    randrange = rng.randrange
+    if state.phase == REMOVE:
+        near = neighbours[pawns[1-player]] & ~blocked
+        blocked |= 1 << (RandomBit(near, rng) if near else RandomBit(full & ~blocked, rng, size))
+        player = 1 - player
+    while True:
+        frm = pawns[player]
+        base = blocked ^ (1 << frm)
+        safe = []
+        for to in BitIndices(neighbours[frm] & ~blocked):
+            if neighbours[to] & ~(base | (1 << to)):
+                safe.append(to)
+        if not safe:
+            return 1 - player
+        to = safe[randrange(len(safe))]
+        blocked = base | (1 << to)
+        pawns[player] = to
+        near = neighbours[pawns[1-player]] & ~blocked
+        if near:
+            blocked |= 1 << RandomBit(near, rng)
+        else:
+            blocked |= 1 << RandomBit(full & ~blocked, rng, size)
+        player = 1 - player
+
+
+## ------------ SEARCH TREE ------------##
+class Node(object):
+    __slots__ = ('action', 'parent', 'player', 'children', 'untried', 'visits', 'wins', 'winner')
+
+    def __init__(self, state, action=None, parent=None, player=None):
+        self.action = action
+        self.parent = parent
+        self.player = player  # who played action to get here
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+        self.winner = None
+        if state.phase == MOVE:
+            actions = SafeMoves(state)
+            if not actions:
+                self.winner = 1 - state.player
+            self.untried = list(BitIndices(actions))
+        else:
+            # opponent's neighbours are expanded first (popped from the end)
+            near = state.neighbours[state.pawns[1-state.player]]
+            self.untried = sorted(BitIndices(state.full & ~state.blocked), key=lambda i: near >> i & 1)
+
+    def Select(self, c):
+        log_n = math.log(self.visits)
+        best, best_value = None, -1.0
+        for child in self.children:
+            value = child.wins/child.visits + c*math.sqrt(log_n/child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+
+def Apply(state, action):
+    if state.phase == MOVE:
+        state.MovePawn(action)
+    else:
+        state.RemoveCell(action)
+
+
+def GrowTree(root_state, deadline, iterations, c, rng):
+    """ Runs UCT iterations from root_state and returns (root, playouts) """
+    root = Node(root_state)
+    playouts = 0
+    while (iterations is None or playouts < iterations) and (deadline is None or time.time() < deadline):
+        node, state = root, root_state.Copy()
+        # selection
+        while not node.untried and node.children:
+            node = node.Select(c)
+            Apply(state, node.action)
+        # expansion
+        if node.untried and node.winner is None:
+            action = node.untried.pop()
+            player = state.player
+            Apply(state, action)
+            child = Node(state, action, node, player)
+            node.children.append(child)
+            node = child
+        # simulation
+        winner = node.winner
+        if winner is None:
+            winner = Playout(state, rng)
+        playouts += 1
+        # backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.player == winner:
+                node.wins += 1
+            node = node.parent
+    return root, playouts
+
+
+def RootStats(root):
+    """ {move: [visits, wins, {removal: [visits, wins]}]} for merging trees """
+    stats = {}
+    for child in root.children:
+        removals = dict((grandchild.action, [grandchild.visits, grandchild.wins]) for grandchild in child.children)
+        stats[child.action] = [child.visits, child.wins, removals]
+    return stats
+
+
+def MergeStats(total, stats):
+    for move, (visits, wins, removals) in stats.items():
+        entry = total.setdefault(move, [0, 0.0, {}])
+        entry[0] += visits
+        entry[1] += wins
+        for remove, (rvisits, rwins) in removals.items():
+            rentry = entry[2].setdefault(remove, [0, 0.0])
+            rentry[0] += rvisits
+            rentry[1] += rwins
+    return total
+
+
+def _Worker(job):
+    """ Pool entry point: grows one tree and returns its root statistics """
+    width, height, pawns, destroyed, player, time_limit, iterations, c, seed = job
+    state = IsolationState(width, height, pawns, destroyed, player)
+    deadline = time.time() + time_limit if time_limit else None
+    root, playouts = GrowTree(state, deadline, iterations, c, random.Random(seed))
+    return RootStats(root), playouts
+
+
+## ------------ MCTS ENGINE ------------##
+class MCTSEngine(object):
+    def __init__(self, workers=1, exploration=EXPLORATION, iterations=None, seed=None):
+        self.workers = workers
+        self.exploration = exploration
+        self.iterations = iterations
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.stats = {}
+
+    def Close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def Search(self, state, time_limit=None, depth=None):
+        """ Returns the best (to, remove) turn for the player about to move.
+            depth is accepted for interface parity with AlphaBetaEngine. """
+        start = time.time()
+        if not time_limit and not self.iterations:
+            time_limit = 1.0
+        job = (state.width, state.height, tuple(state.pawns), state.destroyed, state.player,
+               time_limit, self.iterations, self.exploration)
+
+        if self.workers > 1:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.workers)
+            jobs = [job + (self.rng.getrandbits(32),) for _ in range(self.workers)]
+            results = self.pool.map(_Worker, jobs)
+        else:
+            results = [_Worker(job + (self.rng.getrandbits(32),))]
+
+        merged, playouts = {}, 0
+        for stats, count in results:
+            MergeStats(merged, stats)
+            playouts += count
+
+        elapsed = time.time() - start
+        self.stats = {
+            'playouts': playouts,
+            'time': elapsed,
+            'pps': playouts/elapsed if elapsed else 0,
+            'workers': max(1, self.workers),
+        }
+        return self.BestTurn(state, merged)
+
+    def BestTurn(self, state, merged):
+        if not merged:
+            # every move isolates us, play any of them
+            return state.LegalMoves()[0], None
+        to = max(merged, key=lambda m: merged[m][0])
+        visits, wins, removals = merged[to]
+        self.stats['score'] = wins/visits if visits else 0.0
+        if removals:
+            return to, max(removals, key=lambda r: removals[r][0])
+        after = state.Copy()
+        after.MovePawn(to)
+        near = after.neighbours[after.pawns[1-after.player]] & ~after.blocked
+        return to, (near or (after.full & ~after.blocked)).bit_length() - 1
+
+
+## ------------ BENCHMARK ------------##
+def PlayoutRate(width, height, seconds, workers=1):
+    """ Playouts per second from the start position """
+    engine = MCTSEngine(workers=workers, seed=1)
+    try:
+        engine.Search(IsolationState(width, height), seconds)
+    finally:
+        engine.Close()
+    return engine.stats['pps']
+
+
+def Main(argv=None):
+    from tournament import ArgParser, RunMatch
+
+    parser = argparse.ArgumentParser(description='Compare MCTS with alpha-beta at equal time per turn.')
+    parser.add_argument('--width', type=int, default=9)
+    parser.add_argument('--height', type=int, default=9)
+    parser.add_argument('--time', type=float, default=1.0, help="seconds per turn, like conf['timer']")
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args(argv)
+
+    for workers in sorted(set([1, args.workers])):
+        rate = PlayoutRate(args.width, args.height, args.time, workers)
+        print('%dx%d  %d worker(s)  %.0f playouts/sec' % (args.width, args.height, workers, rate))
+
+    # games run one per process already, so each MCTS player grows a single tree
+    match = ArgParser().parse_args([
+        '--a', 'engine=mcts', '--b', 'engine=alphabeta',
+        '--width', str(args.width), '--height', str(args.height),
+        '--time', str(args.time), '--games', str(args.games),
+        '--processes', str(args.workers), '--no-sprt',
+    ] + (['--out', args.out] if args.out else []))
+    summary = RunMatch(match)
+    print('mcts vs alpha-beta: +%(wins)d -%(losses)d  elo %(elo)+.1f +/- %(margin).1f' % summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
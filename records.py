@@ -0,0 +1,303 @@
+# -*- coding: utf-8
+""" Compact binary game records.
+
+    A record file is a plain concatenation of games, each one
+
+        header   HEADER below: board size, start pawns and player, winner,
+                 conf length and number of turns
+        destroyed  cells destroyed at the start, ceil(cells/8) bytes
+        conf     JSON, utf-8
+        turns    (to, remove) cell indices, one byte each (two bytes on boards
+                 of 255 cells or more), NONE when the part was not played
+
+    (to, NONE) is a move with no removal: the mover walked into a dead end or
+    the turn timer ran out after moving. (NONE, NONE) is a turn lost to the
+    timer. Every game is written with a single append, so a crash can only
+    tear the last record; readers stop there and GameWriter cuts it off
+    before appending again. """
+import json
+import os
+import struct
+
+from gamestate import IsolationState, StartSquares
+
+MAGIC = b'IR'
+VERSION = 1
+# magic, version, width, height, first player, winner, pawn 1, pawn 2, conf bytes, turns
+HEADER = struct.Struct('<2sBBBBBHHHI')
+NO_WINNER = 255
+TAIL = 1 << 16  # bytes GameWriter searches for the last header, far more than any record
+
+
+def CellFormat(width, height):
+    """ (struct code, NONE value) for the cell indices of a board """
+    if width*height < 255:
+        return 'B', 0xFF
+    return 'H', 0xFFFF
+
+
+## ------------ ONE GAME ------------##
+class GameRecord(object):
+    def __init__(self, width, height, pawns=None, destroyed=0, player=0, conf=None, turns=None, winner=None):
+        self.width = width
+        self.height = height
+        self.pawns = tuple(pawns if pawns is not None else StartSquares(width, height))
+        self.destroyed = destroyed
+        self.player = player
+        self.conf = conf or {}
+        self.turns = list(turns or [])
+        self.winner = winner
+
+    @classmethod
+    def FromState(cls, state, conf=None):
+        """ A record starting from state, which must be at the start of a turn """
+        return cls(state.width, state.height, state.pawns, state.destroyed, state.player, conf)
+
+    def Add(self, to, remove):
+        self.turns.append((to, remove))
+
+    def __len__(self):
+        return len(self.turns)
+
+    ## ------------ REPLAY ------------##
+    def Start(self):
+        return IsolationState(self.width, self.height, self.pawns, self.destroyed, self.player)
+
+    @staticmethod
+    def Apply(state, to, remove):
+        if to is not None:
+            state.MovePawn(to)
+        if remove is not None:
+            state.RemoveCell(remove)
+        else:
+            state.SwitchTurn()
+
+    def Position(self, index):
+        """ The state after the first `index` turns (0 is the start position) """
+        if not 0 <= index <= len(self.turns):
+            raise IndexError('turn %d out of range' % index)
+        state = self.Start()
+        for to, remove in self.turns[:index]:
+            self.Apply(state, to, remove)
+        return state
+
+    def IsValid(self):
+        """ Whether the start position is sound and every turn is legal when
+            replayed from it """
+        cells = self.width*self.height
+        pawn1, pawn2 = self.pawns
+        if not (pawn1 < cells and pawn2 < cells and pawn1 != pawn2 and self.player in (0, 1)):
+            return False
+        if self.destroyed >> cells or self.destroyed >> pawn1 & 1 or self.destroyed >> pawn2 & 1:
+            return False
+        state = self.Start()
+        for to, remove in self.turns:
+            if to is None:
+                if remove is not None:
+                    return False
+            elif not state.IsLegalMove(to):
+                return False
+            else:
+                state.MovePawn(to)
+                if remove is not None and not state.IsLegalRemove(remove):
+                    return False
+            if remove is None:
+                state.SwitchTurn()
+            else:
+                state.RemoveCell(remove)
+        return self.winner in (None, 0, 1)
+
+    def Positions(self):
+        """ Yields the start position and the state after every turn. The same
+            state object is updated in place. """
+        state = self.Start()
+        yield state
+        for to, remove in self.turns:
+            self.Apply(state, to, remove)
+            yield state
+
+    ## ------------ ENCODING ------------##
+    def Pack(self):
+        code, none = CellFormat(self.width, self.height)
+        conf = json.dumps(self.conf, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        cells = []
+        for to, remove in self.turns:
+            cells.append(none if to is None else to)
+            cells.append(none if remove is None else remove)
+        winner = NO_WINNER if self.winner is None else self.winner
+        size = (self.width*self.height + 7)//8
+        destroyed = bytes(bytearray((self.destroyed >> (8*i)) & 0xFF for i in range(size)))
+        return b''.join((
+            HEADER.pack(MAGIC, VERSION, self.width, self.height, self.player, winner,
+                        self.pawns[0], self.pawns[1], len(conf), len(self.turns)),
+            destroyed,
+            conf,
+            struct.pack('<%d%s' % (len(cells), code), *cells),
+        ))
+
+    @staticmethod
+    def BodySize(fields):
+        """ Bytes that follow a header, from its unpacked fields """
+        width, height, conf_size, turns = fields[2], fields[3], fields[8], fields[9]
+        cell_size = struct.calcsize(CellFormat(width, height)[0])
+        return (width*height + 7)//8 + conf_size + 2*turns*cell_size
+
+    @classmethod
+    def Unpack(cls, fields, body):
+        magic, version, width, height, player, winner, pawn1, pawn2, conf_size, count = fields
+        size = (width*height + 7)//8
+        destroyed = 0
+        for i, byte in enumerate(bytearray(body[:size])):
+            destroyed |= byte << (8*i)
+        conf = json.loads(body[size:size+conf_size].decode('utf-8'))
+        code, none = CellFormat(width, height)
+        cells = struct.unpack('<%d%s' % (2*count, code), body[size+conf_size:])
+        turns = [(None if cells[i] == none else cells[i], None if cells[i+1] == none else cells[i+1])
+                 for i in range(0, len(cells), 2)]
+        return cls(width, height, (pawn1, pawn2), destroyed, player, conf, turns,
+                   None if winner == NO_WINNER else winner)
+
+
+## ------------ FILES ------------##
+class GameReader(object):
+    """ Reads records one at a time, so files of any size can be scanned """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+
+    def Close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def ReadHeader(self):
+        """ Header fields at the current offset, or None at the end (or a torn tail) """
+        offset = self.file.tell()
+        data = self.file.read(HEADER.size)
+        if len(data) < HEADER.size:
+            return None
+        fields = HEADER.unpack(data)
+        if fields[0] != MAGIC or fields[1] != VERSION:
+            raise ValueError('%s: no game record at offset %d' % (self.path, offset))
+        return fields
+
+    def ReadAt(self, offset):
+        """ The record starting at offset (see Offsets), or None if it is torn """
+        self.file.seek(offset)
+        fields = self.ReadHeader()
+        if fields is None:
+            return None
+        size = GameRecord.BodySize(fields)
+        body = self.file.read(size)
+        if len(body) < size:
+            return None
+        return GameRecord.Unpack(fields, body)
+
+    def __iter__(self):
+        offset = 0
+        while True:
+            record = self.ReadAt(offset)
+            if record is None:
+                return
+            offset = self.file.tell()
+            yield record
+
+    def Offsets(self):
+        """ Yields the offset of every complete record, reading only headers """
+        for offset, following in self.Spans():
+            yield offset
+
+    def Spans(self):
+        """ Yields (start, end) offsets of every complete record """
+        offset = 0
+        end = os.fstat(self.file.fileno()).st_size
+        while True:
+            self.file.seek(offset)
+            fields = self.ReadHeader()
+            if fields is None:
+                return
+            following = offset + HEADER.size + GameRecord.BodySize(fields)
+            if following > end:
+                return
+            yield offset, following
+            offset = following
+
+
+def ReadGames(path):
+    """ Yields every complete record of a file """
+    with GameReader(path) as reader:
+        for record in reader:
+            yield record
+
+
+def ValidLength(path):
+    """ Bytes of path up to the end of its last complete record """
+    with GameReader(path) as reader:
+        length = 0
+        for offset, length in reader.Spans():
+            pass
+        return length
+
+
+def EndsWithRecord(path):
+    """ Whether path ends exactly where a complete record ends. Only the last
+        TAIL bytes are read: the last header in them whose record runs to the
+        end of the file, decodes and replays is taken as the last record,
+        without reading the rest. Bytes inside a torn record can look like a
+        header, so a header alone is not enough. """
+    size = os.path.getsize(path)
+    if not size:
+        return True
+    with open(path, 'rb') as source:
+        start = max(0, size - TAIL)
+        source.seek(start)
+        tail = source.read()
+    marker = MAGIC + struct.pack('B', VERSION)
+    at = tail.rfind(marker)
+    while at >= 0:
+        if at + HEADER.size <= len(tail):
+            fields = HEADER.unpack_from(tail, at)
+            if start + at + HEADER.size + GameRecord.BodySize(fields) == size:
+                try:
+                    record = GameRecord.Unpack(fields, tail[at + HEADER.size:])
+                except (ValueError, struct.error):
+                    record = None
+                if record is not None and record.IsValid():
+                    return True
+        at = tail.rfind(marker, 0, at)
+    return False
+
+
+class GameWriter(object):
+    """ Appends one record per Write. With sync=True every game is also forced
+        to disk before Write returns. Opening checks only the tail of the file,
+        the whole file is scanned only when a crash tore the last record. """
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.sync = sync
+        if os.path.exists(path) and not EndsWithRecord(path):
+            length = ValidLength(path)
+            if os.path.getsize(path) > length:
+                # a crash tore the last game, drop it so the file stays readable
+                with open(path, 'r+b') as torn:
+                    torn.truncate(length)
+        self.file = open(path, 'ab')
+
+    def Write(self, record):
+        self.file.write(record.Pack())
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+
+    def Close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
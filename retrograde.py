@@ -0,0 +1,279 @@
+# -*- coding: utf-8
+""" Complete solutions of small boards, stored as a memory-mapped table.
+
+    Every position (pawn of the player to move, pawn of the other player,
+    destroyed cells) is solved backwards from the most destroyed cells to the
+    fewest: a removal always adds a destroyed cell, so each layer only needs
+    the one after it. That covers every position the start squares can lead
+    to, and the ones the turn timer can skip to as well.
+
+    Each result is one byte, (turns << 1) | mover_wins, where turns counts
+    whole turns until the loser is stuck (winner as fast as possible, loser
+    as slow as possible). Only one pawn pair per symmetry class is stored and
+    the two pawn cells are squeezed out of the destroyed mask, so a position
+    is found with a few bit operations and one byte read from the mmap.
+
+    python retrograde.py --width 4 --height 4
+
+    4x4 takes seconds, 20-cell boards about ten minutes and 100MB while
+    solving (25MB on disk); 5x5 is out of reach in pure Python. """
+from __future__ import print_function
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from gamestate import IsolationState, NeighbourMasks, StartSquares, BitIndices, PopCount, MOVE
+from transposition import Symmetries
+
+MAGIC = b'ISOR'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBI')  # magic, version, width, height, pawn pair slots
+MAX_CELLS = 20
+
+
+def DatabasePath(width, height, directory=None):
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(directory, 'outcomes-%dx%d.bin' % (width, height))
+
+
+def PairSlots(width, height):
+    """ Returns (slots, pairs): the canonical (mover, other) pawn pair of every
+        symmetry class, and for every pair its (slot, symmetry) """
+    perms = Symmetries(width, height)[0]
+    size = width*height
+    slots, index, pairs = [], {}, {}
+    for mover in range(size):
+        for other in range(size):
+            if mover == other:
+                continue
+            images = [(perm[mover], perm[other], s) for s, perm in enumerate(perms)]
+            canonical_mover, canonical_other, symmetry = min(images)
+            canonical = (canonical_mover, canonical_other)
+            if canonical not in index:
+                index[canonical] = len(slots)
+                slots.append(canonical)
+            pairs[(mover, other)] = (index[canonical], symmetry)
+    return slots, pairs
+
+
+def ByteTables(perm):
+    """ Permutes a mask eight bits at a time: one 256-entry table per byte """
+    tables = []
+    for start in range(0, len(perm), 8):
+        table = []
+        for byte in range(256):
+            mask = 0
+            for bit in range(8):
+                if byte >> bit & 1 and start+bit < len(perm):
+                    mask |= 1 << perm[start+bit]
+            table.append(mask)
+        tables.append(table)
+    return tables
+
+
+def Squeeze(mask, low, high):
+    """ mask with bits low < high taken out and the bits above them shifted down """
+    middle = (mask >> (low+1)) & ((1 << (high-low-1)) - 1)
+    return (mask & ((1 << low) - 1)) | (middle << low) | ((mask >> (high+1)) << (high-1))
+
+
+def Expand(index, low, high):
+    """ Inverse of Squeeze, with zeros at bits low and high """
+    middle = (index >> low) & ((1 << (high-low-1)) - 1)
+    return (index & ((1 << low) - 1)) | (middle << (low+1)) | ((index >> (high-1)) << (high+1))
+
+
+## ------------ SOLVER ------------##
+def Solve(width, height, log=None):
+    """ Returns (slots, values) where values[slot] is a bytearray indexed by
+        the full destroyed mask of the slot's canonical pawn pair """
+    size = width*height
+    full = (1 << size) - 1
+    neighbours = NeighbourMasks(width, height)
+    slots, pairs = PairSlots(width, height)
+    perms = Symmetries(width, height)[0]
+    bytes_of = [ByteTables(perm) for perm in perms]
+    values = [bytearray(1 << size) for _ in slots]
+
+    # where (other, to) lands after a move: its table, byte tables and permutation
+    lookup = {}
+    for pair, (slot, symmetry) in pairs.items():
+        lookup[pair] = (values[slot], bytes_of[symmetry], perms[symmetry])
+
+    layers = [[] for _ in range(size+1)]
+    for mask in range(1 << size):
+        layers[PopCount(mask)].append(mask)
+
+    start = time.time()
+    for count in range(size-2, -1, -1):
+        for slot, (mover, other) in enumerate(slots):
+            table = values[slot]
+            pawns = (1 << mover) | (1 << other)
+            for destroyed in layers[count]:
+                if destroyed & pawns:
+                    continue
+                blocked = destroyed | pawns
+                win, lose = None, 0  # fewest turns to a win, most turns to a loss
+                for to in BitIndices(neighbours[mover] & ~blocked):
+                    after = (blocked ^ (1 << mover)) | (1 << to)
+                    if not neighbours[to] & ~after:
+                        # moving there isolates the mover, no better than being stuck
+                        continue
+                    child, byte_tables, perm = lookup[(other, to)]
+                    base, rest = 0, destroyed
+                    for byte_table in byte_tables:
+                        base |= byte_table[rest & 255]
+                        rest >>= 8
+                    for remove in BitIndices(full & ~after):
+                        value = child[base | (1 << perm[remove])]
+                        turns = (value >> 1) + 1
+                        if value & 1:
+                            if turns > lose:
+                                lose = turns
+                        elif win is None or turns < win:
+                            win = turns
+                if win is not None:
+                    table[destroyed] = (win << 1) | 1
+                else:
+                    table[destroyed] = lose << 1
+        if log:
+            print('%d destroyed  %.1fs' % (count, time.time() - start), file=log)
+    return slots, values
+
+
+def Write(path, width, height, slots, values):
+    """ Writes the squeezed tables: header, then 2**(cells-2) bytes per slot """
+    stride = 1 << (width*height - 2)
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, width, height, len(slots)))
+        for (mover, other), table in zip(slots, values):
+            low, high = min(mover, other), max(mover, other)
+            out.write(bytes(bytearray(table[Expand(index, low, high)] for index in range(stride))))
+
+
+## ------------ LOOKUPS ------------##
+class OutcomeDatabase(object):
+    """ Read-only view of a solved board. Only the pages that are probed are
+        ever read from disk. """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, height, count = HEADER.unpack(self.data[:HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            self.Close()
+            raise ValueError('%s is not an outcome database' % path)
+        self.width = width
+        self.height = height
+        self.slots, self.pairs = PairSlots(width, height)
+        self.perms = Symmetries(width, height)[0]
+        self.stride = 1 << (width*height - 2)
+        if count != len(self.slots) or len(self.data) != HEADER.size + count*self.stride:
+            self.Close()
+            raise ValueError('%s is truncated or from another version' % path)
+
+    def Close(self):
+        self.data.close()
+        self.file.close()
+
+    def Covers(self, state):
+        return state.width == self.width and state.height == self.height
+
+    def Probe(self, mover, other, destroyed):
+        """ (mover_wins, turns) with `mover` about to move """
+        slot, symmetry = self.pairs[(mover, other)]
+        perm = self.perms[symmetry]
+        mask = 0
+        for index in BitIndices(destroyed):
+            mask |= 1 << perm[index]
+        low, high = sorted(self.slots[slot])
+        offset = HEADER.size + slot*self.stride + Squeeze(mask, low, high)
+        value = bytearray(self.data[offset:offset+1])[0]
+        return bool(value & 1), value >> 1
+
+    def Removals(self, state, to):
+        """ Yields (remove, mover_wins, turns) for the player to move with
+            their pawn on `to`, whether it is about to go there or already has """
+        opp = state.pawns[1-state.player]
+        blocked = state.destroyed | (1 << opp) | (1 << to)
+        if not state.neighbours[to] & ~blocked:
+            yield None, False, 0
+            return
+        for remove in BitIndices(state.full & ~blocked):
+            wins, turns = self.Probe(opp, to, state.destroyed | (1 << remove))
+            yield remove, not wins, turns + 1
+
+    def BestTurn(self, state):
+        """ Returns ((to, remove), mover_wins, turns) for the player to move.
+            In the REMOVE phase `to` is the square the pawn already moved to. """
+        if state.phase == MOVE:
+            moves = state.LegalMoves()
+            if not moves:
+                return None, False, 0
+        else:
+            moves = [state.pawns[state.player]]
+        best, best_key = None, None
+        for to in moves:
+            for remove, wins, turns in self.Removals(state, to):
+                # win fast, lose slowly
+                key = (1, -turns) if wins else (0, turns)
+                if best_key is None or key > best_key:
+                    best, best_key = ((to, remove), wins, turns), key
+        return best
+
+    def Outcome(self, state):
+        """ (winner, turns) of state with best play from both sides """
+        if state.phase == MOVE and state.IsIsolated():
+            return 1 - state.player, 0
+        wins, turns = self.BestTurn(state)[1:]
+        if wins:
+            return state.player, turns
+        return 1 - state.player, turns
+
+
+def OpenDatabase(width, height, directory=None):
+    """ The outcome database for the board size, or None if none was built """
+    path = DatabasePath(width, height, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        return OutcomeDatabase(path)
+    except (ValueError, EnvironmentError):
+        return None
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a small Isolation board completely.')
+    parser.add_argument('--width', type=int, default=4)
+    parser.add_argument('--height', type=int, default=4)
+    parser.add_argument('--out', default=None, help='database file (default: outcomes-WxH.bin next to this script)')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+    if not 3 <= args.width <= 11 or not 3 <= args.height <= 11:
+        parser.error('board sides must be between 3 and 11')
+    if args.width*args.height > MAX_CELLS:
+        parser.error('boards above %d cells are out of reach of this solver' % MAX_CELLS)
+
+    start = time.time()
+    slots, values = Solve(args.width, args.height, None if args.quiet else sys.stderr)
+    path = args.out or DatabasePath(args.width, args.height)
+    Write(path, args.width, args.height, slots, values)
+
+    database = OutcomeDatabase(path)
+    try:
+        state = IsolationState(args.width, args.height, StartSquares(args.width, args.height))
+        winner, turns = database.Outcome(state)
+    finally:
+        database.Close()
+    print('%dx%d: %d pawn pairs, %d bytes, player %d wins in %d turns (%.1fs)'
+          % (args.width, args.height, len(slots), os.path.getsize(path), winner+1, turns, time.time() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
@@ -0,0 +1,453 @@
+# -*- coding: utf-8
+""" Asyncio game server: many games in one process, refereed server-side.
+
+    Clients speak line-delimited JSON over TCP or a Unix socket. Requests
+
+        {"op": "new", "width": 7, "height": 7, "timer": 15, "seats": [0, 1]}
+        {"op": "join", "game": 12, "seats": [1]}       (default: every free seat, or
+                                                        the second seat of a host
+                                                        seated on both)
+        {"op": "play", "game": 12, "cell": 24}         (a move or a removal, like a click)
+        {"op": "state", "game": 12}
+        {"op": "leave", "game": 12}
+
+    may carry an "id" that is echoed in the reply. Replies and broadcasts to
+    everyone seated in a game are "joined" and "state" (full state), "seats"
+    (a host's second seat was taken), "played" (a cell was accepted),
+    "timeout" (the turn timer ran out), "over" and "error". Turn timers of every game share one TimerWheel, ticked by a
+    single task, instead of a timer per game. A game whose turns run out
+    IDLE_TIMEOUTS times in a row is over, lost by the player last to run out.
+
+    python server.py serve --port 7770 [--unix PATH] [--record FILE]
+    python server.py load --port 7770 --games 10000 --active 200 --seconds 10
+
+    Needs Python 3. """
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from gamestate import IsolationState, BitIndices, MOVE
+from records import GameRecord, GameWriter
+
+PORT = 7770
+TICK = 0.25  # seconds per timer wheel slot
+WHEEL_SLOTS = 512
+MAX_SIDE = 64
+MAX_TIMER = 3600  # seconds per turn
+IDLE_TIMEOUTS = 4  # turns lost to the timer in a row that end a game
+
+
+## ------------ TIMERS ------------##
+class TimerWheel(object):
+    """ Hashed timing wheel. Scheduling and cancelling are O(1); each tick
+        only looks at the timers that hash to the current slot, and timers
+        further away than one revolution simply wait for a later pass. """
+    def __init__(self, tick=TICK, slots=WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.ticks = 0
+
+    def Schedule(self, delay, callback, *args):
+        """ Calls callback(*args) after at least `delay` seconds. Returns a
+            handle for Cancel. """
+        # +1 because the current tick is already partly over
+        due = self.ticks + 1 + max(0, int(-(-delay // self.tick)))
+        entry = [due, callback, args]
+        self.slots[due % len(self.slots)].append(entry)
+        return entry
+
+    @staticmethod
+    def Cancel(entry):
+        if entry is not None:
+            entry[1] = None
+
+    def Advance(self):
+        self.ticks += 1
+        index = self.ticks % len(self.slots)
+        slot = self.slots[index]
+        if not slot:
+            return
+        waiting = []
+        for entry in slot:
+            if entry[1] is None:
+                continue
+            if entry[0] > self.ticks:
+                waiting.append(entry)
+            else:
+                entry[1](*entry[2])
+        self.slots[index] = waiting
+
+    async def Run(self):
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        while True:
+            # sleep to the next tick boundary so the wheel does not drift
+            await asyncio.sleep(max(0.0, start + (self.ticks+1)*self.tick - loop.time()))
+            self.Advance()
+
+
+## ------------ GAMES ------------##
+class Game(object):
+    def __init__(self, number, width, height, timer):
+        self.number = number
+        self.state = IsolationState(width, height)
+        self.timer = timer
+        self.seats = [None, None]  # connection holding each player's seat
+        self.moved = None
+        self.winner = None
+        self.deadline = None  # timer wheel handle of the running turn
+        self.timeouts = 0  # turns lost to the timer since a cell was last played
+        self.record = GameRecord.FromState(self.state, {'timer': timer})
+
+    def Connections(self):
+        return set(conn for conn in self.seats if conn is not None)
+
+    def StateMessage(self, op='state'):
+        state = self.state
+        return {
+            'op': op,
+            'game': self.number,
+            'width': state.width,
+            'height': state.height,
+            'pawns': list(state.pawns),
+            'destroyed': state.destroyed,
+            'player': state.player,
+            'phase': state.phase,
+            'timer': self.timer,
+            'winner': self.winner,
+        }
+
+
+class Connection(object):
+    def __init__(self, writer):
+        self.writer = writer
+        self.games = set()
+
+    def Send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(message) + '\n').encode('utf-8'))
+
+
+class GameServer(object):
+    def __init__(self, wheel=None, record=None):
+        self.wheel = wheel or TimerWheel()
+        self.games = {}
+        self.next_game = 1
+        self.record = record  # a GameWriter for finished games, or None
+        self.played = 0
+
+    ## ------------ CONNECTIONS ------------##
+    async def Handle(self, reader, writer):
+        conn = Connection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = {}
+                try:
+                    message = json.loads(line.decode('utf-8'))
+                    reply = self.Dispatch(conn, message)
+                except KeyError as error:
+                    reply = {'op': 'error', 'message': 'missing %s' % error}
+                except (ValueError, TypeError, AttributeError) as error:
+                    reply = {'op': 'error', 'message': str(error)}
+                except Exception as error:
+                    # one bad request must never take the connection down
+                    reply = {'op': 'error', 'message': '%s: %s' % (type(error).__name__, error)}
+                if reply is not None:
+                    if isinstance(message, dict) and 'id' in message:
+                        reply['id'] = message['id']
+                    conn.Send(reply)
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for number in list(conn.games):
+                self.Leave(conn, number)
+            writer.close()
+
+    def Dispatch(self, conn, message):
+        op = message['op']
+        if op == 'new':
+            return self.New(conn, message)
+        if op == 'join':
+            return self.Join(conn, message)
+        if op == 'play':
+            return self.Play(conn, message)
+        if op == 'state':
+            return self.Find(message['game']).StateMessage()
+        if op == 'leave':
+            self.Leave(conn, message['game'])
+            return {'op': 'left', 'game': message['game']}
+        raise ValueError('unknown op %r' % op)
+
+    ## ------------ REQUESTS ------------##
+    def Find(self, number):
+        game = self.games.get(number)
+        if game is None:
+            raise ValueError('no game %r' % (number,))
+        return game
+
+    def New(self, conn, message):
+        width, height = int(message.get('width', 7)), int(message.get('height', 7))
+        if not (3 <= width <= MAX_SIDE and 3 <= height <= MAX_SIDE):
+            raise ValueError('board sides must be between 3 and %d' % MAX_SIDE)
+        seats = message.get('seats', [0, 1])
+        if not seats:
+            raise ValueError('a new game needs at least one seat')
+        timer = float(message.get('timer') or 0)
+        if not (timer == 0 or self.wheel.tick <= timer <= MAX_TIMER):
+            raise ValueError('timer must be 0 (off) or between %g and %d seconds' % (self.wheel.tick, MAX_TIMER))
+        game = Game(self.next_game, width, height, timer)
+        reply = self.Seat(conn, game, seats)
+        # registered only once seated, a refused game leaves nothing behind
+        self.next_game += 1
+        self.games[game.number] = game
+        return reply
+
+    def Join(self, conn, message):
+        game = self.Find(message['game'])
+        seats = message.get('seats')
+        if seats is None:
+            seats = [seat for seat in (0, 1) if game.seats[seat] is None]
+            host = game.seats[0]
+            if not seats and host is game.seats[1] and host is not conn:
+                # whoever plays both sides hands the second one over
+                game.seats[1] = None
+                seats = [1]
+                host.Send({'op': 'seats', 'game': game.number, 'seats': [0]})
+        return self.Seat(conn, game, seats)
+
+    def Seat(self, conn, game, seats):
+        if not isinstance(seats, list) or not all(seat in (0, 1) for seat in seats):
+            raise ValueError('seats must be a list of 0 and 1')
+        for seat in seats:
+            if game.seats[seat] not in (None, conn):
+                raise ValueError('seat %d of game %d is taken' % (seat, game.number))
+        for seat in seats:
+            game.seats[seat] = conn
+        conn.games.add(game.number)
+        if game.deadline is None and game.winner is None and None not in game.seats:
+            # the clock starts once both seats are taken
+            self.StartTurn(game)
+        reply = game.StateMessage('joined')
+        reply['seats'] = [seat for seat in (0, 1) if game.seats[seat] is conn]
+        return reply
+
+    def Play(self, conn, message):
+        game = self.Find(message['game'])
+        state, cell = game.state, int(message['cell'])
+        if game.winner is not None:
+            raise ValueError('game %d is over' % game.number)
+        if game.seats[state.player] is not conn:
+            raise ValueError('not your turn in game %d' % game.number)
+        if not 0 <= cell < state.size:
+            raise ValueError('no cell %d' % cell)
+        player = state.player
+        if state.phase == MOVE:
+            if not state.IsLegalMove(cell):
+                raise ValueError('illegal move to %d' % cell)
+            state.MovePawn(cell)
+            game.moved = cell
+        else:
+            if not state.IsLegalRemove(cell):
+                raise ValueError('cell %d cannot be removed' % cell)
+            state.RemoveCell(cell)
+            game.record.Add(game.moved, cell)
+            game.moved = None
+        self.played += 1
+        game.timeouts = 0
+        self.Broadcast(game, {'op': 'played', 'game': game.number, 'cell': cell, 'player': player})
+        self.Referee(game)
+        return None
+
+    def Leave(self, conn, number):
+        game = self.games.get(number)
+        conn.games.discard(number)
+        if game is None:
+            return
+        game.seats = [None if seat is conn else seat for seat in game.seats]
+        if not game.Connections():
+            # nobody left to play it
+            self.wheel.Cancel(game.deadline)
+            del self.games[number]
+
+    ## ------------ REFEREE ------------##
+    def Broadcast(self, game, message):
+        for conn in game.Connections():
+            conn.Send(message)
+
+    def Referee(self, game):
+        """ Ends the game once the player to act is isolated, as the GUI does,
+            and restarts the turn timer when a new turn begins """
+        state = game.state
+        if state.IsIsolated():
+            if state.phase != MOVE:
+                game.record.Add(game.moved, None)
+            self.Finish(game, 1 - state.player)
+        elif state.phase == MOVE:
+            self.StartTurn(game)
+
+    def StartTurn(self, game):
+        self.wheel.Cancel(game.deadline)
+        game.deadline = None
+        if game.timer:
+            game.deadline = self.wheel.Schedule(game.timer, self.Timeout, game)
+
+    def Timeout(self, game):
+        game.deadline = None
+        if game.winner is not None or game.number not in self.games:
+            return
+        state = game.state
+        game.record.Add(game.moved if state.phase != MOVE else None, None)
+        game.moved = None
+        game.timeouts += 1
+        if game.timeouts >= IDLE_TIMEOUTS:
+            # nobody is playing, the player who just ran out of time loses
+            self.Finish(game, 1 - state.player)
+            return
+        state.SwitchTurn()
+        self.Broadcast(game, {'op': 'timeout', 'game': game.number, 'player': state.player})
+        self.Referee(game)
+
+    def Finish(self, game, winner):
+        game.winner = winner
+        self.wheel.Cancel(game.deadline)
+        game.deadline = None
+        game.record.winner = winner
+        if self.record is not None:
+            self.record.Write(game.record)
+        self.Broadcast(game, {'op': 'over', 'game': game.number, 'winner': winner})
+
+
+async def Serve(args):
+    writer = GameWriter(args.record) if args.record else None
+    server = GameServer(TimerWheel(args.tick), writer)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.Handle, args.unix)
+    else:
+        listener = await asyncio.start_server(server.Handle, args.host, args.port)
+    print('serving on %s' % (args.unix or '%s:%d' % (args.host, args.port)))
+    ticker = asyncio.ensure_future(server.wheel.Run())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        ticker.cancel()
+        if writer:
+            writer.Close()
+
+
+## ------------ LOAD GENERATOR ------------##
+async def Open(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix, limit=1 << 20)
+    return await asyncio.open_connection(args.host, args.port, limit=1 << 20)
+
+
+async def Request(reader, writer, message):
+    writer.write((json.dumps(message) + '\n').encode('utf-8'))
+    while True:
+        reply = json.loads((await reader.readline()).decode('utf-8'))
+        if reply.get('id') == message.get('id') or reply['op'] in ('joined', 'error'):
+            return reply
+
+
+async def Player(args, games, rng, stats, stop):
+    """ One connection: creates its share of idle games, then keeps playing
+        random legal cells in the first `active` of them """
+    reader, writer = await Open(args)
+    numbers = []
+    for _ in range(games):
+        reply = await Request(reader, writer, {'op': 'new', 'width': args.width, 'height': args.height})
+        numbers.append(reply['game'])
+    stats['games'] += len(numbers)
+    states = {}
+    for number in numbers[:args.active]:
+        states[number] = IsolationState(args.width, args.height)
+    request = 0
+    while not stop.is_set() and states:
+        number = rng.choice(list(states))
+        state = states[number]
+        if state.phase == MOVE:
+            cells = list(BitIndices(state.MoveMask()))
+        else:
+            cells = list(BitIndices(state.FreeMask()))
+        cell = rng.choice(cells)
+        request += 1
+        start = time.time()
+        writer.write((json.dumps({'op': 'play', 'game': number, 'cell': cell}) + '\n').encode('utf-8'))
+        writer.write((json.dumps({'op': 'state', 'game': number, 'id': request}) + '\n').encode('utf-8'))
+        while True:
+            reply = json.loads((await reader.readline()).decode('utf-8'))
+            if reply.get('id') == request:
+                break
+        stats['latency'].append(time.time() - start)
+        stats['moves'] += 1
+        if reply['winner'] is not None:
+            # start over on a fresh game to keep the same number active
+            del states[number]
+            reply = await Request(reader, writer, {'op': 'new', 'width': args.width, 'height': args.height})
+            states[reply['game']] = IsolationState(args.width, args.height)
+            stats['games'] += 1
+            continue
+        states[number] = IsolationState(reply['width'], reply['height'], reply['pawns'],
+                                        reply['destroyed'], reply['player'], reply['phase'])
+    writer.close()
+
+
+async def Load(args):
+    rng = random.Random(args.seed)
+    stats = {'games': 0, 'moves': 0, 'latency': []}
+    stop = asyncio.Event()
+    per_connection = -(-args.games // args.connections)
+    active = -(-args.active // args.connections)
+    sub = argparse.Namespace(**vars(args))
+    sub.active = active
+    start = time.time()
+    tasks = [asyncio.ensure_future(Player(sub, per_connection, random.Random(rng.getrandbits(32)), stats, stop))
+             for _ in range(args.connections)]
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.time() - start
+    latency = sorted(stats['latency']) or [0.0]
+    print('%d games created, %d cells played in %.1fs: %.0f/s, median %.1f ms, p99 %.1f ms'
+          % (stats['games'], stats['moves'], elapsed, stats['moves']/elapsed,
+             1000*latency[len(latency)//2], 1000*latency[int(len(latency)*0.99)]))
+
+
+def ArgParser():
+    parser = argparse.ArgumentParser(description='Host Isolation games, or load-test a host.')
+    parser.add_argument('mode', choices=('serve', 'load'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', default=None, help='Unix socket path instead of TCP')
+    parser.add_argument('--record', default=None, help='append finished games to this record file')
+    parser.add_argument('--tick', type=float, default=TICK, help='timer wheel resolution in seconds')
+    parser.add_argument('--games', type=int, default=10000, help='load: games to create')
+    parser.add_argument('--active', type=int, default=200, help='load: games being played at once')
+    parser.add_argument('--connections', type=int, default=20, help='load: client connections')
+    parser.add_argument('--seconds', type=float, default=10.0, help='load: how long to play')
+    parser.add_argument('--width', type=int, default=7)
+    parser.add_argument('--height', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=1)
+    return parser
+
+
+def Main(argv=None):
+    args = ArgParser().parse_args(argv)
+    try:
+        asyncio.run(Serve(args) if args.mode == 'serve' else Load(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
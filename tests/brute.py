@@ -0,0 +1,41 @@
+# -*- coding: utf-8
+""" Plain minimax over whole turns, the reference the solvers are checked against """
+from gamestate import BitIndices
+
+
+def Outcome(state, memo=None):
+    """ (mover wins, turns) with the winner hurrying and the loser stalling;
+        turns counts whole turns until the loser is stuck """
+    memo = {} if memo is None else memo
+    key = (tuple(state.pawns), state.destroyed, state.player)
+    if key in memo:
+        return memo[key]
+    win, lose = None, 0
+    if not state.IsIsolated():
+        pawn = state.pawns[state.player]
+        for to in state.LegalMoves():
+            blocked = (state.blocked ^ (1 << pawn)) | (1 << to)
+            if not state.neighbours[to] & ~blocked:
+                continue  # walking into a dead end loses on the spot
+            for remove in BitIndices(state.full & ~blocked):
+                state.MakeMove(to, remove)
+                wins, turns = Outcome(state, memo)
+                state.UnmakeMove()
+                if not wins:
+                    win = turns + 1 if win is None else min(win, turns + 1)
+                else:
+                    lose = max(lose, turns + 1)
+    memo[key] = (True, win) if win is not None else (False, lose)
+    return memo[key]
+
+
+def RandomPosition(width, height, rng, destroyed=None):
+    """ Two pawns on random cells and a random number of destroyed cells """
+    from gamestate import IsolationState
+    cells = list(range(width*height))
+    rng.shuffle(cells)
+    count = rng.randrange(width*height - 2) if destroyed is None else destroyed
+    mask = 0
+    for cell in cells[2:2+count]:
+        mask |= 1 << cell
+    return IsolationState(width, height, (cells[0], cells[1]), mask, rng.randrange(2))
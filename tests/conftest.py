@@ -0,0 +1,6 @@
+# -*- coding: utf-8
+""" The modules live at the top of the repository, next to isolation.py """
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8
+""" The partitioned-endgame solver against brute-force minimax """
+import random
+
+import pytest
+
+from gamestate import IsolationState
+from endgame import EndgameSolver, EndgameBudget
+from brute import Outcome, RandomPosition
+
+MAX_FREE = 11  # free cells brute force gets through quickly
+
+
+def PartitionedPositions(width, height, count, seed):
+    rng = random.Random(seed)
+    found = []
+    while len(found) < count:
+        destroyed = rng.randrange(width*height - 2 - MAX_FREE, width*height - 2)
+        state = RandomPosition(width, height, rng, destroyed)
+        if state.Partition() is not None and not state.IsIsolated():
+            found.append(state)
+    return found
+
+
+@pytest.mark.parametrize('width, height', [(4, 4), (4, 5), (5, 5), (6, 6)])
+def test_solve_matches_brute_force(width, height):
+    for state in PartitionedPositions(width, height, 100, seed=width*height):
+        wins, turns = Outcome(state.Copy())
+        winner, solved_turns, turn = EndgameSolver(state).Solve(state)
+        assert (winner == state.player) == wins, state
+        assert solved_turns == turns, state
+        if wins:
+            # the solver's own turn keeps the win
+            state.MakeMove(*turn)
+            assert not Outcome(state)[0], state
+
+
+def test_not_partitioned():
+    state = IsolationState(5, 5)
+    assert EndgameSolver(state).Solve(state) is None
+
+
+def test_limits():
+    state = IsolationState(9, 9, (0, 8), sum(1 << (9*row + 4) for row in range(9)))
+    with pytest.raises(EndgameBudget):
+        EndgameSolver(state).Solve(state, max_cells=20)
+    with pytest.raises(EndgameBudget):
+        EndgameSolver(state).Solve(state, budget=10)
+    # expired() is polled like the deadline, so a cancelled search stops too
+    solver = EndgameSolver(state)
+    with pytest.raises(EndgameBudget):
+        solver.Solve(state, expired=lambda: True)
+    assert solver.expired is None
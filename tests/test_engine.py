@@ -0,0 +1,43 @@
+# -*- coding: utf-8
+""" The alpha-beta engine against brute-force minimax on small boards """
+import random
+
+import pytest
+
+from gamestate import IsolationState
+from engine import AlphaBetaEngine, WIN, MATE
+from brute import Outcome, RandomPosition
+
+MAX_FREE = 8  # free cells brute force gets through quickly
+
+
+@pytest.mark.parametrize('width, height', [(3, 3), (3, 4), (4, 4), (4, 5)])
+def test_search_matches_brute_force(width, height):
+    rng = random.Random(width*height)
+    memo = {}
+    # every removal is tried, so a deep enough search is exact
+    engine = AlphaBetaEngine(removal_radius=None)
+    for _ in range(40):
+        state = RandomPosition(width, height, rng, rng.randrange(width*height - 2 - MAX_FREE, width*height - 2))
+        if state.IsIsolated():
+            continue
+        wins, turns = Outcome(state.Copy(), memo)
+        free = len(state.LegalRemovals())
+        to, remove = engine.Search(state, None, free + 1)
+        score = engine.stats['score']
+        assert (score >= MATE) == wins and (score <= -MATE) == (not wins), state
+        if wins:
+            # a win found early can be a slower one, never a faster one
+            assert WIN - score >= turns, state
+            assert to in state.LegalMoves() and remove in state.LegalRemovals() + [state.pawns[state.player]]
+            assert remove != to, state
+            state.MakeMove(to, remove)
+            assert not Outcome(state, memo)[0], state
+
+
+def test_search_when_isolated():
+    state = IsolationState(3, 3, (0, 8), 0b000011010)
+    assert state.IsIsolated()
+    engine = AlphaBetaEngine()
+    assert engine.Search(state) == (None, None)
+    assert engine.stats['score'] == -WIN and engine.stats['nodes'] == 0
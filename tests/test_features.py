@@ -0,0 +1,31 @@
+# -*- coding: utf-8
+""" The batched features against the single-position ones """
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from features import FEATURES, Encode, Features, StateFeatures
+from brute import RandomPosition
+
+
+@pytest.mark.parametrize('width, height', [(3, 3), (5, 4), (7, 7), (11, 6)])
+def test_batch_matches_single_positions(width, height):
+    rng = random.Random(width*100 + height)
+    states = [RandomPosition(width, height, rng) for _ in range(200)]
+    batch = Features(*Encode(states))
+    assert batch.shape == (len(states), len(FEATURES))
+    for state, row in zip(states, batch):
+        assert list(row) == StateFeatures(state), state
+        # the player to move comes first whoever that is
+        swapped = state.Copy()
+        swapped.player = 1 - state.player
+        assert StateFeatures(swapped)[:2] == StateFeatures(state)[1::-1]
+
+
+def test_named_features():
+    state = RandomPosition(6, 6, random.Random(3), 10)
+    everything = dict(zip(FEATURES, StateFeatures(state)))
+    names = ('partitioned', 'own_closer', 'pawn_distance')
+    assert StateFeatures(state, names) == [everything[name] for name in names]
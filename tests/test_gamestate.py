@@ -0,0 +1,113 @@
+# -*- coding: utf-8
+""" The bitboard rules against cell-by-cell reference versions """
+import random
+
+import pytest
+
+from gamestate import IsolationState, MOVE, REMOVE
+from brute import RandomPosition
+
+SIZES = [(3, 3), (4, 5), (5, 4), (7, 7), (8, 3)]
+
+
+def Neighbours(state, index):
+    row, col = state.Location(index)
+    return [r*state.width + c
+            for r in range(row-1, row+2) for c in range(col-1, col+2)
+            if (r, c) != (row, col) and 0 <= r < state.height and 0 <= c < state.width]
+
+
+def Blocked(state, index):
+    return index in state.pawns or bool(state.destroyed >> index & 1)
+
+
+def Reachable(state, pawn):
+    """ Free cells connected to the pawn, by a plain breadth-first search """
+    seen, frontier = set(), [pawn]
+    while frontier:
+        cell = frontier.pop()
+        for step in Neighbours(state, cell):
+            if step not in seen and not Blocked(state, step):
+                seen.add(step)
+                frontier.append(step)
+    return seen
+
+
+def Mask(cells):
+    return sum(1 << cell for cell in cells)
+
+
+def RandomTurn(state, rng):
+    to = rng.choice(state.LegalMoves())
+    free = [cell for cell in range(state.size) if cell != to and (cell == state.pawns[state.player]
+                                                                 or not Blocked(state, cell))]
+    return to, rng.choice(free)
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_moves_match_reference(width, height):
+    rng = random.Random(width*100 + height)
+    for _ in range(300):
+        state = RandomPosition(width, height, rng)
+        for player in (0, 1):
+            moves = [cell for cell in Neighbours(state, state.pawns[player]) if not Blocked(state, cell)]
+            assert state.LegalMoves(player) == sorted(moves), state
+            assert state.IsIsolated(player) == (not moves), state
+            assert state.Mobility(player) == len(moves), state
+        assert state.LegalRemovals() == [cell for cell in range(state.size) if not Blocked(state, cell)]
+        for cell in range(state.size):
+            assert state.IsLegalMove(cell) == (cell in state.LegalMoves())
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_partition_matches_flood_fill(width, height):
+    rng = random.Random(width*100 + height)
+    partitioned = 0
+    for _ in range(300):
+        state = RandomPosition(width, height, rng)
+        mine, theirs = state.pawns[state.player], state.pawns[1-state.player]
+        own, other = Reachable(state, mine), Reachable(state, theirs)
+        assert state.Region() == Mask(own), state
+        assert state.Region(1 - state.player) == Mask(other), state
+        # apart once nothing one pawn can stand on touches what the other can
+        touching = any(step in other | {theirs} for cell in own | {mine} for step in Neighbours(state, cell))
+        if touching:
+            assert state.Partition() is None, state
+        else:
+            partitioned += 1
+            assert state.Partition() == (Mask(own), Mask(other)), state
+    assert partitioned  # both branches were checked
+
+
+@pytest.mark.parametrize('width, height', SIZES)
+def test_unmake_restores_the_position(width, height):
+    rng = random.Random(width*100 + height)
+    for _ in range(30):
+        state = IsolationState(width, height)
+        before = []
+        while not state.IsIsolated():
+            before.append((state.Snapshot(), state.blocked))
+            state.MakeMove(*RandomTurn(state, rng))
+            # the bitboards stay consistent along the way
+            assert state.blocked == state.destroyed | Mask(state.pawns)
+        while before:
+            state.UnmakeMove()
+            assert (state.Snapshot(), state.blocked) == before.pop()
+        assert state.undo == []
+
+
+def test_half_turns_match_make_move():
+    rng = random.Random(7)
+    for _ in range(200):
+        state = RandomPosition(5, 5, rng)
+        if state.IsIsolated():
+            continue
+        to, remove = RandomTurn(state, rng)
+        halves = state.Copy()
+        assert halves.IsLegalMove(to) and not halves.IsLegalRemove(remove)
+        halves.MovePawn(to)
+        assert halves.phase == REMOVE and halves.IsLegalRemove(remove)
+        halves.RemoveCell(remove)
+        state.MakeMove(to, remove)
+        assert halves.Snapshot() == state.Snapshot() and halves.blocked == state.blocked
+        assert halves.phase == MOVE
@@ -0,0 +1,95 @@
+# -*- coding: utf-8
+""" Game records written and read back """
+import random
+
+from gamestate import IsolationState, BitIndices
+from records import GameRecord, GameReader, GameWriter, ReadGames, EndsWithRecord
+
+
+def RandomGame(width, height, rng):
+    """ A record of random legal turns, with timeouts and a dead-end move """
+    record = GameRecord(width, height, conf={'name': ['A', 'B'], 'seed': rng.random()})
+    state = record.Start()
+    while not state.IsIsolated():
+        if rng.random() < 0.05:
+            record.Add(None, None)  # the timer ran out before the move
+            state.SwitchTurn()
+            continue
+        to = rng.choice(state.LegalMoves())
+        state.MovePawn(to)
+        free = list(BitIndices(state.full & ~state.blocked))
+        if not free:
+            record.Add(to, None)
+            break
+        remove = rng.choice(free)
+        state.RemoveCell(remove)
+        record.Add(to, remove)
+    record.winner = 1 - state.player
+    return record
+
+
+def Same(a, b):
+    return (a.width, a.height, a.pawns, a.destroyed, a.player, a.conf, a.turns, a.winner) == \
+           (b.width, b.height, b.pawns, b.destroyed, b.player, b.conf, b.turns, b.winner)
+
+
+def test_round_trip(tmpdir):
+    path = str(tmpdir.join('games.rec'))
+    rng = random.Random(0)
+    # 16x16 needs two-byte cells
+    games = [RandomGame(width, height, rng) for width, height in [(3, 3), (5, 7), (7, 7), (16, 16)] * 5]
+    games.append(GameRecord.FromState(IsolationState(6, 6, (0, 35), 0b1110, 1), {}))
+    with GameWriter(path) as writer:
+        for game in games[:10]:
+            writer.Write(game)
+    with GameWriter(path) as writer:
+        for game in games[10:]:
+            writer.Write(game)
+    read = list(ReadGames(path))
+    assert len(read) == len(games)
+    for original, copy in zip(games, read):
+        assert Same(original, copy)
+        # every recorded turn replays
+        final = copy.Position(len(copy))
+        assert final.destroyed == original.Position(len(original)).destroyed
+    with GameReader(path) as reader:
+        offsets = list(reader.Offsets())
+        assert Same(reader.ReadAt(offsets[7]), games[7])
+
+
+def test_torn_tail_is_cut(tmpdir):
+    path = str(tmpdir.join('games.rec'))
+    rng = random.Random(1)
+    games = [RandomGame(7, 7, rng) for _ in range(3)]
+    with GameWriter(path) as writer:
+        for game in games:
+            writer.Write(game)
+    assert EndsWithRecord(path)
+    size = tmpdir.join('games.rec').size()
+    with open(path, 'r+b') as torn:
+        torn.truncate(size - 5)
+    assert not EndsWithRecord(path)
+    assert len(list(ReadGames(path))) == 2
+    with GameWriter(path) as writer:
+        writer.Write(games[2])
+    read = list(ReadGames(path))
+    assert len(read) == 3 and Same(read[2], games[2])
+    assert EndsWithRecord(path)
+
+
+def test_header_inside_a_torn_record(tmpdir):
+    path = str(tmpdir.join('games.rec'))
+    rng = random.Random(2)
+    game = RandomGame(7, 7, rng)
+    # bytes of a record that never replays (the pawn jumps across the board)
+    # stand in for a torn game's payload that happens to look like a header
+    fake = GameRecord(7, 7, turns=[(48, 0)]).Pack()
+    torn = game.Pack()
+    with open(path, 'wb') as out:
+        out.write(torn + torn[:-len(fake)-1] + fake)
+    assert not EndsWithRecord(path)
+    with GameWriter(path) as writer:
+        writer.Write(game)
+    read = list(ReadGames(path))
+    assert len(read) == 2 and all(Same(copy, game) for copy in read)
+    assert EndsWithRecord(path)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8
+""" Solved databases against brute-force minimax """
+import random
+
+import pytest
+
+from gamestate import IsolationState
+from retrograde import Solve, Write, OutcomeDatabase, OpenDatabase
+from brute import Outcome, RandomPosition
+
+
+@pytest.fixture(scope='module', params=[(3, 3), (3, 4)])
+def database(request, tmpdir_factory):
+    width, height = request.param
+    path = str(tmpdir_factory.mktemp('outcomes').join('outcomes-%dx%d.bin' % (width, height)))
+    slots, values = Solve(width, height)
+    Write(path, width, height, slots, values)
+    database = OutcomeDatabase(path)
+    database.memo = {}  # brute-force results, shared by the tests of one board
+    yield database
+    database.Close()
+
+
+def test_probe_matches_brute_force(database):
+    rng = random.Random(database.width*database.height)
+    for _ in range(400):
+        state = RandomPosition(database.width, database.height, rng)
+        mover, other = state.pawns[state.player], state.pawns[1-state.player]
+        assert database.Probe(mover, other, state.destroyed) == Outcome(state, database.memo), state
+
+
+def test_best_turn_keeps_the_outcome(database):
+    rng = random.Random(1)
+    for _ in range(200):
+        state = RandomPosition(database.width, database.height, rng)
+        if state.IsIsolated():
+            continue
+        turn, wins, turns = database.BestTurn(state)
+        assert (wins, turns) == Outcome(state, database.memo), state
+        if turn[1] is not None:
+            state.MakeMove(*turn)
+            assert Outcome(state, database.memo)[0] != wins, state
+
+
+def test_open_database(tmpdir):
+    assert OpenDatabase(3, 3, str(tmpdir)) is None
+    tmpdir.join('outcomes-3x3.bin').write('not a database')
+    assert OpenDatabase(3, 3, str(tmpdir)) is None
@@ -0,0 +1,153 @@
+# -*- coding: utf-8
+""" The timer wheel, and the server refusing bad requests over a socket """
+import json
+import sys
+
+import pytest
+
+if sys.version_info < (3, 7):
+    pytest.skip('the server needs Python 3.7', allow_module_level=True)
+
+import asyncio
+
+from server import GameServer, TimerWheel, IDLE_TIMEOUTS
+
+
+def test_wheel_order():
+    wheel = TimerWheel(tick=0.25, slots=8)
+    fired = []
+    for delay in (1.0, 0.25, 0.1, 3.0, 0.25):
+        wheel.Schedule(delay, lambda delay: fired.append((wheel.ticks, delay)), delay)
+    for _ in range(20):
+        wheel.Advance()
+    # never early, at most a tick late, in deadline order, ties as scheduled
+    assert fired == [(2, 0.25), (2, 0.1), (2, 0.25), (5, 1.0), (13, 3.0)]
+
+
+def test_wheel_cancel():
+    wheel = TimerWheel(tick=0.25, slots=4)
+    fired = []
+    kept = wheel.Schedule(0.5, fired.append, 'kept')
+    cancelled = wheel.Schedule(0.5, fired.append, 'cancelled')
+    # two revolutions away, shares a slot with the first two
+    far = wheel.Schedule(2.5, fired.append, 'far')
+    wheel.Cancel(cancelled)
+    wheel.Cancel(None)
+    for _ in range(3):
+        wheel.Advance()
+    assert fired == ['kept']
+    wheel.Cancel(kept)  # already fired, nothing happens
+    wheel.Cancel(far)
+    for _ in range(20):
+        wheel.Advance()
+    assert fired == ['kept']
+    assert not any(wheel.slots)
+
+
+def test_wheel_runs_on_the_loop():
+    async def Main():
+        wheel = TimerWheel(tick=0.01)
+        loop = asyncio.get_event_loop()
+        fired = []
+        start = loop.time()
+        for delay in (0.05, 0.02):
+            wheel.Schedule(delay, lambda delay: fired.append((delay, loop.time() - start)), delay)
+        ticker = asyncio.ensure_future(wheel.Run())
+        await asyncio.sleep(0.2)
+        ticker.cancel()
+        return fired
+    fired = asyncio.run(Main())
+    assert [delay for delay, _ in fired] == [0.02, 0.05]
+    assert all(elapsed >= delay for delay, elapsed in fired)
+
+
+def Talk(tmpdir, server, *lines):
+    """ Sends the lines on one connection and returns the replies by id, the
+        one to a line that is not JSON under None """
+    path = str(tmpdir.join('server.sock'))
+
+    async def Main():
+        listener = await asyncio.start_unix_server(server.Handle, path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        for number, line in enumerate(lines):
+            if isinstance(line, dict):
+                line = json.dumps(dict(line, id=number))
+            writer.write((line + '\n').encode('utf-8'))
+        # leaving a game that does not exist always gets a reply, and comes last
+        writer.write((json.dumps({'op': 'leave', 'game': 0, 'id': 'end'}) + '\n').encode('utf-8'))
+        replies = {}
+        while 'end' not in replies:
+            reply = json.loads((await reader.readline()).decode('utf-8'))
+            if reply['op'] not in ('played', 'timeout', 'over'):
+                replies[reply.get('id')] = reply
+        writer.close()
+        # the server gives up the seats of a closed connection
+        while server.games:
+            await asyncio.sleep(0.01)
+        listener.close()
+        await listener.wait_closed()
+        return replies
+    return asyncio.run(Main())
+
+
+def test_bad_new_games(tmpdir):
+    server = GameServer()
+    replies = Talk(tmpdir, server,
+                   {'op': 'new', 'timer': -1},
+                   {'op': 'new', 'timer': 0.01},
+                   {'op': 'new', 'timer': 'soon'},
+                   {'op': 'new', 'width': 2},
+                   {'op': 'new', 'seats': []},
+                   {'op': 'new', 'seats': [2]},
+                   {'op': 'new', 'seats': 'both'},
+                   {'op': 'fly'},
+                   'not json',
+                   {'op': 'new', 'timer': 15})
+    for number in list(range(8)) + [None]:
+        assert replies[number]['op'] == 'error'
+    assert 'timer' in replies[0]['message'] and 'timer' in replies[1]['message']
+    # the connection survived them all, and refused games left nothing behind
+    assert replies[9]['op'] == 'joined' and replies[9]['seats'] == [0, 1]
+    assert replies[9]['game'] == 1 and server.next_game == 2
+
+
+def test_bad_plays(tmpdir):
+    server = GameServer()
+    replies = Talk(tmpdir, server,
+                   {'op': 'new', 'width': 5, 'height': 5, 'seats': [0]},
+                   {'op': 'play', 'game': 1, 'cell': 24},
+                   {'op': 'play', 'game': 1, 'cell': 99},
+                   {'op': 'play', 'game': 9, 'cell': 7},
+                   {'op': 'play', 'game': 1},
+                   {'op': 'play', 'game': 1, 'cell': 'x'},
+                   {'op': 'play', 'game': 1, 'cell': 7},
+                   {'op': 'play', 'game': 1, 'cell': 7},
+                   {'op': 'new', 'seats': [1]},
+                   {'op': 'play', 'game': 2, 'cell': 3},
+                   {'op': 'state', 'game': 1})
+    errors = {1: 'illegal move', 2: 'no cell', 3: 'no game', 4: 'missing', 5: 'invalid', 7: 'cannot be removed',
+              9: 'not your turn'}
+    for number, words in errors.items():
+        assert replies[number]['op'] == 'error' and words in replies[number]['message'], replies[number]
+    assert 6 not in replies  # an accepted cell is only broadcast
+    state = replies[10]
+    assert state['pawns'] == [7, 22] and state['phase'] == 1 and state['destroyed'] == 0
+
+
+def test_idle_game_ends():
+    server = GameServer(TimerWheel(tick=0.25))
+    sent = []
+
+    class Connection(object):
+        games = set()
+
+        def Send(self, message):
+            sent.append(message)
+    conn = Connection()
+    server.New(conn, {'timer': 0.25})
+    for _ in range(10*IDLE_TIMEOUTS):
+        server.wheel.Advance()
+    game = server.games[1]
+    assert [message['op'] for message in sent] == ['timeout']*(IDLE_TIMEOUTS-1) + ['over']
+    assert game.winner is not None and game.deadline is None
+    assert len(game.record.turns) == IDLE_TIMEOUTS
@@ -0,0 +1,108 @@
+# -*- coding: utf-8
+""" Zobrist keys and their symmetry folding """
+import random
+
+from gamestate import IsolationState
+from engine import AlphaBetaEngine, INFINITY
+from transposition import Hasher
+from brute import RandomPosition
+
+
+def CanonicalKey(state):
+    hasher = Hasher(state.width, state.height)
+    return hasher.Canonical(hasher.Keys(state))[0]
+
+
+def test_sizes_do_not_share_keys():
+    rng = random.Random(0)
+    for small, large in [((5, 5), (5, 6)), ((7, 7), (7, 8)), ((5, 5), (6, 5))]:
+        keys = set(CanonicalKey(RandomPosition(small[0], small[1], rng)) for _ in range(3000))
+        assert not keys & set(CanonicalKey(RandomPosition(large[0], large[1], rng)) for _ in range(3000))
+    # these two once had the same key
+    assert (CanonicalKey(IsolationState(5, 6, (0, 1), 0b1100, 0))
+            != CanonicalKey(IsolationState(5, 5, (0, 6), (1 << 12) | (1 << 13), 0)))
+
+
+def Negamax(engine, state, depth):
+    """ Value of state searched straight through the engine's table, which
+        is what every node below a search root does """
+    engine.hasher = Hasher(state.width, state.height)
+    engine.deadline = None
+    engine.nodes = engine.endgames = engine.expanded = engine.children = engine.cutoffs = engine.first_cutoffs = 0
+    return engine.Negamax(state.Copy(), depth, -INFINITY, INFINITY, 0, engine.hasher.Keys(state))
+
+
+def test_one_engine_for_two_sizes():
+    """ A search must not read what a search on another board size stored """
+    state = IsolationState(5, 5, (0, 6), (1 << 12) | (1 << 13), 0)
+    for other in (IsolationState(5, 6, (0, 1), 0b1100, 0), IsolationState(6, 5, (0, 1), 0b1100, 0)):
+        for depth in (1, 2, 3, 4):
+            shared = AlphaBetaEngine()
+            Negamax(shared, other, depth)
+            assert Negamax(shared, state, depth) == Negamax(AlphaBetaEngine(), state, depth)
+
+
+def Image(state, perm):
+    destroyed = 0
+    for index in range(state.size):
+        if state.destroyed >> index & 1:
+            destroyed |= 1 << perm[index]
+    return IsolationState(state.width, state.height, [perm[p] for p in state.pawns], destroyed, state.player)
+
+
+def test_symmetric_positions_share_a_key():
+    rng = random.Random(2)
+    for width, height in [(5, 5), (7, 7), (5, 7), (6, 4)]:
+        hasher = Hasher(width, height)
+        assert len(hasher.perms) == (8 if width == height else 4)
+        for _ in range(50):
+            state = RandomPosition(width, height, rng)
+            key = CanonicalKey(state)
+            for perm in hasher.perms:
+                assert CanonicalKey(Image(state, perm)) == key
+
+
+def test_stored_turns_map_back():
+    """ A turn stored through one image is a legal turn to the same place in every other """
+    rng = random.Random(3)
+    for width, height in [(5, 5), (7, 7), (5, 7)]:
+        hasher = Hasher(width, height)
+        for _ in range(50):
+            state = RandomPosition(width, height, rng, width*height // 3)
+            moves = state.LegalMoves()
+            if not moves:
+                continue
+            to = rng.choice(moves)
+            remove = rng.choice([i for i in range(state.size) if i != to and (not state.blocked >> i & 1
+                                                                             or i == state.pawns[state.player])])
+            symmetry = hasher.Canonical(hasher.Keys(state))[1]
+            stored = hasher.ToCanonical(symmetry, to), hasher.ToCanonical(symmetry, remove)
+            for perm in hasher.perms:
+                image = Image(state, perm)
+                found = hasher.Canonical(hasher.Keys(image))[1]
+                turn = hasher.FromCanonical(found, stored[0]), hasher.FromCanonical(found, stored[1])
+                assert image.IsLegalMove(turn[0]), image
+                assert turn[1] != turn[0] and not (image.blocked ^ (1 << image.pawns[image.player])) >> turn[1] & 1
+                # a position symmetric to itself may get a mirror of the turn,
+                # which must lead to the same position up to symmetry
+                played, expected = image.Copy(), image.Copy()
+                played.MakeMove(*turn)
+                expected.MakeMove(perm[to], perm[remove])
+                assert CanonicalKey(played) == CanonicalKey(expected)
+
+
+def test_child_keys_follow_the_turn():
+    rng = random.Random(4)
+    hasher = Hasher(6, 6)
+    for _ in range(100):
+        state = RandomPosition(6, 6, rng, 8)
+        moves = state.LegalMoves()
+        if not moves:
+            continue
+        to = rng.choice(moves)
+        remove = rng.choice([i for i in range(state.size) if i != to and (not state.blocked >> i & 1
+                                                                         or i == state.pawns[state.player])])
+        keys = hasher.Keys(state)
+        frm, opp = state.pawns[state.player], state.pawns[1-state.player]
+        state.MakeMove(to, remove)
+        assert hasher.Child(keys, frm, opp, to, remove) == hasher.Keys(state)
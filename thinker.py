@@ -0,0 +1,148 @@
+# -*- coding: utf-8
+""" Runs engine searches on a background thread so the GUI never blocks.
+
+    Jobs go to a single worker thread (the engine and its transposition table
+    are not thread-safe, so searches never overlap). Starting a new job or
+    cancelling makes the running search stale: the engine polls Expired()
+    and unwinds within a few thousand nodes. While the human is to move the
+    thinker can ponder: it guesses the human's turn with a short search, then
+    searches the position that turn leads to with no time limit. If that
+    position is reached, PonderHit() gives the running search a deadline
+    instead of starting over. Nothing here imports wx, results are handed to
+    a deliver(job, turn, stats) callback that is called from the worker thread. """
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+PREDICT_TIME = 0.2  # seconds spent guessing the human's turn before pondering
+
+
+def PositionKey(state):
+    return (tuple(state.pawns), state.destroyed, state.player)
+
+
+class Thinker(object):
+    def __init__(self, engine, deliver, predict_time=PREDICT_TIME):
+        self.engine = engine
+        self.engine.control = self
+        self.deliver = deliver
+        self.predict_time = predict_time
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.job = 0        # id of the newest job, anything older is stale
+        self.running = None  # id of the job the worker is searching
+        self.deadline = None
+        self.pondering = None  # position key the ponder search is working on
+        self.ponder_from = None  # position key of the human's position being pondered
+        self.hit = False
+        self.pondered = None  # (turn, stats) of a ponder search that finished early
+        self.thread = threading.Thread(target=self.Run, name='isolation-thinker')
+        self.thread.daemon = True
+        self.thread.start()
+
+    ## ------------ GUI THREAD ------------##
+    def NewJob(self):
+        with self.lock:
+            self.job += 1
+            self.deadline = None
+            self.pondering = None
+            self.ponder_from = None
+            self.hit = False
+            self.pondered = None
+            return self.job
+
+    def Think(self, state, time_limit):
+        """ Searches state for time_limit seconds. Returns the job id. """
+        job = self.NewJob()
+        self.jobs.put((job, 'think', state.Copy(), time_limit))
+        return job
+
+    def Ponder(self, state):
+        """ Thinks on the opponent's time while the human is to move in state.
+            Asking again for the position already pondered keeps that job
+            and the work it has done. """
+        key = PositionKey(state)
+        with self.lock:
+            if self.ponder_from == key:
+                return self.job
+        job = self.NewJob()
+        with self.lock:
+            self.ponder_from = key
+        self.jobs.put((job, 'ponder', state.Copy(), None))
+        return job
+
+    def PonderHit(self, state, time_limit):
+        """ True if the ponder search is working on state, in which case it
+            now has time_limit seconds left and delivers under its own job id """
+        with self.lock:
+            if self.pondering != PositionKey(state):
+                return False
+            self.hit = True
+            self.deadline = time.time() + time_limit
+            pondered, self.pondered = self.pondered, None
+            job = self.job
+        if pondered is not None:
+            self.deliver(job, *pondered)
+        return True
+
+    def Cancel(self):
+        self.NewJob()
+
+    def Close(self):
+        self.Cancel()
+        self.jobs.put(None)
+
+    def IsCurrent(self, job):
+        return job == self.job
+
+    ## ------------ WORKER THREAD ------------##
+    def Expired(self):
+        """ Polled by the engine: the job was superseded or its deadline passed """
+        if self.running != self.job:
+            return True
+        deadline = self.deadline
+        return deadline is not None and time.time() > deadline
+
+    def Run(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            job, kind, state, time_limit = item
+            if job != self.job:
+                continue
+            self.running = job
+            try:
+                if kind == 'think':
+                    turn = self.engine.Search(state, time_limit)
+                    if job == self.job:
+                        self.deliver(job, turn, self.engine.stats)
+                else:
+                    self.RunPonder(job, state)
+            finally:
+                self.running = None
+
+    def RunPonder(self, job, state):
+        guess = self.engine.Search(state, self.predict_time)
+        if job != self.job or guess[1] is None:
+            return
+        state.MakeMove(*guess)
+        if state.IsIsolated():
+            return
+        with self.lock:
+            if job != self.job:
+                return
+            self.pondering = PositionKey(state)
+        turn = self.engine.Search(state)
+        with self.lock:
+            if job != self.job:
+                return
+            if not self.hit:
+                # finished before the human moved, hold it for PonderHit
+                self.pondered = (turn, self.engine.stats)
+                return
+        self.deliver(job, turn, self.engine.stats)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8
+""" Headless engine-vs-engine matches for comparing engine settings.
+
+    Games are played in a multiprocessing pool, one game per task. Each pair
+    of games shares a random opening with colours swapped, every finished game
+    is appended to a JSONL file as it comes in, and the match stops as soon as
+    an SPRT between two Elo hypotheses reaches a decision.
+
+    python tournament.py --width 7 --height 7 --time 0.2 \\
+        --a opp_weight=2.0 --b opp_weight=1.0 --games 2000 --out match.jsonl """
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from gamestate import IsolationState, BitIndices
+from engine import AlphaBetaEngine
+from mcts import MCTSEngine
+from records import GameRecord, GameWriter
+
+
+ENGINES = {'alphabeta': AlphaBetaEngine, 'mcts': MCTSEngine}
+
+
+def ParseEngine(spec):
+    """ 'own_weight=1,opp_weight=2.5,max_depth=6' -> engine kwargs.
+        engine=mcts picks the MCTS player instead of alpha-beta. """
+    kwargs = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, value = item.split('=', 1)
+        value = value.strip()
+        if value in ENGINES:
+            pass
+        elif value == 'None':
+            value = None
+        else:
+            try:
+                value = int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass  # a path, e.g. evaluation=weights.json
+        kwargs[name.strip()] = value
+    return kwargs
+
+
+def RandomOpening(state, plies, rng):
+    """ Plays `plies` random turns that do not lose on the spot """
+    for _ in range(plies):
+        if state.IsIsolated():
+            break
+        frm = state.pawns[state.player]
+        turns = []
+        for to in state.LegalMoves():
+            free = state.full & ~(state.blocked ^ (1 << frm) | (1 << to))
+            if state.neighbours[to] & free:
+                turns.append((to, free))
+        if not turns:
+            break
+        to, free = rng.choice(turns)
+        state.MakeMove(to, rng.choice(list(BitIndices(free))))
+    return state
+
+
+def MakeEngine(kwargs):
+    kwargs = dict(kwargs)
+    return ENGINES[kwargs.pop('engine', 'alphabeta')](**kwargs)
+
+
+def PlayGame(task):
+    """ Plays one game described by a task dict and returns its result dict """
+    rng = random.Random(task['seed'])
+    state = RandomOpening(IsolationState(task['width'], task['height']), task['opening'], rng)
+    state.undo = []
+    opening = (list(state.pawns), state.destroyed, state.player)
+    engines = {}
+    engines[task['a_player']] = MakeEngine(task['a'])
+    engines[1-task['a_player']] = MakeEngine(task['b'])
+
+    turns = []
+    nodes = [0, 0]
+    start = time.time()
+    while True:
+        if state.IsIsolated():
+            winner = 1 - state.player
+            break
+        player = state.player
+        engine = engines[player]
+        to, remove = engine.Search(state, task['time'], task['depth'])
+        nodes[player] += engine.stats.get('nodes', engine.stats.get('playouts', 0))
+        turns.append((to, remove))
+        if remove is None:
+            winner = 1 - player
+            break
+        state.MakeMove(to, remove)
+
+    return {
+        'game': task['game'],
+        'width': task['width'],
+        'height': task['height'],
+        'a_player': task['a_player'],
+        'a': task['a'],
+        'b': task['b'],
+        'winner': 'a' if winner == task['a_player'] else 'b',
+        'opening': opening,
+        'turns': turns,
+        'nodes': nodes,
+        'time': time.time() - start,
+    }
+
+
+## ------------ STATISTICS ------------##
+def ExpectedScore(elo):
+    return 1.0 / (1.0 + 10.0 ** (-elo/400.0))
+
+
+def EloFromScore(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0/score - 1.0)
+
+
+def EloWithError(wins, losses, z=1.96):
+    """ (elo, margin) for the 95% interval of a win/loss record (no draws in Isolation) """
+    games = wins + losses
+    if not games:
+        return 0.0, float('inf')
+    score = float(wins) / games
+    error = z * math.sqrt(max(score*(1-score), 1e-9) / games)
+    low, high = EloFromScore(score - error), EloFromScore(score + error)
+    return EloFromScore(score), (high - low) / 2.0
+
+
+def SPRT(wins, losses, elo0, elo1, alpha=0.05, beta=0.05):
+    """ Returns (llr, lower, upper, decision) where decision is 'H0', 'H1' or None """
+    p0, p1 = ExpectedScore(elo0), ExpectedScore(elo1)
+    llr = wins*math.log(p1/p0) + losses*math.log((1-p1)/(1-p0))
+    lower = math.log(beta/(1-alpha))
+    upper = math.log((1-beta)/alpha)
+    decision = None
+    if llr >= upper:
+        decision = 'H1'
+    elif llr <= lower:
+        decision = 'H0'
+    return llr, lower, upper, decision
+
+
+## ------------ MATCH RUNNER ------------##
+def Tasks(args):
+    rng = random.Random(args.seed)
+    a, b = ParseEngine(args.a), ParseEngine(args.b)
+    for pair in range(args.games//2):
+        seed = rng.getrandbits(32)
+        for a_player in (0, 1):
+            yield {
+                'game': 2*pair + a_player,
+                'width': args.width,
+                'height': args.height,
+                'a': a,
+                'b': b,
+                'a_player': a_player,
+                'opening': args.opening,
+                'seed': seed,
+                'time': args.time,
+                'depth': args.depth,
+            }
+
+
+def Record(result):
+    """ The binary game record of a PlayGame result """
+    pawns, destroyed, player = result['opening']
+    a_player = result['a_player']
+    winner = a_player if result['winner'] == 'a' else 1 - a_player
+    conf = {'game': result['game'], 'a_player': a_player, 'a': result['a'], 'b': result['b']}
+    return GameRecord(result['width'], result['height'], pawns, destroyed, player, conf, result['turns'], winner)
+
+
+def RunMatch(args, log=sys.stdout):
+    pool = multiprocessing.Pool(args.processes or None)
+    wins = losses = 0
+    decision = None
+    out = open(args.out, 'a') if args.out else None
+    record = GameWriter(args.record) if args.record else None
+    try:
+        for result in pool.imap_unordered(PlayGame, Tasks(args)):
+            if result['winner'] == 'a':
+                wins += 1
+            else:
+                losses += 1
+            if out:
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+            if record:
+                record.Write(Record(result))
+            elo, margin = EloWithError(wins, losses)
+            llr, lower, upper, decision = SPRT(wins, losses, args.elo0, args.elo1, args.alpha, args.beta)
+            print('%d games  +%d -%d  elo %+.1f +/- %.1f  llr %.2f (%.2f, %.2f)'
+                  % (wins+losses, wins, losses, elo, margin, llr, lower, upper), file=log)
+            if decision and not args.no_sprt:
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+        if out:
+            out.close()
+        if record:
+            record.Close()
+
+    elo, margin = EloWithError(wins, losses)
+    return {'wins': wins, 'losses': losses, 'elo': elo, 'margin': margin, 'sprt': decision}
+
+
+def ArgParser():
+    parser = argparse.ArgumentParser(description='Play engine-vs-engine Isolation matches.')
+    parser.add_argument('--a', default='', help='settings of engine A, e.g. opp_weight=2,max_depth=6 or engine=mcts')
+    parser.add_argument('--b', default='', help='settings of engine B')
+    parser.add_argument('--width', type=int, default=7)
+    parser.add_argument('--height', type=int, default=7)
+    parser.add_argument('--games', type=int, default=1000, help='upper limit on games played')
+    parser.add_argument('--time', type=float, default=0.1, help='seconds per turn')
+    parser.add_argument('--depth', type=int, default=None, help='depth limit per turn')
+    parser.add_argument('--opening', type=int, default=2, help='random turns before the engines take over')
+    parser.add_argument('--processes', type=int, default=0, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default=None, help='append per-game results to this JSONL file')
+    parser.add_argument('--record', default=None, help='append every game to this binary record file (see records.py)')
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=20.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--no-sprt', action='store_true', help='play all games even once SPRT decides')
+    return parser
+
+
+def Main(argv=None):
+    args = ArgParser().parse_args(argv)
+    summary = RunMatch(args)
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
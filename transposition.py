@@ -0,0 +1,177 @@
+# -*- coding: utf-8
+""" Zobrist hashing and a fixed-size transposition table for the engines.
+
+    Keys are kept for every symmetry of the board (the mirror flips, and the
+    rotations/transposes of square boards) and the smallest one is used as the
+    canonical key, so mirrored positions share one table entry. Pawns are
+    hashed as "player to move" and "other player", which also folds the two
+    colours together since the rules treat both players alike. """
+import random
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+_SYMMETRIES = {}
+_HASHERS = {}
+
+
+def Symmetries(width, height):
+    """ Returns (perms, inverses): for each symmetry the image of every cell
+        and the cell every image comes from. Identity is always first. """
+    key = (width, height)
+    if key not in _SYMMETRIES:
+        maps = [
+            lambda r, c: (r, c),
+            lambda r, c: (r, width-1-c),
+            lambda r, c: (height-1-r, c),
+            lambda r, c: (height-1-r, width-1-c),
+        ]
+        if width == height:
+            maps += [
+                lambda r, c: (c, r),
+                lambda r, c: (width-1-c, height-1-r),
+                lambda r, c: (c, height-1-r),
+                lambda r, c: (width-1-c, r),
+            ]
+        perms, inverses = [], []
+        for f in maps:
+            perm = [0]*(width*height)
+            inverse = [0]*(width*height)
+            for r in range(height):
+                for c in range(width):
+                    nr, nc = f(r, c)
+                    perm[r*width + c] = nr*width + nc
+                    inverse[nr*width + nc] = r*width + c
+            perms.append(perm)
+            inverses.append(inverse)
+        _SYMMETRIES[key] = (perms, inverses)
+    return _SYMMETRIES[key]
+
+
+## ------------ ZOBRIST KEYS ------------##
+class ZobristHasher(object):
+    """ One random 64-bit number per (cell, piece kind), seen through each
+        symmetry. Every board size draws from its own stream, so positions of
+        different sizes do not share keys in a table used for both. """
+    def __init__(self, width, height, seed=0x150):
+        self.width = width
+        self.height = height
+        self.perms, self.inverses = Symmetries(width, height)
+        size = width*height
+        rng = random.Random(seed ^ (width << 32) ^ (height << 48))
+        mover = [rng.getrandbits(64) for _ in range(size)]
+        other = [rng.getrandbits(64) for _ in range(size)]
+        destroyed = [rng.getrandbits(64) for _ in range(size)]
+        self.tables = []
+        for perm in self.perms:
+            self.tables.append((
+                [mover[perm[i]] for i in range(size)],
+                [other[perm[i]] for i in range(size)],
+                [destroyed[perm[i]] for i in range(size)],
+            ))
+
+    def Keys(self, state):
+        """ Computes the key of state under every symmetry from scratch """
+        mine, theirs = state.pawns[state.player], state.pawns[1-state.player]
+        keys = []
+        for mover, other, destroyed in self.tables:
+            key = mover[mine] ^ other[theirs]
+            mask = state.destroyed
+            while mask:
+                low = mask & -mask
+                key ^= destroyed[low.bit_length() - 1]
+                mask ^= low
+            keys.append(key)
+        return keys
+
+    def Child(self, keys, frm, opp, to, remove):
+        """ Keys after the player on `frm` moves to `to` and removes `remove`.
+            Afterwards the pawn on `opp` becomes the player to move. """
+        child = []
+        for key, (mover, other, destroyed) in zip(keys, self.tables):
+            child.append(key ^ mover[frm] ^ other[opp] ^ mover[opp] ^ other[to] ^ destroyed[remove])
+        return child
+
+    def Canonical(self, keys):
+        """ Returns (key, symmetry) for the smallest of the symmetric keys """
+        key = min(keys)
+        return key, keys.index(key)
+
+    def ToCanonical(self, symmetry, index):
+        return self.perms[symmetry][index]
+
+    def FromCanonical(self, symmetry, index):
+        return self.inverses[symmetry][index]
+
+
+def Hasher(width, height):
+    hasher = _HASHERS.get((width, height))
+    if hasher is None:
+        hasher = _HASHERS[(width, height)] = ZobristHasher(width, height)
+    return hasher
+
+
+## ------------ TRANSPOSITION TABLE ------------##
+class TranspositionTable(object):
+    """ Fixed number of two-slot buckets. The first slot keeps the deepest
+        result (unless it is left over from an earlier search), the second is
+        overwritten by every store that does not make it into the first.
+        Entries are (depth, score, flag, turn, nodes, generation). """
+    def __init__(self, bits=18):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.keys = [None]*(2 << bits)
+        self.entries = [None]*(2 << bits)
+        self.generation = 0
+        self.ResetStats()
+
+    def ResetStats(self):
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.saved = 0
+        self.stores = 0
+
+    def NewSearch(self):
+        self.generation += 1
+        self.ResetStats()
+
+    def Clear(self):
+        self.keys = [None]*len(self.keys)
+        self.entries = [None]*len(self.entries)
+
+    def Probe(self, key):
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        if self.keys[slot] == key:
+            self.hits += 1
+            return self.entries[slot]
+        if self.keys[slot+1] == key:
+            self.hits += 1
+            return self.entries[slot+1]
+        return None
+
+    def Store(self, key, depth, score, flag, turn, nodes):
+        self.stores += 1
+        slot = (key & self.mask) << 1
+        entry = (depth, score, flag, turn, nodes, self.generation)
+        old = self.entries[slot]
+        if old is None or self.keys[slot] == key or depth >= old[0] or old[5] != self.generation:
+            self.keys[slot] = key
+            self.entries[slot] = entry
+        else:
+            self.keys[slot+1] = key
+            self.entries[slot+1] = entry
+
+    def Cutoff(self, entry):
+        """ Records that `entry` answered a node without searching it """
+        self.cutoffs += 1
+        self.saved += entry[4]
+
+    def Stats(self):
+        return {
+            'tt_probes': self.probes,
+            'tt_hits': self.hits,
+            'tt_hit_rate': float(self.hits)/self.probes if self.probes else 0.0,
+            'tt_cutoffs': self.cutoffs,
+            'tt_nodes_saved': self.saved,
+        }